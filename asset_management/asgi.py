@@ -0,0 +1,23 @@
+"""
+ASGI config for asset_management project.
+
+Serves the async read views (dashboard, asset list and detail, the JSON API)
+without tying up a worker per request while they wait on the database; the
+other views run in a thread as usual. Run with e.g.:
+
+    uvicorn asset_management.asgi:application --workers 4
+
+Persistent connections belong to a thread, and under ASGI every request runs
+its database work in a fresh one, so they would only pile up:
+DATABASE_CONN_MAX_AGE defaults to 0 here. On PostgreSQL use DATABASE_POOL
+for reuse instead (see asset_management/database.py).
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'asset_management.settings')
+os.environ.setdefault('DATABASE_CONN_MAX_AGE', '0')
+
+application = get_asgi_application()
@@ -0,0 +1,83 @@
+"""
+Connection management for the default database, configured from the
+environment:
+
+- DATABASE_CONN_MAX_AGE: seconds a connection is kept open and reused across
+  requests (0 closes it after every request, "None" keeps it forever).
+  Default 600.
+- DATABASE_CONN_HEALTH_CHECKS: check a reused connection before the first
+  query of a request, so a connection dropped by the server or a proxy is
+  replaced instead of failing the request. Default True.
+- DATABASE_CONNECT_TIMEOUT: seconds to wait when opening a PostgreSQL
+  connection. Default 10.
+- DATABASE_POOL: "True" to use psycopg 3's connection pool (Django 5.1+,
+  needs ``psycopg[pool]``, which requirements.txt installs; settings fail
+  to load if it is missing rather than falling back). The pool replaces
+  persistent connections, so CONN_MAX_AGE is forced to 0. Sized with
+  DATABASE_POOL_MIN_SIZE / DATABASE_POOL_MAX_SIZE / DATABASE_POOL_TIMEOUT.
+- DATABASE_SQLITE_WAL: "True" to put SQLite in write-ahead-log mode, so
+  readers do not block the writer.
+- DATABASE_SQLITE_TRANSACTION_MODE: e.g. "IMMEDIATE" to take SQLite's write
+  lock when a transaction starts. SQLite has no row locks (select_for_update
+  is a no-op), so this is what serializes concurrent assignment changes
+  instead of failing them with "database is locked".
+
+On SQLite the test database is a file next to the configured one
+(test_<name>), not Django's shared in-memory database: threads sharing an
+in-memory database fail on its table locks at once instead of waiting, so
+the concurrency tests could not run there.
+"""
+import importlib.util
+import os
+from pathlib import Path
+
+import dj_database_url
+from django.core.exceptions import ImproperlyConfigured
+
+
+def env_bool(name, default):
+    return os.environ.get(name, str(default)).lower() in ('1', 'true', 'yes', 'on')
+
+
+def _conn_max_age():
+    value = os.environ.get('DATABASE_CONN_MAX_AGE', '600')
+    return None if value.lower() == 'none' else int(value)
+
+
+def _require_pool():
+    for module in ('psycopg', 'psycopg_pool'):
+        if importlib.util.find_spec(module) is None:
+            raise ImproperlyConfigured(
+                f"DATABASE_POOL needs psycopg 3 with its pool ({module} is not installed); "
+                f"pip install 'psycopg[binary,pool]' or unset DATABASE_POOL."
+            )
+
+
+def database_config():
+    config = dj_database_url.config(default=os.environ.get('DATABASE_URL'))
+    config['CONN_MAX_AGE'] = _conn_max_age()
+    config['CONN_HEALTH_CHECKS'] = env_bool('DATABASE_CONN_HEALTH_CHECKS', True)
+
+    if config.get('ENGINE') == 'django.db.backends.postgresql':
+        options = config.setdefault('OPTIONS', {})
+        options.setdefault('connect_timeout', int(os.environ.get('DATABASE_CONNECT_TIMEOUT', 10)))
+        if env_bool('DATABASE_POOL', False):
+            _require_pool()
+            options['pool'] = {
+                'min_size': int(os.environ.get('DATABASE_POOL_MIN_SIZE', 2)),
+                'max_size': int(os.environ.get('DATABASE_POOL_MAX_SIZE', 10)),
+                'timeout': int(os.environ.get('DATABASE_POOL_TIMEOUT', 10)),
+            }
+            config['CONN_MAX_AGE'] = 0
+    elif config.get('ENGINE') == 'django.db.backends.sqlite3':
+        options = config.setdefault('OPTIONS', {})
+        if env_bool('DATABASE_SQLITE_WAL', False):
+            options['init_command'] = 'PRAGMA journal_mode=WAL;'
+        if os.environ.get('DATABASE_SQLITE_TRANSACTION_MODE'):
+            options['transaction_mode'] = os.environ['DATABASE_SQLITE_TRANSACTION_MODE'].upper()
+        name = str(config.get('NAME') or '')
+        if name and name != ':memory:':
+            path = Path(name)
+            config.setdefault('TEST', {}).setdefault('NAME', str(path.with_name(f'test_{path.name}')))
+
+    return config
@@ -30,11 +30,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'assets.profiling.InstrumentationMiddleware',
+    'assets.middleware.DatabaseMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'assets.middleware.UserRoleMiddleware',
+    'assets.audit.AuditActorMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -43,7 +47,8 @@ ROOT_URLCONF = 'asset_management.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates that report render time to the profiling middleware
+        'BACKEND': 'assets.profiling.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -52,18 +57,29 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'assets.context_processors.user_role',
+                'assets.context_processors.fragment_cache',
             ],
         },
     },
 ]
 
+# Loads the user's profile together with the user on every request. The stock
+# ModelBackend stays listed so sessions created before the switch remain valid.
+AUTHENTICATION_BACKENDS = [
+    'assets.backends.ProfileModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
 WSGI_APPLICATION = 'asset_management.wsgi.application'
+ASGI_APPLICATION = 'asset_management.asgi.application'
 
-# Database - Force SQLite usage
-import dj_database_url
+# Database - from DATABASE_URL, with persistent connections, health checks
+# and optional pooling (see asset_management/database.py for the variables)
+from .database import database_config, env_bool
 
 DATABASES = {
-    'default': dj_database_url.config(default=os.environ.get('DATABASE_URL'))
+    'default': database_config()
 }
 
 
@@ -119,3 +135,85 @@ MESSAGE_TAGS = {
     messages.WARNING: 'warning',
     messages.ERROR: 'danger', # Map Django's ERROR to Bootstrap's danger
 }
+
+# Asset export: number of rows fetched per database round trip while streaming
+ASSET_EXPORT_CHUNK_SIZE = int(os.environ.get('ASSET_EXPORT_CHUNK_SIZE', 2000))
+
+# Asset list: keyset pagination page size (overridable per request with ?page_size=)
+ASSET_LIST_PAGE_SIZE = int(os.environ.get('ASSET_LIST_PAGE_SIZE', 50))
+ASSET_LIST_MAX_PAGE_SIZE = 500
+
+# Asset search: dotted path to a backend class in assets.search. Left unset,
+# the backend is chosen from the database vendor (pg_trgm / SQLite FTS5).
+ASSET_SEARCH_BACKEND = os.environ.get('ASSET_SEARCH_BACKEND') or None
+
+# Cache used for dashboard statistics. LocMemCache is per process; point
+# CACHE_BACKEND/CACHE_LOCATION at a shared cache (e.g. file-based or Redis)
+# when running several workers so invalidation is seen by all of them.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'asset-management'),
+    },
+    # Rendered asset rows and detail pages ({% cache ... using="fragments" %}).
+    # Kept apart from 'default' so a large list cannot evict the stats.
+    'fragments': {
+        'BACKEND': os.environ.get('FRAGMENT_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('FRAGMENT_CACHE_LOCATION', 'asset-fragments'),
+        'OPTIONS': {'MAX_ENTRIES': int(os.environ.get('FRAGMENT_CACHE_MAX_ENTRIES', 20000))},
+    },
+}
+
+# Upper bound (seconds) on how long cached dashboard counts may be served
+ASSET_STATS_CACHE_TIMEOUT = int(os.environ.get('ASSET_STATS_CACHE_TIMEOUT', 60))
+
+# Bulk asset import: rows written per bulk_create/transaction
+ASSET_IMPORT_BATCH_SIZE = int(os.environ.get('ASSET_IMPORT_BATCH_SIZE', 1000))
+
+# Background export jobs: worker threads per process, how long finished files
+# are kept (seconds), how long an identical recent export is reused instead of
+# regenerated, and when an unfinished job is considered dead.
+ASSET_EXPORT_WORKERS = int(os.environ.get('ASSET_EXPORT_WORKERS', 2))
+ASSET_EXPORT_TTL = int(os.environ.get('ASSET_EXPORT_TTL', 24 * 60 * 60))
+ASSET_EXPORT_REUSE_SECONDS = int(os.environ.get('ASSET_EXPORT_REUSE_SECONDS', 5 * 60))
+ASSET_EXPORT_STALE_SECONDS = 60 * 60
+# Where finished export files are written. Keep it outside MEDIA_ROOT: the
+# files are only served by the export_job_download view, which checks who
+# is asking.
+ASSET_EXPORT_ROOT = Path(os.environ.get('ASSET_EXPORT_ROOT', BASE_DIR / 'exports'))
+
+# How long (seconds) rendered asset fragments are kept. Keys include the
+# asset's updated_at, so a save never serves a stale fragment either way.
+ASSET_FRAGMENT_CACHE_TIMEOUT = int(os.environ.get('ASSET_FRAGMENT_CACHE_TIMEOUT', 60 * 60))
+
+# Search suggestions: most distinct values kept in each process's prefix
+# index, and how old (seconds) the index may get before it is rebuilt
+ASSET_AUTOCOMPLETE_MAX_ENTRIES = int(os.environ.get('ASSET_AUTOCOMPLETE_MAX_ENTRIES', 200000))
+ASSET_AUTOCOMPLETE_MAX_AGE = int(os.environ.get('ASSET_AUTOCOMPLETE_MAX_AGE', 600))
+
+# Per-request connection/query timings (Server-Timing header and the
+# 'assets.db' logger); see assets.middleware.DatabaseMetricsMiddleware
+ASSET_DB_METRICS = env_bool('ASSET_DB_METRICS', DEBUG)
+
+# Request instrumentation behind the admin profiling page (off unless DEBUG):
+# samples kept per process, and how many runs of one SQL shape in a request
+# count as an N+1
+ASSET_PROFILING = env_bool('ASSET_PROFILING', DEBUG)
+ASSET_PROFILING_BUFFER_SIZE = int(os.environ.get('ASSET_PROFILING_BUFFER_SIZE', 2000))
+ASSET_PROFILING_N_PLUS_ONE_THRESHOLD = int(os.environ.get('ASSET_PROFILING_N_PLUS_ONE_THRESHOLD', 5))
+
+# Seconds an idempotency key of an assign/return/bulk request is remembered
+# (cleanup_idempotency_keys deletes older ones)
+ASSET_IDEMPOTENCY_KEY_TTL = int(os.environ.get('ASSET_IDEMPOTENCY_KEY_TTL', 24 * 60 * 60))
+
+# Audit log (assets.audit): events are written in batches of up to
+# ASSET_AUDIT_BATCH_SIZE every ASSET_AUDIT_FLUSH_INTERVAL seconds (0 writes
+# on commit), and moved to monthly archive rows after
+# ASSET_AUDIT_ARCHIVE_AFTER_DAYS by the archive_events command
+ASSET_AUDIT_BATCH_SIZE = int(os.environ.get('ASSET_AUDIT_BATCH_SIZE', 200))
+ASSET_AUDIT_FLUSH_INTERVAL = float(os.environ.get('ASSET_AUDIT_FLUSH_INTERVAL', 2.0))
+ASSET_AUDIT_ARCHIVE_AFTER_DAYS = int(os.environ.get('ASSET_AUDIT_ARCHIVE_AFTER_DAYS', 365))
+
+# Retired assets are moved to the archive tables (assets.archive) by the
+# nightly archive_assets command once retired for this many days
+ASSET_ARCHIVE_RETIRED_AFTER_DAYS = int(os.environ.get('ASSET_ARCHIVE_RETIRED_AFTER_DAYS', 30))
@@ -0,0 +1,47 @@
+"""
+What a request may see, shared by the HTML views and the JSON API.
+
+- Admins and asset incharges see every asset, assignment and profile.
+- A department-scoped asset incharge (UserProfile.department_scoped) sees
+  only the assets of their own department and those assets' assignments.
+- Regular users see the assets assigned to them, their own assignments and
+  their own profile.
+
+Scoping filters on the indexed department_id, never on names.
+"""
+from .models import Asset, AssetAssignment, UserProfile
+
+
+def visible_assets(request, assets=None):
+    assets = Asset.objects.all() if assets is None else assets
+    role = request.user_role
+    if not role.is_admin_or_incharge:
+        return assets.filter(assigned_user=request.user)
+    if role.department_id is not None:
+        assets = assets.filter(department_id=role.department_id)
+    return assets
+
+
+def visible_assignments(request, assignments=None):
+    assignments = AssetAssignment.objects.all() if assignments is None else assignments
+    role = request.user_role
+    if not role.is_admin_or_incharge:
+        return assignments.filter(assigned_to=request.user)
+    if role.department_id is not None:
+        assignments = assignments.filter(asset__department_id=role.department_id)
+    return assignments
+
+
+def visible_profiles(request):
+    profiles = UserProfile.objects.all()
+    if not request.user_role.is_admin_or_incharge:
+        profiles = profiles.filter(user=request.user)
+    return profiles
+
+
+def can_view(request, asset):
+    """visible_assets() for an asset already loaded."""
+    role = request.user_role
+    if not role.is_admin_or_incharge:
+        return asset.assigned_user_id == request.user.pk
+    return role.department_id is None or asset.department_id == role.department_id
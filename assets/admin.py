@@ -1,7 +1,16 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.models import User
-from .models import UserProfile, Asset, AssetAssignment
+from django import forms
+from django.urls import reverse
+from django.utils.html import format_html
+from .forms import AssetSerialNumberMixin, AssetStatusMixin
+from .archive import archive_assets, delete_asset
+from .models import (
+    UserProfile, Asset, AssetAssignment, AssetEvent, AssetEventArchive, ExportJob, AnalyticsSnapshot,
+    ArchivedAsset, ArchivedAssignment, Company, Department,
+)
+from .services import save_asset
 
 class UserProfileInline(admin.StackedInline):
     model = UserProfile
@@ -15,15 +24,135 @@ class UserAdmin(BaseUserAdmin):
 admin.site.unregister(User)
 admin.site.register(User, UserAdmin)
 
+@admin.register(Company, Department)
+class LookupAdmin(admin.ModelAdmin):
+    list_display = ['name']
+    search_fields = ['name']
+
+class AssetAdminForm(AssetSerialNumberMixin, AssetStatusMixin, forms.ModelForm):
+    class Meta:
+        model = Asset
+        fields = '__all__'
+
 @admin.register(Asset)
 class AssetAdmin(admin.ModelAdmin):
+    form = AssetAdminForm
     list_display = ['serial_number', 'display_name', 'model_category', 'status', 'assigned_user', 'department']
-    list_filter = ['status', 'model_category', 'department']
+    list_filter = ['status', 'model_category', 'department', 'company']
     search_fields = ['serial_number', 'display_name', 'assigned_user__username']
+    list_select_related = ['assigned_user', 'department']
     list_editable = ['status']
+    # Changed only together with status, through assets.services
+    readonly_fields = ['assigned_user', 'current_assignment']
+
+    def get_changelist_form(self, request, **kwargs):
+        # The list_editable status column needs the same validation
+        kwargs.setdefault('form', AssetAdminForm)
+        return super().get_changelist_form(request, **kwargs)
+
+    def save_model(self, request, obj, form, change):
+        if change:
+            # Un-assigning through the status column also closes the assignment
+            save_asset(obj)
+        else:
+            super().save_model(request, obj, form, change)
+
+    # Deleting moves the asset and its history to the archive tables
+    def delete_model(self, request, obj):
+        delete_asset(obj, request.user)
+
+    def delete_queryset(self, request, queryset):
+        archive_assets(queryset, 'deleted', request.user)
 
 @admin.register(AssetAssignment)
 class AssetAssignmentAdmin(admin.ModelAdmin):
     list_display = ['asset', 'assigned_to', 'assigned_by', 'assigned_date', 'returned_date']
     list_filter = ['assigned_date', 'returned_date']
     search_fields = ['asset__serial_number', 'assigned_to__username']
+    list_select_related = ['asset', 'assigned_to', 'assigned_by']
+    # Opened and closed only through assets.services (the assign/return
+    # views), which keep Asset.current_assignment in step
+    readonly_fields = ['asset', 'assigned_to', 'assigned_by', 'assigned_date', 'returned_date', 'notes']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'format', 'status', 'processed_rows', 'total_rows', 'requested_by', 'created_at', 'expires_at']
+    list_filter = ['status', 'format']
+    readonly_fields = ['filter_hash', 'processed_rows', 'total_rows', 'download', 'error', 'finished_at', 'expires_at']
+    exclude = ['file']
+
+    @admin.display(description='File')
+    def download(self, obj):
+        # The file is not under MEDIA_URL; link to the checked download view
+        if obj.status != 'done' or not obj.file:
+            return '-'
+        return format_html('<a href="{}">{}</a>', reverse('export_job_download', args=[obj.pk]), obj.file.name)
+
+@admin.register(AnalyticsSnapshot)
+class AnalyticsSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['date', 'dimension', 'value', 'total_assets', 'assigned_assets', 'assignments_started', 'assignments_returned']
+    list_filter = ['dimension', 'date']
+    search_fields = ['value']
+
+@admin.register(AssetEvent)
+class AssetEventAdmin(admin.ModelAdmin):
+    list_display = ['created_at', 'serial_number', 'action', 'actor']
+    list_filter = ['action']
+    search_fields = ['serial_number']
+    list_select_related = ['actor']
+    # The log is append-only
+    readonly_fields = ['asset', 'serial_number', 'action', 'actor', 'changes', 'created_at']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+@admin.register(AssetEventArchive)
+class AssetEventArchiveAdmin(admin.ModelAdmin):
+    list_display = ['serial_number', 'month', 'event_count']
+    search_fields = ['serial_number']
+    readonly_fields = ['asset', 'serial_number', 'month', 'event_count', 'events']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+class ArchivedAssignmentInline(admin.TabularInline):
+    model = ArchivedAssignment
+    fields = ['assigned_to', 'assigned_by', 'assigned_date', 'returned_date', 'notes']
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+@admin.register(ArchivedAsset)
+class ArchivedAssetAdmin(admin.ModelAdmin):
+    list_display = ['serial_number', 'display_name', 'model_category', 'status', 'reason', 'archived_at', 'archived_by']
+    list_filter = ['reason', 'model_category', 'department']
+    search_fields = ['serial_number', 'display_name']
+    list_select_related = ['archived_by']
+    inlines = [ArchivedAssignmentInline]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,317 @@
+"""
+Utilisation and turnover analytics, served from daily roll-up tables.
+
+refresh_analytics() rebuilds AnalyticsSnapshot rows (one per day and per
+department, category and company) for the days that may have changed since
+the previous run:
+
+- every day from the previous run onwards (returns and new assignments are
+  stamped with the current time, asset edits take effect from today), and
+- any earlier day touched by an assignment created since then (tracked by
+  the highest assignment id seen, so back-dated entries are picked up).
+
+Past days are otherwise frozen: a snapshot records the grouping an asset had
+when the day was computed. ``full=True`` (``refresh_analytics --full``)
+recomputes everything, e.g. after history was edited in the admin.
+Assignments of archived assets are read from ArchivedAssignment (grouped by
+the ArchivedAsset), so a full recompute after archive_assets still counts
+them; the archived assets themselves are retired or deleted, and so out of
+service like any retired asset.
+
+Each refresh reads the assets once and the assignments overlapping the
+affected days once, and spreads them over days with running counts, so the
+cost does not grow with days x assets. Only completed days are snapshotted.
+
+The dashboard and export read the snapshots only (see rollup()).
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import F, Max, Min, OuterRef, Q, Subquery, Sum
+from django.utils import timezone
+
+from .models import AnalyticsRefreshState, AnalyticsSnapshot, ArchivedAssignment, Asset, AssetAssignment
+
+STATE_NAME = 'daily_snapshots'
+
+# Snapshot dimension -> Asset field (snapshots store lookup names)
+DIMENSIONS = {
+    'department': 'department__name',
+    'category': 'model_category',
+    'company': 'company__name',
+}
+
+SUM_FIELDS = (
+    'assigned_seconds', 'assignments_started', 'assignments_returned',
+    'returned_seconds', 'idle_gaps', 'idle_seconds',
+)
+
+BATCH_SIZE = 1000
+
+# Assignments live in the hot table until their asset is archived
+ASSIGNMENT_MODELS = (AssetAssignment, ArchivedAssignment)
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _local_day(moment):
+    return timezone.localdate(moment)
+
+
+class _Series:
+    """Per-group counters for a run of days, with running (delta) counters."""
+
+    def __init__(self):
+        self.sums = defaultdict(lambda: dict.fromkeys(SUM_FIELDS, 0))
+        self.base_assets = 0
+        self.asset_delta = defaultdict(int)
+        self.held_delta = defaultdict(int)
+        self.full_delta = defaultdict(int)
+        self.base_held = 0
+        self.base_full = 0
+
+
+class _Accumulator:
+    def __init__(self, start, end):
+        self.start = start
+        self.end = end
+        self.series = defaultdict(_Series)
+
+    def groups(self, values):
+        return [self.series[(dimension, value)] for dimension, value in zip(DIMENSIONS, values)]
+
+    def add_asset(self, created_at, values):
+        day = _local_day(created_at)
+        for series in self.groups(values):
+            if day < self.start:
+                series.base_assets += 1
+            else:
+                series.asset_delta[day] += 1
+
+    def add_assignment(self, assigned, returned, values):
+        range_start, range_end = _day_start(self.start), _day_start(self.end + timedelta(days=1))
+        groups = self.groups(values)
+
+        # Held at the end of day d  <=>  day(assigned) <= d < day(returned)
+        held_from = max(_local_day(assigned), self.start)
+        held_to = _local_day(returned) if returned else None
+        if held_to is None or held_to > held_from:
+            self._delta(groups, 'held', held_from, held_to)
+
+        # Seconds of each day covered: whole days via a running count,
+        # the partial first/last day directly
+        begin, finish = max(assigned, range_start), min(returned or range_end, range_end)
+        if finish > begin:
+            first, last = _local_day(begin), _local_day(finish)
+            if first == last:
+                self._add(groups, first, 'assigned_seconds', (finish - begin).total_seconds())
+            else:
+                full_from = first
+                if begin > _day_start(first):
+                    full_from = first + timedelta(days=1)
+                    self._add(groups, first, 'assigned_seconds', (_day_start(full_from) - begin).total_seconds())
+                if finish > _day_start(last) and last <= self.end:
+                    self._add(groups, last, 'assigned_seconds', (finish - _day_start(last)).total_seconds())
+                if full_from < last:
+                    self._delta(groups, 'full', full_from, last)
+
+        if assigned >= range_start:
+            self._add(groups, _local_day(assigned), 'assignments_started', 1)
+        if returned is not None and range_start <= returned < range_end:
+            day = _local_day(returned)
+            self._add(groups, day, 'assignments_returned', 1)
+            self._add(groups, day, 'returned_seconds', (returned - assigned).total_seconds())
+
+    def add_idle_gap(self, assigned, previous_returned, values):
+        if previous_returned is None or previous_returned > assigned:
+            return
+        day = _local_day(assigned)
+        groups = self.groups(values)
+        self._add(groups, day, 'idle_gaps', 1)
+        self._add(groups, day, 'idle_seconds', (assigned - previous_returned).total_seconds())
+
+    def _add(self, groups, day, field, amount):
+        for series in groups:
+            series.sums[day][field] += amount
+
+    def _delta(self, groups, kind, start, stop):
+        """+1 from ``start`` up to (not including) ``stop``; open-ended when stop is None."""
+        for series in groups:
+            if start <= self.start:
+                setattr(series, f'base_{kind}', getattr(series, f'base_{kind}') + 1)
+            else:
+                getattr(series, f'{kind}_delta')[start] += 1
+            if stop is not None and stop <= self.end:
+                getattr(series, f'{kind}_delta')[stop] -= 1
+
+    def snapshots(self):
+        days = (self.end - self.start).days + 1
+        for (dimension, value), series in self.series.items():
+            assets, held, full = series.base_assets, series.base_held, series.base_full
+            for offset in range(days):
+                day = self.start + timedelta(days=offset)
+                if offset:
+                    held += series.held_delta.get(day, 0)
+                    full += series.full_delta.get(day, 0)
+                assets += series.asset_delta.get(day, 0)
+                day_seconds = int((_day_start(day + timedelta(days=1)) - _day_start(day)).total_seconds())
+                sums = dict.fromkeys(SUM_FIELDS, 0)
+                if day in series.sums:
+                    sums.update({field: int(amount) for field, amount in series.sums[day].items()})
+                sums['assigned_seconds'] += full * day_seconds
+                if not (assets or held or any(sums.values())):
+                    continue
+                yield AnalyticsSnapshot(
+                    date=day, dimension=dimension, value=value, total_assets=assets,
+                    assigned_assets=held, day_seconds=day_seconds, **sums,
+                )
+
+
+def _compute(start, end):
+    accumulator = _Accumulator(start, end)
+    range_start, range_end = _day_start(start), _day_start(end + timedelta(days=1))
+    dimension_fields = list(DIMENSIONS.values())
+
+    in_service = Asset.objects.exclude(status='retired').filter(created_at__lt=range_end)
+    for created_at, *values in in_service.values_list('created_at', *dimension_fields).iterator(chunk_size=BATCH_SIZE):
+        accumulator.add_asset(created_at, values)
+
+    asset_fields = [f'asset__{field}' for field in dimension_fields]
+    for model in ASSIGNMENT_MODELS:
+        overlapping = model.objects.filter(
+            Q(returned_date__isnull=True) | Q(returned_date__gte=range_start),
+            assigned_date__lt=range_end,
+        ).order_by()
+        for assigned, returned, *values in overlapping.values_list(
+            'assigned_date', 'returned_date', *asset_fields
+        ).iterator(chunk_size=BATCH_SIZE):
+            accumulator.add_assignment(assigned, returned, values)
+
+        # An asset's assignments are all in one table, so the previous one is too
+        previous_return = model.objects.filter(
+            asset=OuterRef('asset'), assigned_date__lt=OuterRef('assigned_date'),
+        ).order_by('-assigned_date').values('returned_date')[:1]
+        started = (
+            model.objects
+            .filter(assigned_date__gte=range_start, assigned_date__lt=range_end)
+            .order_by()
+            .annotate(previous_returned=Subquery(previous_return))
+        )
+        for assigned, previous_returned, *values in started.values_list(
+            'assigned_date', 'previous_returned', *asset_fields
+        ).iterator(chunk_size=BATCH_SIZE):
+            accumulator.add_idle_gap(assigned, previous_returned, values)
+
+    return accumulator.snapshots()
+
+
+def _first_day():
+    moments = [Asset.objects.aggregate(first=Min('created_at'))['first']]
+    moments += [model.objects.aggregate(first=Min('assigned_date'))['first'] for model in ASSIGNMENT_MODELS]
+    moments = [moment for moment in moments if moment]
+    return _local_day(min(moments)) if moments else None
+
+
+def refresh_analytics(full=False, since=None):
+    """
+    Bring the daily snapshots up to date and return the number of days
+    recomputed. ``since`` (a date) forces a recompute from that day.
+    """
+    now = timezone.now()
+    last_day = _local_day(now) - timedelta(days=1)
+    state, _ = AnalyticsRefreshState.objects.get_or_create(name=STATE_NAME)
+    # Read before computing: anything created while we run is picked up next time
+    last_assignment_id = AssetAssignment.objects.aggregate(last=Max('id'))['last'] or 0
+
+    if full or state.last_run_at is None:
+        start = _first_day()
+    else:
+        start = _local_day(state.last_run_at)
+        backdated = AssetAssignment.objects.filter(pk__gt=state.last_assignment_id).aggregate(
+            first=Min('assigned_date'),
+        )['first']
+        if backdated is not None:
+            start = min(start, _local_day(backdated))
+    if since is not None:
+        start = min(start, since) if start else since
+
+    days = 0
+    if start is not None and start <= last_day:
+        snapshots = _compute(start, last_day)
+        with transaction.atomic():
+            AnalyticsSnapshot.objects.filter(date__gte=start, date__lte=last_day).delete()
+            AnalyticsSnapshot.objects.bulk_create(snapshots, batch_size=BATCH_SIZE)
+        days = (last_day - start).days + 1
+
+    state.last_run_at = now
+    state.last_assignment_id = last_assignment_id
+    state.save()
+    return days
+
+
+def rollup(dimension, start, end):
+    """
+    Roll the snapshots of one dimension up over [start, end]: one dict per
+    value with the summed counters and the derived rates. Reads only the
+    snapshot table (two queries).
+    """
+    snapshots = AnalyticsSnapshot.objects.filter(dimension=dimension, date__gte=start, date__lte=end)
+    rows = (
+        snapshots
+        .values('value')
+        .annotate(
+            # Asset-seconds in service: total_assets * length of each day
+            capacity_seconds=Sum(F('total_assets') * F('day_seconds')),
+            last_date=Max('date'),
+            **{field: Sum(field) for field in SUM_FIELDS},
+        )
+        .order_by('value')
+    )
+    rows = list(rows)
+    # In-service asset count on the last snapshotted day of each value
+    latest = {
+        (value, day): total for value, day, total in
+        snapshots.filter(date__in={row['last_date'] for row in rows}).values_list('value', 'date', 'total_assets')
+    }
+
+    labels = dict(Asset.CATEGORY_CHOICES) if dimension == 'category' else {}
+    results = []
+    for row in rows:
+        total_assets = latest.get((row['value'], row['last_date']), 0)
+        capacity = row['capacity_seconds']
+        results.append({
+            **row,
+            'label': labels.get(row['value'], row['value']),
+            'total_assets': total_assets,
+            'utilisation': row['assigned_seconds'] / capacity if capacity else None,
+            'avg_assignment_days': (
+                row['returned_seconds'] / row['assignments_returned'] / 86400 if row['assignments_returned'] else None
+            ),
+            'avg_idle_days': row['idle_seconds'] / row['idle_gaps'] / 86400 if row['idle_gaps'] else None,
+            # Assignments started per in-service asset over the period
+            'turnover': row['assignments_started'] / total_assets if total_assets else None,
+        })
+    return results
+
+
+ANALYTICS_EXPORT_HEADERS = [
+    'Value', 'In-Service Assets', 'Utilisation (%)', 'Avg Assignment (days)', 'Avg Idle (days)',
+    'Turnover', 'Assignments Started', 'Assignments Returned',
+]
+
+
+def _rounded(value, factor=1):
+    return round(value * factor, 2) if value is not None else ''
+
+
+def analytics_export_rows(rows):
+    """Rows for the analytics CSV export, from rollup() results."""
+    for row in rows:
+        yield [
+            row['label'], row['total_assets'], _rounded(row['utilisation'], 100),
+            _rounded(row['avg_assignment_days']), _rounded(row['avg_idle_days']), _rounded(row['turnover']),
+            row['assignments_started'], row['assignments_returned'],
+        ]
@@ -0,0 +1,255 @@
+"""
+Read-only JSON API for assets, assignments and user profiles.
+
+- Authentication is the regular session login; visibility follows the same
+  rules as the HTML views (see access.py: admins and asset incharges see
+  everything, department-scoped incharges their department's assets,
+  regular users only their own assets, assignments and profile).
+- Lists use the same keyset pagination as asset_list: pass the ``next`` or
+  ``previous`` token back as ``?cursor=``; ``?page_size=`` is clamped to
+  ASSET_LIST_MAX_PAGE_SIZE.
+- ``?fields=serial_number,status`` limits each object to the listed fields.
+- ``/api/assets/`` takes the asset_list filters, including ``?department=``
+  and ``?company=`` (lookup ids).
+- ``/api/assignments/?as_of=2024-03-31`` returns the assignments that were
+  open at that moment (see history.py).
+- ``/api/autocomplete/?q=lap`` returns search suggestions from the
+  in-process prefix index (see autocomplete.py); it is not paginated.
+- Every response carries an ETag derived from one aggregate query (latest
+  change time and row count of the visible set) and the pages version,
+  which renaming a user, department or company bumps (see
+  conditional.py). Clients that send If-None-Match get a 304 without the
+  page being fetched or serialized.
+- The views are async and use the async ORM (see asset_management/asgi.py).
+"""
+from functools import wraps
+
+from django.db.models import Count, Max
+from django.http import Http404, JsonResponse
+from django.shortcuts import aget_object_or_404
+from django.views.decorators.http import require_GET
+
+from .access import visible_assets, visible_assignments, visible_profiles
+from .autocomplete import asuggest
+from .conditional import acondition, apages_version, make_etag
+from .history import held_at, parse_as_of
+from .middleware import aresolve_role
+from .pagination import apaginate
+from .search import aget_search_backend, apply_field_filters, parse_id
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+ASSET_FIELDS = {
+    'serial_number': lambda asset: asset.serial_number,
+    'display_name': lambda asset: asset.display_name,
+    'department': lambda asset: asset.department.name,
+    'model_category': lambda asset: asset.model_category,
+    'status': lambda asset: asset.status,
+    'company': lambda asset: asset.company.name,
+    'assigned_user': lambda asset: asset.assigned_user.username if asset.assigned_user_id else None,
+    'created_at': lambda asset: _iso(asset.created_at),
+    'updated_at': lambda asset: _iso(asset.updated_at),
+}
+
+ASSIGNMENT_FIELDS = {
+    'id': lambda assignment: assignment.pk,
+    'asset': lambda assignment: assignment.asset.serial_number,
+    'assigned_to': lambda assignment: assignment.assigned_to.username,
+    'assigned_by': lambda assignment: assignment.assigned_by.username,
+    'assigned_date': lambda assignment: _iso(assignment.assigned_date),
+    'returned_date': lambda assignment: _iso(assignment.returned_date),
+    'notes': lambda assignment: assignment.notes,
+}
+
+PROFILE_FIELDS = {
+    'username': lambda profile: profile.user.username,
+    'first_name': lambda profile: profile.user.first_name,
+    'last_name': lambda profile: profile.user.last_name,
+    'email': lambda profile: profile.user.email,
+    'role': lambda profile: profile.role,
+    'employee_id': lambda profile: profile.employee_id,
+    'department': lambda profile: profile.department.name,
+    'phone': lambda profile: profile.phone,
+}
+
+
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_MAX_LIMIT = 50
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def api_view(view_func):
+    """Require a logged-in user and turn ApiError/Http404 into JSON error responses."""
+    @wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        await aresolve_role(request)
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'Authentication required.'}, status=401)
+        try:
+            response = await view_func(request, *args, **kwargs)
+        except ApiError as exc:
+            return JsonResponse({'error': exc.message}, status=exc.status)
+        except Http404:
+            return JsonResponse({'error': 'Not found.'}, status=404)
+        # Clients may keep a copy but must revalidate it (cheaply, via ETag)
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+    return wrapper
+
+
+def _selected_fields(request, available):
+    requested = request.GET.get('fields')
+    if not requested:
+        return list(available)
+    fields = [field.strip() for field in requested.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in available]
+    if unknown:
+        raise ApiError(f"Unknown field(s): {', '.join(unknown)}. Available: {', '.join(available)}.")
+    return fields
+
+
+def _serialize(obj, fields, available):
+    return {field: available[field](obj) for field in fields}
+
+
+def _page_response(request, page, available):
+    fields = _selected_fields(request, available)
+    return JsonResponse({
+        'results': [_serialize(obj, fields, available) for obj in page],
+        'next': page.next_cursor,
+        'previous': page.prev_cursor,
+    })
+
+
+async def _filtered_assets(request):
+    """Apply the asset_list filters (search, status, category, department, company) to the visible assets."""
+    assets = visible_assets(request)
+    search_query = request.GET.get('search')
+    if search_query:
+        assets = (await aget_search_backend()).search(assets, search_query)
+    return apply_field_filters(
+        assets, request.GET.get('status'), request.GET.get('category'),
+        parse_id(request.GET.get('department')), parse_id(request.GET.get('company')),
+    )
+
+
+def _filtered_assignments(request):
+    assignments = visible_assignments(request)
+    if request.GET.get('asset'):
+        assignments = assignments.filter(asset__serial_number=request.GET['asset'])
+    if request.GET.get('open') == 'true':
+        assignments = assignments.filter(returned_date__isnull=True)
+    if request.GET.get('as_of'):
+        moment = parse_as_of(request.GET['as_of'])
+        if moment is None:
+            raise ApiError("as_of must be an ISO 8601 date or datetime.")
+        assignments = held_at(moment, assignments)
+    return assignments
+
+
+# --- ETag functions (run before the view; a match short-circuits to 304) ---
+
+async def asset_list_etag(request):
+    state = await (await _filtered_assets(request)).order_by().aaggregate(last=Max('updated_at'), count=Count('id'))
+    return make_etag(request, await apages_version(), state['last'], state['count'])
+
+
+async def asset_detail_etag(request, serial_number):
+    updated_at = await visible_assets(request).filter(serial_number=serial_number).values_list('updated_at', flat=True).afirst()
+    return make_etag(request, await apages_version(), updated_at) if updated_at else None
+
+
+async def assignment_list_etag(request):
+    # The payload shows each assignment's asset serial number, so an edited
+    # asset changes the ETag too
+    state = await _filtered_assignments(request).order_by().aaggregate(
+        last_assigned=Max('assigned_date'), last_returned=Max('returned_date'),
+        last_asset_change=Max('asset__updated_at'), count=Count('id'),
+    )
+    return make_etag(
+        request, await apages_version(),
+        state['last_assigned'], state['last_returned'], state['last_asset_change'], state['count'],
+    )
+
+
+# --- Views ---
+
+@api_view
+@require_GET
+@acondition(asset_list_etag)
+async def asset_list(request):
+    search_query = request.GET.get('search')
+    page = await apaginate(
+        (await _filtered_assets(request)).select_related('assigned_user', 'department', 'company'),
+        cursor=request.GET.get('cursor'),
+        page_size=request.GET.get('page_size'),
+        rank='search_rank' if search_query else None,
+    )
+    return _page_response(request, page, ASSET_FIELDS)
+
+
+@api_view
+@require_GET
+@acondition(asset_detail_etag)
+async def asset_detail(request, serial_number):
+    asset = await aget_object_or_404(
+        visible_assets(request).select_related('assigned_user', 'department', 'company'), serial_number=serial_number,
+    )
+    fields = _selected_fields(request, ASSET_FIELDS)
+    return JsonResponse(_serialize(asset, fields, ASSET_FIELDS))
+
+
+@api_view
+@require_GET
+@acondition(assignment_list_etag)
+async def assignment_list(request):
+    page = await apaginate(
+        _filtered_assignments(request).select_related('asset', 'assigned_to', 'assigned_by'),
+        cursor=request.GET.get('cursor'),
+        page_size=request.GET.get('page_size'),
+        date_field='assigned_date',
+    )
+    return _page_response(request, page, ASSIGNMENT_FIELDS)
+
+
+@api_view
+@require_GET
+async def profile_list(request):
+    page = await apaginate(
+        visible_profiles(request).select_related('user', 'department'),
+        cursor=request.GET.get('cursor'),
+        page_size=request.GET.get('page_size'),
+        date_field=None,
+    )
+    return _page_response(request, page, PROFILE_FIELDS)
+
+
+@api_view
+@require_GET
+async def autocomplete(request):
+    prefix = request.GET.get('q', '').strip()
+    try:
+        limit = max(1, min(int(request.GET.get('limit', AUTOCOMPLETE_LIMIT)), AUTOCOMPLETE_MAX_LIMIT))
+    except ValueError:
+        raise ApiError("limit must be an integer.")
+    if not prefix:
+        return JsonResponse({'results': []})
+
+    if request.user_role.is_admin_or_incharge and request.user_role.department_id is None:
+        results = await asuggest(prefix, limit)
+    else:
+        # Regular users and department-scoped incharges only see some of the
+        # assets, so the shared index is not used
+        results = await asuggest(
+            prefix, limit, assets=visible_assets(request), include_users=request.user_role.is_admin_or_incharge,
+        )
+    return JsonResponse({'results': results})
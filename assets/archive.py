@@ -0,0 +1,109 @@
+"""
+Archive tier: retired and deleted assets leave the hot Asset table.
+
+archive_assets() moves assets, with their assignments, into ArchivedAsset
+and ArchivedAssignment in batches of ARCHIVE_BATCH_SIZE, one transaction
+each: the rows are read once, bulk-inserted into the archive tables, and the
+originals deleted (their assignments go with them). Ids are kept, so the
+audit log still points at the right asset. An assignment still open is
+closed on the way.
+
+- Deleting an asset (asset_delete, the admin) archives it at once with
+  reason 'deleted', instead of dropping its assignment history.
+- Retired assets are archived by the archive_assets command (run nightly,
+  see crontab) once they have been retired for
+  ASSET_ARCHIVE_RETIRED_AFTER_DAYS, so a mistaken retirement can still be
+  undone from the edit page in the meantime.
+
+Everything else reads the hot tables only. The asset list and the exports
+include archived assets on request (``?archived=1``, see filter_archived()).
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .audit import deletes_recorded_as
+from .models import ArchivedAsset, ArchivedAssignment, Asset, AssetAssignment
+from .search import apply_field_filters, search_rank
+
+ARCHIVE_BATCH_SIZE = 500
+
+DELETED_NOTE = "\n(Automatically returned: asset deleted)"
+
+ASSET_FIELDS = [
+    'id', 'serial_number', 'display_name', 'department_id', 'model_category', 'status', 'company_id',
+    'created_at', 'updated_at', 'search_text',
+]
+ASSIGNMENT_FIELDS = ['id', 'asset_id', 'assigned_to_id', 'assigned_by_id', 'assigned_date', 'returned_date', 'notes']
+
+
+def get_retired_after_days():
+    return getattr(settings, 'ASSET_ARCHIVE_RETIRED_AFTER_DAYS', 30)
+
+
+def archive_assets(assets, reason, archived_by=None):
+    """
+    Move the assets of the queryset ``assets`` to the archive tables with
+    ``reason`` ('retired' or 'deleted'); return how many were moved.
+    """
+    moved = 0
+    while True:
+        with transaction.atomic():
+            pks = list(assets.select_for_update().order_by('pk').values_list('pk', flat=True)[:ARCHIVE_BATCH_SIZE])
+            if not pks:
+                return moved
+            _move(pks, reason, archived_by)
+        moved += len(pks)
+
+
+def _move(pks, reason, archived_by):
+    now = timezone.now()
+    archived_assets = []
+    for values in Asset.objects.filter(pk__in=pks).values(*ASSET_FIELDS):
+        if values['status'] == 'assigned':
+            # Its assignment is closed below
+            values['status'] = 'available'
+        archived_assets.append(ArchivedAsset(**values, reason=reason, archived_at=now, archived_by=archived_by))
+    ArchivedAsset.objects.bulk_create(archived_assets)
+
+    archived_assignments = []
+    for values in AssetAssignment.objects.filter(asset_id__in=pks).values(*ASSIGNMENT_FIELDS):
+        if values['returned_date'] is None:
+            values['returned_date'] = now
+            values['notes'] += DELETED_NOTE
+        archived_assignments.append(ArchivedAssignment(**values))
+    ArchivedAssignment.objects.bulk_create(archived_assignments, batch_size=ARCHIVE_BATCH_SIZE)
+
+    # The assignments go first, without their per-row delete signals (each
+    # would look its asset up again); the assets' own delete signals drop
+    # the cached counts, fragments and suggestions, and log the event.
+    Asset.objects.filter(pk__in=pks).update(current_assignment=None)
+    assignments = AssetAssignment.objects.filter(asset_id__in=pks)
+    assignments._raw_delete(assignments.db)
+    with deletes_recorded_as('archive' if reason == 'retired' else 'delete'):
+        Asset.objects.filter(pk__in=pks).delete()
+
+
+def delete_asset(asset, user=None):
+    """Remove ``asset`` from the hot set, keeping it and its history in the archive."""
+    return archive_assets(Asset.objects.filter(pk=asset.pk), 'deleted', archived_by=user)
+
+
+def archive_retired(days=None):
+    """Archive assets retired (and untouched) for more than ``days``; return how many."""
+    days = get_retired_after_days() if days is None else days
+    cutoff = timezone.now() - timedelta(days=days)
+    return archive_assets(Asset.objects.filter(status='retired', updated_at__lt=cutoff), 'retired')
+
+
+def filter_archived(search_query, status_filter, category_filter, department_id=None, company_id=None):
+    """
+    The archived assets matching the asset list filters. The archive has no
+    search index: a search scans search_text, which is fine for an opt-in.
+    """
+    archived = ArchivedAsset.objects.all()
+    if search_query:
+        archived = archived.filter(search_text__icontains=search_query).annotate(search_rank=search_rank(search_query))
+    return apply_field_filters(archived, status_filter, category_filter, department_id, company_id)
@@ -0,0 +1,350 @@
+"""
+Append-only audit log of asset changes (AssetEvent).
+
+Every change produces one event: create, update (with a field diff),
+assign, return, retire and delete. Model signals (assets.signals) record
+changes made through save()/delete(); the bulk services and the importer,
+which bypass signals, record their own. The user comes from the request
+being handled (AuditActorMiddleware).
+
+Writes are off the request path: an event is queued once its transaction
+commits (a rolled-back change leaves no event) and a background thread
+inserts the queue with bulk_create every ASSET_AUDIT_FLUSH_INTERVAL seconds,
+or as soon as ASSET_AUDIT_BATCH_SIZE events are waiting. Queued events are
+flushed at interpreter exit, and timeline() includes the ones not written
+yet, so a user sees their own change immediately. An interval of 0 writes
+synchronously on commit.
+
+Events older than ASSET_AUDIT_ARCHIVE_AFTER_DAYS are moved by
+archive_events() into AssetEventArchive, one row per asset and month.
+"""
+import atexit
+import contextvars
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .lookups import lookup_name
+from .models import Asset, AssetEvent, AssetEventArchive, Company, Department
+
+logger = logging.getLogger(__name__)
+
+# Fields whose changes are logged. Assignment fields are covered by the
+# assign/return events instead.
+AUDITED_FIELDS = ['serial_number', 'display_name', 'department', 'model_category', 'status', 'company']
+# Their attribute names: the values compared are read by these keys
+AUDITED_ATTNAMES = [Asset._meta.get_field(field).attname for field in AUDITED_FIELDS]
+# Lookup foreign keys among them are compared by id and logged by name
+LOOKUP_FIELDS = {'department': Department, 'company': Company}
+
+TIMELINE_LIMIT = 50
+ARCHIVE_BATCH_SIZE = 500
+
+
+def get_batch_size():
+    return getattr(settings, 'ASSET_AUDIT_BATCH_SIZE', 200)
+
+
+def get_flush_interval():
+    return getattr(settings, 'ASSET_AUDIT_FLUSH_INTERVAL', 2.0)
+
+
+def get_archive_after_days():
+    return getattr(settings, 'ASSET_AUDIT_ARCHIVE_AFTER_DAYS', 365)
+
+
+# --- Who is making the change ---
+
+_current_request = contextvars.ContextVar('assets_audit_request', default=None)
+
+
+class AuditActorMiddleware:
+    """Make the request's user the actor of the events it causes. Goes after AuthenticationMiddleware."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _current_request.set(request)
+        try:
+            return self.get_response(request)
+        finally:
+            _current_request.reset(token)
+
+    async def __acall__(self, request):
+        # Sync code called from the view (signals) runs with a copy of this context
+        token = _current_request.set(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            _current_request.reset(token)
+
+
+def current_actor_id():
+    request = _current_request.get()
+    user = getattr(request, 'user', None)
+    return user.pk if user is not None and user.is_authenticated else None
+
+
+# --- Buffered writes ---
+
+class EventBuffer:
+    """Thread-safe queue of unsaved AssetEvents, written in batches by a daemon thread."""
+
+    def __init__(self):
+        self._queued = []
+        # Taken from the queue by a flush that has not committed yet
+        self._in_flight = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def add(self, events):
+        interval = get_flush_interval()
+        with self._lock:
+            self._queued.extend(events)
+            full = len(self._queued) >= get_batch_size()
+        if not interval:
+            self.flush()
+            return
+        self._ensure_thread(interval)
+        if full:
+            self._wakeup.set()
+
+    def pending(self):
+        with self._lock:
+            return self._in_flight + self._queued
+
+    def flush(self):
+        """Write every queued event; return how many were written."""
+        with self._flush_lock:
+            with self._lock:
+                events, self._queued = self._queued, []
+                self._in_flight = events
+            if not events:
+                return 0
+            try:
+                AssetEvent.objects.bulk_create(events, batch_size=get_batch_size())
+            except Exception:
+                logger.exception("Writing %d audit events failed; they will be retried", len(events))
+                with self._lock:
+                    self._queued = events + self._queued
+                return 0
+            finally:
+                with self._lock:
+                    self._in_flight = []
+            return len(events)
+
+    def _ensure_thread(self, interval):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, args=(interval,), name='audit-flush', daemon=True)
+            self._thread.start()
+
+    def _run(self, interval):
+        while True:
+            self._wakeup.wait(interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            finally:
+                # The flush thread has its own database connection; do not leak it
+                connections.close_all()
+
+
+buffer = EventBuffer()
+atexit.register(buffer.flush)
+
+
+def record_events(events):
+    """Queue unsaved AssetEvents once the current transaction commits."""
+    if events:
+        transaction.on_commit(lambda: buffer.add(events))
+
+
+def make_event(asset_pk, serial_number, action, changes=None, actor_id=None, when=None):
+    return AssetEvent(
+        asset_id=asset_pk,
+        serial_number=serial_number,
+        action=action,
+        actor_id=actor_id if actor_id is not None else current_actor_id(),
+        changes=changes or {},
+        created_at=when or timezone.now(),
+    )
+
+
+def record(asset, action, changes=None):
+    record_events([make_event(asset.pk, asset.serial_number, action, changes)])
+
+
+# --- What changed ---
+
+def field_changes(old_values, new_values, fields=AUDITED_FIELDS):
+    """
+    {field: [old, new]} for the fields that differ; None stands for a missing
+    side. The values are keyed by attribute name (department_id).
+    """
+    changes = {}
+    for field in fields:
+        attname = f'{field}_id' if field in LOOKUP_FIELDS else field
+        old = old_values.get(attname) if old_values is not None else None
+        new = new_values.get(attname) if new_values is not None else None
+        if old != new:
+            changes[field] = [old, new]
+    for field, model in LOOKUP_FIELDS.items():
+        if field in changes:
+            changes[field] = [lookup_name(model, pk) for pk in changes[field]]
+    return changes
+
+
+def record_asset_save(asset, created):
+    if created:
+        record(asset, 'create', field_changes(None, asset.__dict__))
+        return
+    loaded = getattr(asset, '_loaded_values', None)
+    if loaded is None:
+        return
+    changes = field_changes(loaded, asset.__dict__)
+    retired = changes.get('status', [None, None])[1] == 'retired'
+    if asset.status == 'assigned' and loaded.get('current_assignment_id') != asset.current_assignment_id:
+        # 'assigned' follows from the assign event; the status an asset is
+        # returned to (available, maintenance) is logged as an update
+        changes.pop('status', None)
+    if changes:
+        record(asset, 'retire' if retired else 'update', changes)
+
+
+# Action recorded for Asset deletions; assets.archive moves retired assets
+# out of the table as 'archive'
+_delete_action = contextvars.ContextVar('assets_audit_delete_action', default='delete')
+
+
+@contextmanager
+def deletes_recorded_as(action):
+    token = _delete_action.set(action)
+    try:
+        yield
+    finally:
+        _delete_action.reset(token)
+
+
+def record_asset_delete(asset):
+    record(asset, _delete_action.get(), field_changes(asset.__dict__, None))
+
+
+def record_assignment_save(assignment, created):
+    loaded = getattr(assignment, '_loaded_values', {})
+    if created:
+        action = 'assign'
+        changes = {'assigned_to': [None, assignment.assigned_to.username]}
+        if assignment.notes:
+            changes['notes'] = [None, assignment.notes]
+    elif assignment.returned_date and not loaded.get('returned_date'):
+        action = 'return'
+        changes = {'assigned_to': [assignment.assigned_to.username, None]}
+    else:
+        return
+    asset = assignment.asset
+    record_events([make_event(asset.pk, asset.serial_number, action, changes, when=assignment.returned_date or assignment.assigned_date)])
+
+
+# --- Reading ---
+
+def timeline(asset, limit=TIMELINE_LIMIT):
+    """
+    The asset's latest events, newest first: one range scan over
+    asset_event_timeline_idx, plus this process's events not written yet.
+    """
+    pending = [event for event in buffer.pending() if event.asset_id == asset.pk]
+    return _merge(pending, list(_stored_events(asset, limit)), limit)
+
+
+async def atimeline(asset, limit=TIMELINE_LIMIT):
+    """timeline() for async views."""
+    pending = [event for event in buffer.pending() if event.asset_id == asset.pk]
+    return _merge(pending, [event async for event in _stored_events(asset, limit)], limit)
+
+
+def _stored_events(asset, limit):
+    return AssetEvent.objects.filter(asset=asset).select_related('actor').order_by('-created_at', '-id')[:limit]
+
+
+def _merge(pending, stored, limit):
+    # An event written between the two reads is in both
+    stored_keys = {(event.created_at, event.action) for event in stored}
+    events = [event for event in pending if (event.created_at, event.action) not in stored_keys] + stored
+    events.sort(key=lambda event: event.created_at, reverse=True)
+    return events[:limit]
+
+
+# --- Archiving ---
+
+def _month(moment):
+    return timezone.localtime(moment).date().replace(day=1)
+
+
+def archive_cutoff(days=None):
+    """Start of the month that contains the moment ``days`` ago; older events get archived."""
+    days = get_archive_after_days() if days is None else days
+    moment = timezone.localtime(timezone.now() - timedelta(days=days))
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def archive_events(days=None):
+    """
+    Move whole months of events older than ``days`` (default
+    ASSET_AUDIT_ARCHIVE_AFTER_DAYS) into AssetEventArchive. Runs in batches
+    of assets, one transaction each; returns the number of events moved.
+    """
+    cutoff = archive_cutoff(days)
+    old_events = AssetEvent.objects.filter(created_at__lt=cutoff)
+    moved = 0
+    while True:
+        asset_ids = list(old_events.order_by('asset_id').values_list('asset_id', flat=True).distinct()[:ARCHIVE_BATCH_SIZE])
+        if not asset_ids:
+            return moved
+        with transaction.atomic():
+            months = {}
+            event_ids = []
+            events = old_events.filter(asset_id__in=asset_ids).select_related('actor').order_by('created_at', 'id')
+            for event in events:
+                entry = months.setdefault((event.asset_id, _month(event.created_at)), [event.serial_number, []])
+                entry[1].append([event.created_at.isoformat(), event.action, event.actor.username if event.actor else None, event.changes])
+                event_ids.append(event.pk)
+
+            existing = {
+                (archive.asset_id, archive.month): archive
+                for archive in AssetEventArchive.objects.select_for_update().filter(
+                    asset_id__in=asset_ids, month__in={month for _, month in months},
+                )
+            }
+            new_archives = []
+            for (asset_id, month), (serial_number, month_events) in months.items():
+                archive = existing.get((asset_id, month))
+                if archive is None:
+                    new_archives.append(AssetEventArchive(
+                        asset_id=asset_id, serial_number=serial_number, month=month,
+                        event_count=len(month_events), events=month_events,
+                    ))
+                else:
+                    archive.events = sorted(archive.events + month_events, key=lambda entry: entry[0])
+                    archive.event_count = len(archive.events)
+            AssetEventArchive.objects.bulk_create(new_archives)
+            AssetEventArchive.objects.bulk_update(existing.values(), ['events', 'event_count'])
+            for start in range(0, len(event_ids), ARCHIVE_BATCH_SIZE):
+                AssetEvent.objects.filter(pk__in=event_ids[start:start + ARCHIVE_BATCH_SIZE]).delete()
+        moved += len(event_ids)
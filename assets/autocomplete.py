@@ -0,0 +1,332 @@
+"""
+In-process prefix index for search-as-you-type suggestions.
+
+The index is a sorted list of (casefolded text, kind, text) tuples, so the
+suggestions for a prefix are found with one bisect plus a short forward scan,
+without touching the database. Kinds are 'serial', 'name', 'department' and
+'user' (usernames); departments and usernames come from their own tables.
+
+- It is built in a background thread on first use (requests fall back to a
+  small database query until it is ready) and rebuilt the same way once it
+  is older than ASSET_AUTOCOMPLETE_MAX_AGE, which bounds staleness from
+  writes made by other processes.
+- Model signals (assets.signals) keep it current for writes made in this
+  process; bulk writes that bypass signals call reset_index().
+- Memory is bounded by ASSET_AUTOCOMPLETE_MAX_ENTRIES distinct values. The
+  build keeps the newest assets first; when later inserts overflow the
+  budget, the least recently used entries (added or suggested longest ago)
+  are evicted, so a value just added is not dropped before an old one
+  nobody looks for. An evicted value is only missing from suggestions: the
+  full search still finds it.
+"""
+import bisect
+import heapq
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connections
+
+from .models import Asset, Department
+
+logger = logging.getLogger(__name__)
+
+KINDS = ('serial', 'name', 'department', 'user')
+
+# Asset field behind each asset-derived kind
+ASSET_KIND_FIELDS = {
+    'serial': 'serial_number',
+    'name': 'display_name',
+}
+
+BUILD_CHUNK_SIZE = 5000
+
+
+def get_max_entries():
+    return getattr(settings, 'ASSET_AUTOCOMPLETE_MAX_ENTRIES', 200000)
+
+
+def get_max_age():
+    return getattr(settings, 'ASSET_AUTOCOMPLETE_MAX_AGE', 600)
+
+
+class PrefixIndex:
+    """Sorted prefix index over (kind, text) values with reference counts."""
+
+    def __init__(self, max_entries=None):
+        self.max_entries = max_entries or get_max_entries()
+        self.built_at = time.monotonic()
+        self._keys = []
+        # (kind, text) -> number of rows carrying the value
+        self._refs = {}
+        # (kind, text) -> tick of its last use (added or suggested); loaded
+        # entries count as used before any later one, in load order
+        self._used = {}
+        self._clock = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._refs)
+
+    def add(self, kind, text):
+        if not text:
+            return
+        entry = (kind, text)
+        with self._lock:
+            if entry in self._refs:
+                self._refs[entry] += 1
+                return
+            bisect.insort(self._keys, (text.casefold(), kind, text))
+            self._refs[entry] = 1
+            self._use(entry)
+            if len(self._refs) > self.max_entries:
+                self._evict()
+
+    def remove(self, kind, text):
+        if not text:
+            return
+        entry = (kind, text)
+        with self._lock:
+            refs = self._refs.get(entry)
+            if refs is None:
+                return
+            if refs > 1:
+                self._refs[entry] = refs - 1
+                return
+            self._drop(entry)
+
+    def load(self, entries):
+        """
+        Fill an empty index from an iterable of (kind, text) in one sort,
+        stopping once the entry budget is reached.
+        """
+        refs = {}
+        for kind, text in entries:
+            if not text:
+                continue
+            entry = (kind, text)
+            if entry in refs:
+                refs[entry] += 1
+            elif len(refs) < self.max_entries:
+                refs[entry] = 1
+        with self._lock:
+            self._refs = refs
+            self._keys = sorted((text.casefold(), kind, text) for kind, text in refs)
+            # Users, departments and the newest assets come first: they are
+            # the most recently used, below zero so that any later use is newer
+            self._used = {entry: -position for position, entry in enumerate(refs)}
+            self._clock = 0
+
+    def search(self, prefix, limit=10, kinds=None):
+        """Return up to ``limit`` (kind, text) values starting with ``prefix`` (case-insensitive)."""
+        folded = prefix.casefold()
+        results = []
+        with self._lock:
+            position = bisect.bisect_left(self._keys, (folded,))
+            while position < len(self._keys) and len(results) < limit:
+                key, kind, text = self._keys[position]
+                if not key.startswith(folded):
+                    break
+                if kinds is None or kind in kinds:
+                    results.append((kind, text))
+                    self._use((kind, text))
+                position += 1
+        return results
+
+    def _use(self, entry):
+        self._clock += 1
+        self._used[entry] = self._clock
+
+    def _drop(self, entry):
+        kind, text = entry
+        position = bisect.bisect_left(self._keys, (text.casefold(), kind, text))
+        if position < len(self._keys) and self._keys[position] == (text.casefold(), kind, text):
+            del self._keys[position]
+        self._refs.pop(entry, None)
+        self._used.pop(entry, None)
+
+    def _evict(self):
+        """Drop the least recently used tenth of the entries (caller holds the lock)."""
+        count = max(1, self.max_entries // 10)
+        for entry in heapq.nsmallest(count, self._refs, key=self._used.__getitem__):
+            self._drop(entry)
+
+
+def _database_entries():
+    """(kind, text) for every username and department, then for the assets, newest first."""
+    for username in User.objects.values_list('username', flat=True).iterator(chunk_size=BUILD_CHUNK_SIZE):
+        yield 'user', username
+    for name in Department.objects.values_list('name', flat=True):
+        yield 'department', name
+    fields = list(ASSET_KIND_FIELDS.values())
+    assets = Asset.objects.order_by('-created_at', '-id').values_list(*fields)
+    for values in assets.iterator(chunk_size=BUILD_CHUNK_SIZE):
+        yield from zip(ASSET_KIND_FIELDS, values)
+
+
+def build_index(max_entries=None):
+    """Build a PrefixIndex from the database (usernames first, then the newest assets)."""
+    index = PrefixIndex(max_entries)
+    index.load(_database_entries())
+    index.built_at = time.monotonic()
+    return index
+
+
+# --- Process-wide index ---
+
+_index = None
+_building = False
+# Changes seen while a rebuild runs, replayed onto the new index
+_pending = []
+# Bumped by reset_index() so a build started before the reset is discarded
+_generation = 0
+_state_lock = threading.Lock()
+
+
+def _build_in_background():
+    global _index, _building
+    generation = _generation
+    try:
+        index = build_index()
+        with _state_lock:
+            if generation == _generation:
+                for method, kind, text in _pending:
+                    getattr(index, method)(kind, text)
+                _index = index
+            _pending.clear()
+    except Exception:
+        logger.exception("Building the autocomplete index failed")
+    finally:
+        with _state_lock:
+            _building = False
+        # The build thread has its own database connection; do not leak it
+        connections.close_all()
+
+
+def get_index():
+    """
+    Return the ready index, or None while the first build is running. Starts
+    a background (re)build when there is no index or it is too old.
+    """
+    global _building
+    index = _index
+    if index is None or time.monotonic() - index.built_at > get_max_age():
+        with _state_lock:
+            if not _building:
+                _building = True
+                threading.Thread(target=_build_in_background, name='autocomplete-index', daemon=True).start()
+    return index
+
+
+def reset_index():
+    """Forget the index (e.g. after a bulk import); it is rebuilt on next use."""
+    global _index, _generation
+    with _state_lock:
+        _index = None
+        _generation += 1
+        _pending.clear()
+
+
+def _apply(method, kind, text):
+    with _state_lock:
+        index = _index
+        if _building:
+            _pending.append((method, kind, text))
+    if index is not None:
+        getattr(index, method)(kind, text)
+
+
+def index_add(kind, text):
+    _apply('add', kind, text)
+
+
+def index_remove(kind, text):
+    _apply('remove', kind, text)
+
+
+def record_asset_change(old_values, new_values):
+    """
+    Update the index for one asset. ``old_values``/``new_values`` map field
+    names to values; pass None for a created or deleted asset.
+    """
+    for kind, field in ASSET_KIND_FIELDS.items():
+        old = old_values.get(field) if old_values else None
+        new = new_values.get(field) if new_values else None
+        if old == new:
+            continue
+        if old:
+            index_remove(kind, old)
+        if new:
+            index_add(kind, new)
+
+
+def suggest(prefix, limit=10, assets=None, include_users=True):
+    """
+    Return up to ``limit`` suggestions as dicts with 'value' and 'kind'.
+
+    ``assets`` restricts suggestions to a queryset (used for regular users,
+    who only see their own assets); those are answered from the database.
+    """
+    kinds = set(KINDS) if include_users else set(KINDS) - {'user'}
+    index = get_index() if assets is None else None
+    if index is not None:
+        matches = index.search(prefix, limit, kinds)
+    else:
+        matches = _database_suggestions(prefix, limit, assets, kinds)
+    return [{'value': text, 'kind': kind} for kind, text in matches]
+
+
+async def asuggest(prefix, limit=10, assets=None, include_users=True):
+    """suggest() for async views."""
+    kinds = set(KINDS) if include_users else set(KINDS) - {'user'}
+    index = get_index() if assets is None else None
+    if index is not None:
+        matches = index.search(prefix, limit, kinds)
+    else:
+        matches = await _adatabase_suggestions(prefix, limit, assets, kinds)
+    return [{'value': text, 'kind': kind} for kind, text in matches]
+
+
+def _suggestion_queries(prefix, assets, kinds):
+    """(kind, values queryset) pairs, in the order they fill the suggestions."""
+    restricted = assets is not None
+    if assets is None:
+        assets = Asset.objects.all()
+    for kind, field in ASSET_KIND_FIELDS.items():
+        if kind in kinds:
+            yield kind, (
+                assets.filter(**{f'{field}__istartswith': prefix})
+                .order_by(field).values_list(field, flat=True).distinct()
+            )
+    if 'department' in kinds:
+        departments = Department.objects.filter(name__istartswith=prefix)
+        if restricted:
+            departments = departments.filter(pk__in=assets.values('department_id'))
+        yield 'department', departments.order_by('name').values_list('name', flat=True)
+    if 'user' in kinds:
+        yield 'user', User.objects.filter(username__istartswith=prefix).order_by('username').values_list('username', flat=True)
+
+
+def _sorted_matches(matches):
+    return sorted(matches, key=lambda match: (match[1].casefold(), match[0]))
+
+
+def _database_suggestions(prefix, limit, assets, kinds):
+    """Fallback used while the index builds, and for restricted asset sets."""
+    matches = []
+    for kind, values in _suggestion_queries(prefix, assets, kinds):
+        if len(matches) >= limit:
+            break
+        matches.extend((kind, value) for value in values[:limit - len(matches)])
+    return _sorted_matches(matches)
+
+
+async def _adatabase_suggestions(prefix, limit, assets, kinds):
+    matches = []
+    for kind, values in _suggestion_queries(prefix, assets, kinds):
+        if len(matches) >= limit:
+            break
+        matches.extend([(kind, value) async for value in values[:limit - len(matches)]])
+    return _sorted_matches(matches)
@@ -0,0 +1,501 @@
+"""
+Repeatable in-process benchmarks of the main pages.
+
+Each scenario is one URL requested through the Django test client as a
+given user, so the whole stack (middleware, views, templates, caches) runs
+without a web server in front. For every scenario the benchmark reports
+latency percentiles, time to first byte (the first chunk of a streamed
+export; the whole response otherwise), the number of queries and the peak
+memory allocated while handling one request (measured in a separate,
+traced run so tracing does not inflate the latencies). It also records the
+process's peak RSS (resource.getrusage) after each scenario and how much
+the scenario raised it. The peak only grows, so a scenario that stays below
+an earlier one's peak shows no growth.
+
+The asset_list search also runs once per search backend: the same terms
+under BasicSearchBackend (the original OR of icontains lookups) and under
+the indexed backend this database uses (see search.py). search_comparison()
+puts the two side by side and checks that they matched the same rows.
+
+run_sweep() repeats the benchmark at several table sizes, topping the
+database up with generate_synthetic_data before each step.
+
+The point-in-time queries (history.held_at) are measured on their own, at a
+moment in the middle of the history: held_at() called directly, the
+'Assignments As Of' page and the API's ``?as_of=``. run_history_sweep()
+repeats them with the assignment history grown to several sizes.
+
+Autocomplete is measured against its AUTOCOMPLETE_TARGET_MS budget: one
+short prefix per kind of suggestion, looked up in a freshly built prefix
+index directly (PrefixIndex.search) and through the API's ``?q=`` with
+that index installed.
+
+Results are plain dicts, saved as JSON together with the commit, database
+vendor and table sizes, so runs on different commits can be compared with
+compare().
+"""
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Max, Min
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import urlencode
+
+from . import autocomplete, search
+from .history import held_at
+from .middleware import QueryTimer
+from .models import Asset, AssetAssignment
+from .profiling import percentile
+
+
+def default_scenarios():
+    """
+    Return (name, url) for the benchmarked pages. Sample values (a serial
+    number, a search term) come from the current database.
+    """
+    asset = (
+        Asset.objects.filter(status='assigned').order_by('-created_at', '-id').first()
+        or Asset.objects.order_by('-created_at', '-id').first()
+    )
+    asset_list = reverse('asset_list')
+    scenarios = [
+        ('dashboard', reverse('dashboard')),
+        ('asset_list', asset_list),
+        ('asset_list: status filter', f'{asset_list}?status=available'),
+        ('asset_list: category filter', f'{asset_list}?category=laptop'),
+    ]
+    if asset is not None:
+        scenarios += [
+            ('asset_list: search', f'{asset_list}?search={asset.display_name.split()[0]}'),
+            ('asset_detail', reverse('asset_detail', args=[asset.serial_number])),
+        ]
+    export = reverse('export_assets_excel')
+    scenarios += [
+        ('export_assets_excel', f"{export}?status=assigned"),
+        # Every asset, streamed: time to first byte and RSS should not grow with the table
+        ('export_assets_csv', f"{export}?format=csv"),
+    ]
+    return scenarios
+
+
+def peak_rss_kb():
+    """The process's peak resident set size in KB, or None where it cannot be read."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def _request(client, url):
+    """GET ``url`` and read the whole body; return (status, bytes, queries, ms to the first byte)."""
+    timer = QueryTimer()
+    start = time.perf_counter()
+    with connection.execute_wrapper(timer):
+        response = client.get(url)
+        if response.streaming:
+            size = 0
+            first_byte = None
+            for chunk in response.streaming_content:
+                if first_byte is None:
+                    first_byte = time.perf_counter()
+                size += len(chunk)
+            response.close()
+        else:
+            first_byte = time.perf_counter()
+            size = len(response.content)
+    return response.status_code, size, timer.count, ((first_byte or time.perf_counter()) - start) * 1000
+
+
+def run_scenario(client, url, iterations=20, warmup=2, clear_caches=False):
+    """Benchmark one URL and return its result dict."""
+    rss_before = peak_rss_kb()
+    for _ in range(warmup):
+        _request(client, url)
+
+    latencies = []
+    first_bytes = []
+    queries = []
+    for _ in range(iterations):
+        if clear_caches:
+            for cache in caches.all():
+                cache.clear()
+        start = time.perf_counter()
+        status, size, query_count, first_byte_ms = _request(client, url)
+        latencies.append((time.perf_counter() - start) * 1000)
+        first_bytes.append(first_byte_ms)
+        queries.append(query_count)
+    rss_after = peak_rss_kb()
+
+    if clear_caches:
+        for cache in caches.all():
+            cache.clear()
+    tracemalloc.start()
+    try:
+        _request(client, url)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'url': url,
+        'status': status,
+        'iterations': iterations,
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'mean_ms': round(statistics.mean(latencies), 2),
+        'min_ms': round(min(latencies), 2),
+        'max_ms': round(max(latencies), 2),
+        'ttfb_p50_ms': round(percentile(first_bytes, 50), 2),
+        'ttfb_p95_ms': round(percentile(first_bytes, 95), 2),
+        'queries': max(queries),
+        'peak_memory_kb': round(peak / 1024, 1),
+        'peak_rss_kb': rss_after,
+        'rss_growth_kb': rss_after - rss_before if rss_after is not None else None,
+        'response_bytes': size,
+    }
+
+
+def _git_commit():
+    try:
+        output = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5, check=True,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return output.stdout.strip() or None
+
+
+def search_terms():
+    """
+    Return (name, term) for the search comparison: one term per searched
+    field, taken from the current database, and one that matches nothing.
+    """
+    asset = Asset.objects.filter(assigned_user__isnull=False).select_related('assigned_user', 'department').first()
+    if asset is None:
+        return []
+    return [
+        ('serial number', asset.serial_number[-5:]),
+        ('display name', asset.display_name.split()[0]),
+        ('department', asset.department.name[:5]),
+        ('username', asset.assigned_user.username[:6]),
+        ('no match', 'zqxj-none'),
+    ]
+
+
+@contextmanager
+def search_backend(backend):
+    """Make the views search with ``backend`` for the duration of the block."""
+    previous = search.get_search_backend()
+    search._backend = backend
+    try:
+        yield backend
+    finally:
+        search._backend = previous
+
+
+def search_backends():
+    """BasicSearchBackend and the backend this database uses, if that is a different one."""
+    backends = [search.BasicSearchBackend()]
+    indexed = search.get_search_backend()
+    if type(indexed) is not search.BasicSearchBackend:
+        backends.append(indexed)
+    return backends
+
+
+def search_scenario_name(backend, term_name):
+    return f'search [{type(backend).__name__}]: {term_name}'
+
+
+def run_search_scenarios(client, iterations=20, warmup=2, clear_caches=False):
+    """Run the asset_list search for every term under every backend; results include the match count."""
+    results = {}
+    asset_list = reverse('asset_list')
+    terms = search_terms()
+    for backend in search_backends():
+        with search_backend(backend):
+            for term_name, term in terms:
+                result = run_scenario(client, f'{asset_list}?{urlencode({"search": term})}', iterations, warmup, clear_caches)
+                result['matches'] = backend.filter(Asset.objects.all(), term).count()
+                results[search_scenario_name(backend, term_name)] = result
+    return results
+
+
+def search_comparison(results):
+    """
+    Return (term, basic p50 ms, indexed p50 ms, speed-up, same matches) for
+    each search term benchmarked under both backends.
+    """
+    scenarios = results['scenarios']
+    basic, *indexed = search_backends()
+    rows = []
+    if not indexed:
+        return rows
+    for term_name, _term in search_terms():
+        before = scenarios.get(search_scenario_name(basic, term_name))
+        after = scenarios.get(search_scenario_name(indexed[0], term_name))
+        if before is None or after is None:
+            continue
+        speedup = before['p50_ms'] / after['p50_ms'] if after['p50_ms'] else None
+        rows.append((term_name, before['p50_ms'], after['p50_ms'], speedup, before['matches'] == after['matches']))
+    return rows
+
+
+def as_of_moment():
+    """The middle of the assignment history, or now when there is none."""
+    bounds = AssetAssignment.objects.aggregate(first=Min('assigned_date'), last=Max('assigned_date'))
+    if bounds['first'] is None:
+        return timezone.now()
+    return bounds['first'] + (bounds['last'] - bounds['first']) / 2
+
+
+def as_of_scenarios(moment):
+    """Return (name, url) for the as-of page and the API's as_of filter at ``moment``."""
+    value = moment.isoformat()
+    return [
+        ('as-of: page', f"{reverse('assignments_as_of')}?{urlencode({'at': value})}"),
+        ('as-of: API', f"{reverse('api_assignment_list')}?{urlencode({'as_of': value})}"),
+    ]
+
+
+def run_held_at(moment, iterations=20, warmup=2):
+    """
+    Time history.held_at() itself: the first page of the assignments held at
+    ``moment`` (as the views fetch it) and their count.
+    """
+    def query():
+        assignments = held_at(moment)
+        page = list(assignments.select_related('asset', 'assigned_to').order_by('-assigned_date', '-id')[:51])
+        return page, assignments.count()
+
+    for _ in range(warmup):
+        query()
+    latencies = []
+    timer = QueryTimer()
+    for _ in range(iterations):
+        start = time.perf_counter()
+        with connection.execute_wrapper(timer):
+            _page, held = query()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {
+        'iterations': iterations,
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'mean_ms': round(statistics.mean(latencies), 2),
+        'queries': timer.count // iterations,
+        'held': held,
+    }
+
+
+def run_as_of_scenarios(client, iterations=20, warmup=2, clear_caches=False):
+    """held_at() directly, then the as-of page and API, at the middle of the history."""
+    moment = as_of_moment()
+    results = {'as-of: held_at()': run_held_at(moment, iterations, warmup)}
+    for name, url in as_of_scenarios(moment):
+        results[name] = run_scenario(client, url, iterations, warmup, clear_caches)
+    return results
+
+
+# Suggestions should come back within this many milliseconds (p95)
+AUTOCOMPLETE_TARGET_MS = 5
+
+
+def autocomplete_prefixes():
+    """
+    Return (name, prefix): the first three characters of a value of each
+    kind of suggestion, taken from the current database, and one prefix
+    that matches nothing.
+    """
+    asset = Asset.objects.filter(assigned_user__isnull=False).select_related('assigned_user', 'department').first()
+    if asset is None:
+        return []
+    return [
+        ('serial number', asset.serial_number[:3]),
+        ('display name', asset.display_name[:3]),
+        ('department', asset.department.name[:3]),
+        ('username', asset.assigned_user.username[:3]),
+        ('no match', 'zqx'),
+    ]
+
+
+@contextmanager
+def autocomplete_index(index):
+    """Make the API suggest from ``index`` for the duration of the block."""
+    previous = autocomplete._index
+    autocomplete._index = index
+    try:
+        yield index
+    finally:
+        autocomplete._index = previous
+
+
+def run_index_search(index, prefix, iterations=20, warmup=2):
+    """Time PrefixIndex.search() for ``prefix``, as the API calls it."""
+    for _ in range(warmup):
+        index.search(prefix)
+    latencies = []
+    timer = QueryTimer()
+    for _ in range(iterations):
+        start = time.perf_counter()
+        with connection.execute_wrapper(timer):
+            suggestions = index.search(prefix)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {
+        'iterations': iterations,
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'mean_ms': round(statistics.mean(latencies), 3),
+        'queries': timer.count // iterations,
+        'suggestions': len(suggestions),
+    }
+
+
+def run_autocomplete_scenarios(client, iterations=20, warmup=2, clear_caches=False):
+    """
+    Build the prefix index, then time every prefix against it directly and
+    through the API. The build time is recorded as well.
+    """
+    start = time.perf_counter()
+    index = autocomplete.build_index()
+    build_ms = (time.perf_counter() - start) * 1000
+    results = {}
+    api = reverse('api_autocomplete')
+    with autocomplete_index(index):
+        for name, prefix in autocomplete_prefixes():
+            result = run_index_search(index, prefix, iterations, warmup)
+            result['build_ms'] = round(build_ms, 1)
+            results[f'autocomplete: {name}'] = result
+            results[f'autocomplete API: {name}'] = run_scenario(
+                client, f'{api}?{urlencode({"q": prefix})}', iterations, warmup, clear_caches,
+            )
+    return results
+
+
+def autocomplete_comparison(results):
+    """
+    Return (prefix name, index p95 ms, API p95 ms, index within
+    AUTOCOMPLETE_TARGET_MS) for each autocomplete prefix. The target applies
+    to the lookup; the API figure adds the session, middleware and JSON.
+    """
+    scenarios = results['scenarios']
+    rows = []
+    for name, _prefix in autocomplete_prefixes():
+        lookup = scenarios.get(f'autocomplete: {name}')
+        api = scenarios.get(f'autocomplete API: {name}')
+        if lookup is None or api is None:
+            continue
+        rows.append((name, lookup['p95_ms'], api['p95_ms'], lookup['p95_ms'] <= AUTOCOMPLETE_TARGET_MS))
+    return rows
+
+
+def _environment(user, clear_caches):
+    return {
+        'commit': _git_commit(),
+        'created_at': timezone.now().isoformat(),
+        'database': connection.vendor,
+        'user': user.username,
+        'clear_caches': clear_caches,
+        'rows': {
+            'users': User.objects.count(),
+            'assets': Asset.objects.count(),
+            'assignments': AssetAssignment.objects.count(),
+        },
+    }
+
+
+def run_benchmark(user, scenarios=None, iterations=20, warmup=2, clear_caches=False):
+    """
+    Run every scenario, then the search comparison, the as-of queries and
+    autocomplete, as ``user`` and return the full result dict.
+    """
+    client = Client()
+    client.force_login(user)
+    results = {}
+    for name, url in scenarios or default_scenarios():
+        results[name] = run_scenario(client, url, iterations, warmup, clear_caches)
+    if scenarios is None:
+        results.update(run_search_scenarios(client, iterations, warmup, clear_caches))
+        results.update(run_as_of_scenarios(client, iterations, warmup, clear_caches))
+        results.update(run_autocomplete_scenarios(client, iterations, warmup, clear_caches))
+    return {**_environment(user, clear_caches), 'scenarios': results}
+
+
+def run_sweep(user, sizes, iterations=20, warmup=2, clear_caches=False, stdout=None):
+    """
+    Run the benchmark with the asset table grown to each of ``sizes`` in
+    turn (ascending), and return {size: result dict}. Each step adds the
+    missing assets with generate_synthetic_data, with one user per 100
+    assets and two assignments per asset.
+    """
+    results = {}
+    for size in sorted(sizes):
+        missing = size - Asset.objects.count()
+        if missing > 0:
+            call_command(
+                'generate_synthetic_data', users=max(1, missing // 100), assets=missing,
+                assignments=missing * 2, prefix='bench', seed=size, stdout=stdout,
+            )
+        results[size] = run_benchmark(user, iterations=iterations, warmup=warmup, clear_caches=clear_caches)
+    return results
+
+
+def run_history_sweep(user, sizes, iterations=20, warmup=2, clear_caches=False, stdout=None):
+    """
+    Run the as-of queries with the assignment history grown to each of
+    ``sizes`` rows in turn (ascending), and return {size: result dict}. Each
+    step adds the missing rows with generate_synthetic_data, as assets with
+    about ten assignments each over a three-year history.
+    """
+    client = Client()
+    client.force_login(user)
+    results = {}
+    for size in sorted(sizes):
+        missing = size - AssetAssignment.objects.count()
+        if missing > 0:
+            call_command(
+                'generate_synthetic_data', users=max(1, missing // 1000), assets=max(1, missing // 10),
+                assignments=missing, days=3 * 365, prefix='history', seed=size, stdout=stdout,
+            )
+        scenarios = run_as_of_scenarios(client, iterations, warmup, clear_caches)
+        results[size] = {**_environment(user, clear_caches), 'scenarios': scenarios}
+    return results
+
+
+COMPARED_METRICS = ('p50_ms', 'p95_ms', 'ttfb_p50_ms', 'queries', 'peak_memory_kb', 'peak_rss_kb')
+
+
+def compare(baseline, current):
+    """
+    Return (scenario, metric, baseline value, current value, change in %)
+    for every metric of the scenarios present in both result dicts.
+    """
+    rows = []
+    for name, result in current['scenarios'].items():
+        before = baseline['scenarios'].get(name)
+        if before is None:
+            continue
+        for metric in COMPARED_METRICS:
+            old, new = before.get(metric), result.get(metric)
+            if old is None or new is None:
+                continue
+            change = (new - old) / old * 100 if old else None
+            rows.append((name, metric, old, new, change))
+    return rows
@@ -0,0 +1,71 @@
+"""
+Conditional GET for the async views (the JSON API, asset_list and
+asset_detail).
+
+An ETag function runs before the view: it reduces the data the page shows
+to one cheap aggregate query and hashes the result together with the
+viewer (make_etag()). When the client's If-None-Match matches, the view is
+answered with a 304 and never runs its page queries or templates.
+
+Some changes alter what a page shows without touching any asset row (a
+user added, renamed or given another role, a department renamed, a company
+added, the idempotency key embedded in a form used up). Their signal
+handlers call bump_pages_version(), and the HTML pages and the JSON API
+fold apages_version() into their ETags. It lives in the default cache, so
+with several workers it needs a shared cache like the stats do (see CACHES
+in settings).
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+PAGES_VERSION_KEY = 'assets:pages:version'
+
+
+def make_etag(request, *parts):
+    """Validator for the visible data plus the viewer (user, role, department scope) and the exact query."""
+    role = request.user_role
+    raw = ':'.join(str(part) for part in (request.user.pk, role.name, role.department_id, request.get_full_path(), *parts))
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def acondition(etag_func, last_modified_func=None):
+    """
+    ``condition(etag_func=..., last_modified_func=...)`` for async views
+    with async validator functions (Django's decorator calls them
+    synchronously).
+
+    Last-Modified is sent for information only: a timestamp can neither
+    tell two viewers apart nor notice a row leaving a list, so only a
+    matching ETag produces a 304.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        async def wrapper(request, *args, **kwargs):
+            etag = await etag_func(request, *args, **kwargs)
+            etag = quote_etag(etag) if etag is not None else None
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = await view_func(request, *args, **kwargs)
+            if etag and request.method in ('GET', 'HEAD'):
+                response.headers.setdefault('ETag', etag)
+                if last_modified_func is not None:
+                    last_modified = await last_modified_func(request, *args, **kwargs)
+                    if last_modified is not None:
+                        response.headers.setdefault('Last-Modified', http_date(last_modified.timestamp()))
+            return response
+        return wrapper
+    return decorator
+
+
+async def apages_version():
+    return await cache.aget(PAGES_VERSION_KEY, 0)
+
+
+def bump_pages_version():
+    """Change the HTML pages' ETags after a change that no asset's updated_at reflects."""
+    cache.set(PAGES_VERSION_KEY, time.time(), None)
@@ -0,0 +1,76 @@
+"""
+Consistency checks between assets and their assignment history.
+
+The assignment log is the source of truth: an asset's current_assignment
+must be its open AssetAssignment, and an asset is 'assigned' to that
+assignment's holder exactly when it has one. Every check is a single
+set-based query; repair() fixes one asset at a time under its row lock,
+going through Asset.save() so caches and search suggestions follow.
+"""
+from django.db import transaction
+from django.db.models import F, Q
+
+from .models import Asset, AssetAssignment
+
+REPAIR_NOTE = "\n(Closed by check_assignments: a later assignment was open)"
+
+
+def checks():
+    """Return {description: queryset of inconsistent assets}."""
+    pointed = Asset.objects.filter(current_assignment__isnull=False)
+    unpointed = Asset.objects.filter(current_assignment__isnull=True)
+    untracked_open = AssetAssignment.objects.filter(returned_date__isnull=True, current_for__isnull=True)
+    return {
+        "current assignment is returned or belongs to another asset": pointed.filter(
+            Q(current_assignment__returned_date__isnull=False) | ~Q(current_assignment__asset=F('pk'))
+        ),
+        "has a current assignment but is not 'assigned'": pointed.exclude(status='assigned'),
+        "assigned user differs from the current assignment's holder": pointed.filter(
+            Q(assigned_user__isnull=True) | ~Q(assigned_user=F('current_assignment__assigned_to'))
+        ),
+        "'assigned' or has an assigned user without a current assignment": unpointed.filter(
+            Q(status='assigned') | Q(assigned_user__isnull=False)
+        ),
+        "has an open assignment that is not its current one": Asset.objects.filter(
+            pk__in=untracked_open.values('asset_id')
+        ),
+    }
+
+
+def find_inconsistencies():
+    """Return {description: sorted list of asset pks}, only for failing checks."""
+    problems = {}
+    for description, assets in checks().items():
+        pks = sorted(assets.values_list('pk', flat=True))
+        if pks:
+            problems[description] = pks
+    return problems
+
+
+def repair(asset_pk):
+    """
+    Rebuild one asset's assignment state from its history: the latest open
+    assignment becomes current (older open ones are closed when it started)
+    and status/assigned_user follow it.
+    """
+    with transaction.atomic():
+        asset = Asset.objects.select_for_update().get(pk=asset_pk)
+        open_assignments = list(
+            AssetAssignment.objects.filter(asset=asset, returned_date__isnull=True).order_by('-assigned_date', '-pk')
+        )
+        current = open_assignments[0] if open_assignments else None
+        for stale in open_assignments[1:]:
+            stale.returned_date = current.assigned_date
+            stale.notes += REPAIR_NOTE
+            stale.save()
+
+        asset.current_assignment = current
+        if current is not None:
+            asset.status = 'assigned'
+            asset.assigned_user_id = current.assigned_to_id
+        else:
+            asset.assigned_user = None
+            if asset.status == 'assigned':
+                asset.status = 'available'
+        asset.save()
+    return asset
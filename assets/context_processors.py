@@ -0,0 +1,13 @@
+from django.conf import settings
+
+from .middleware import Role
+
+
+def user_role(request):
+    """Expose the request's cached Role to templates as ``user_role``."""
+    return {'user_role': getattr(request, 'user_role', None) or Role()}
+
+
+def fragment_cache(request):
+    """Timeout for the {% cache %} asset fragments (see assets.fragments)."""
+    return {'fragment_cache_timeout': getattr(settings, 'ASSET_FRAGMENT_CACHE_TIMEOUT', 3600)}
@@ -0,0 +1,155 @@
+"""
+Streaming export helpers for the asset report.
+
+Rows are pulled from the database in chunks with ``QuerySet.iterator()`` so
+the export never holds the whole inventory in memory. CSV is streamed to the
+client row by row; XLSX is written with openpyxl's write-only mode, which
+flushes rows to a temporary file instead of keeping them in RAM.
+
+Archived assets (see archive.py) are only exported on request, after the
+hot ones, by export_rows(..., include_archived=True).
+"""
+import csv
+import tempfile
+from itertools import chain
+
+from django.conf import settings
+from django.db.models import Case, DateTimeField, F, OuterRef, Q, Subquery, Value, When
+from openpyxl import Workbook
+
+from .archive import filter_archived
+from .models import ArchivedAssignment, Asset, AssetAssignment
+from .search import apply_asset_filters
+
+EXPORT_HEADERS = [
+    "Serial Number", "Display Name", "Department", "Model Category",
+    "Status", "Company", "Assigned User", "Employee ID", "Assigned Date", "Returned Date"
+]
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+def get_chunk_size():
+    return getattr(settings, 'ASSET_EXPORT_CHUNK_SIZE', 2000)
+
+
+def annotate_for_export(assets):
+    """
+    Attach everything a report row needs to the asset queryset itself, so the
+    whole export is a single query: the assigned user and profile are joined
+    in, and so is the current assignment, which is the latest one. Only
+    assets without one fall back to correlated subqueries for the dates of
+    their last (returned) assignment.
+    """
+    latest_assignment = AssetAssignment.objects.filter(asset=OuterRef('pk')).order_by('-assigned_date')
+    is_assigned = Q(current_assignment__isnull=False)
+    return assets.select_related('assigned_user__userprofile', 'department', 'company').annotate(
+        latest_assigned_date=Case(
+            When(is_assigned, then=F('current_assignment__assigned_date')),
+            default=Subquery(latest_assignment.values('assigned_date')[:1]),
+        ),
+        latest_returned_date=Case(
+            When(is_assigned, then=Value(None)),
+            default=Subquery(latest_assignment.values('returned_date')[:1]),
+            output_field=DateTimeField(),
+        ),
+    )
+
+
+def _format_date(value):
+    return value.strftime('%Y-%m-%d %H:%M') if value else "N/A"
+
+
+def asset_export_rows(assets, chunk_size=None):
+    """Yield one report row (a list of cell values) per asset."""
+    assets = annotate_for_export(assets)
+    for asset in assets.iterator(chunk_size=chunk_size or get_chunk_size()):
+        assigned_user_name = asset.assigned_user.get_full_name() if asset.assigned_user else "N/A"
+        assigned_user_emp_id = asset.assigned_user.userprofile.employee_id if asset.assigned_user and hasattr(asset.assigned_user, 'userprofile') else "N/A"
+
+        # Latest assignment details, already annotated by the query
+        assigned_date = _format_date(asset.latest_assigned_date)
+        returned_date = _format_date(asset.latest_returned_date)
+
+        yield [
+            asset.serial_number, asset.display_name, asset.department.name,
+            asset.get_model_category_display(), asset.get_status_display(),
+            asset.company.name, assigned_user_name, assigned_user_emp_id,
+            assigned_date, returned_date
+        ]
+
+
+def archived_export_rows(archived, chunk_size=None):
+    """Yield report rows for ArchivedAssets: nobody holds them, so only their last assignment's dates."""
+    latest_assignment = ArchivedAssignment.objects.filter(asset=OuterRef('pk')).order_by('-assigned_date')
+    archived = archived.select_related('department', 'company').annotate(
+        latest_assigned_date=Subquery(latest_assignment.values('assigned_date')[:1]),
+        latest_returned_date=Subquery(latest_assignment.values('returned_date')[:1]),
+    )
+    for asset in archived.iterator(chunk_size=chunk_size or get_chunk_size()):
+        yield [
+            asset.serial_number, asset.display_name, asset.department.name,
+            asset.get_model_category_display(), f"{asset.get_reason_display()} (archived)",
+            asset.company.name, "N/A", "N/A",
+            _format_date(asset.latest_assigned_date), _format_date(asset.latest_returned_date),
+        ]
+
+
+def export_querysets(search_query, status_filter, category_filter, include_archived=False, department_id=None, company_id=None):
+    """The hot assets matching the asset list filters, and the archived ones (None unless requested)."""
+    assets = apply_asset_filters(
+        Asset.objects.all().order_by('serial_number'), search_query, status_filter, category_filter, department_id, company_id,
+    )
+    archived = None
+    if include_archived:
+        archived = filter_archived(search_query, status_filter, category_filter, department_id, company_id).order_by('serial_number')
+    return assets, archived
+
+
+def export_rows(assets, archived=None):
+    """Report rows for the querysets returned by export_querysets()."""
+    rows = asset_export_rows(assets)
+    return chain(rows, archived_export_rows(archived)) if archived is not None else rows
+
+
+class Echo:
+    """Pseudo-buffer for csv.writer: write() hands the encoded line straight back."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows, headers=EXPORT_HEADERS):
+    """Yield the report as CSV lines, one per row, headers first."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def write_csv(rows, output):
+    """Write the report as CSV to a text stream."""
+    writer = csv.writer(output)
+    writer.writerow(EXPORT_HEADERS)
+    writer.writerows(rows)
+
+
+def write_xlsx(rows, output):
+    """Write the report into a write-only workbook saved to ``output`` (a path or binary file)."""
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Asset Report")
+    sheet.append(EXPORT_HEADERS)
+    for row in rows:
+        sheet.append(row)
+    workbook.save(output)
+
+
+def build_xlsx(rows):
+    """
+    Write the report to an XLSX temporary file and return it open and
+    positioned at the start, ready to be streamed by a FileResponse.
+    """
+    output = tempfile.TemporaryFile()
+    write_xlsx(rows, output)
+    output.seek(0)
+    return output
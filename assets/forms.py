@@ -1,27 +1,56 @@
 from django import forms
 from django.contrib.auth.models import User
+from .idempotency import MAX_LENGTH as IDEMPOTENCY_KEY_LENGTH, new_key
 from .models import Asset, AssetAssignment, UserProfile
 
-class AssetForm(forms.ModelForm):
+
+def idempotency_key_field():
+    """Hidden field holding a fresh idempotency key per rendered form (see idempotency.py)."""
+    return forms.CharField(widget=forms.HiddenInput, required=False, max_length=IDEMPOTENCY_KEY_LENGTH, initial=new_key)
+
+
+class AssetStatusMixin:
+    """An asset only becomes 'assigned' through the assignment workflow."""
+
+    def clean_status(self):
+        status = self.cleaned_data.get('status')
+        if status == 'assigned' and self.instance.current_assignment_id is None:
+            raise forms.ValidationError("Use Assign to assign this asset to a user.")
+        return status
+
+
+class AssetSerialNumberMixin:
+    """Serial numbers that would clash with a fixed page under /assets/ are refused."""
+
+    def clean_serial_number(self):
+        serial_number = self.cleaned_data.get('serial_number')
+        if serial_number in Asset.RESERVED_SERIAL_NUMBERS:
+            raise forms.ValidationError(f"'{serial_number}' is reserved for a page of the site; use another serial number.")
+        return serial_number
+
+
+class AssetForm(AssetSerialNumberMixin, AssetStatusMixin, forms.ModelForm):
     class Meta:
         model = Asset
         fields = ['serial_number', 'display_name', 'department', 'model_category', 'status', 'company']
         widgets = {
             'serial_number': forms.TextInput(attrs={'class': 'form-control'}),
             'display_name': forms.TextInput(attrs={'class': 'form-control'}),
-            'department': forms.TextInput(attrs={'class': 'form-control'}),
+            'department': forms.Select(attrs={'class': 'form-select'}),
             'model_category': forms.Select(attrs={'class': 'form-select'}),
             'status': forms.Select(attrs={'class': 'form-select'}),
-            'company': forms.TextInput(attrs={'class': 'form-control'}),
+            'company': forms.Select(attrs={'class': 'form-select'}),
         }
 
     def __init__(self, *args, **kwargs):
         user_role = kwargs.pop('user_role', None)
         is_new_asset = kwargs.pop('is_new_asset', False)
-        
-        print(f"DEBUG: AssetForm init - user_role: {user_role}, is_new_asset: {is_new_asset}")
+        # Set for a department-scoped asset incharge (Role.department_id)
+        department_id = kwargs.pop('department_id', None)
 
         super().__init__(*args, **kwargs)
+        if department_id is not None:
+            self.fields['department'].queryset = self.fields['department'].queryset.filter(pk=department_id)
 
         # --- FIX FOR SERIAL NUMBER VISIBILITY AND EDITABILITY ---
         # Serial number should ONLY be editable when creating a NEW asset (and only by admin).
@@ -53,6 +82,8 @@ class AssetForm(forms.ModelForm):
                 if field_name not in ['status', 'department']:
                     self.fields[field_name].widget.attrs['disabled'] = True
                     self.fields[field_name].required = False # Not required if disabled
+                    # Keeps the asset's value, as the browser does not submit it
+                    self.fields[field_name].disabled = True
 
             # Explicitly ENABLE status and department.
             self.fields['status'].widget.attrs.pop('disabled', None)
@@ -71,6 +102,7 @@ class AssetAssignmentForm(forms.ModelForm):
         widget=forms.Select(attrs={'class': 'form-select'}),
         empty_label="Select User"
     )
+    idempotency_key = idempotency_key_field()
     
     class Meta:
         model = AssetAssignment
@@ -78,3 +110,51 @@ class AssetAssignmentForm(forms.ModelForm):
         widgets = {
             'notes': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
         }
+
+
+class AssetImportForm(forms.Form):
+    file = forms.FileField(
+        label="CSV or XLSX file",
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.xlsx'}),
+    )
+
+    def clean_file(self):
+        uploaded = self.cleaned_data['file']
+        if not uploaded.name.lower().endswith(('.csv', '.xlsx')):
+            raise forms.ValidationError("Upload a .csv or .xlsx file.")
+        return uploaded
+
+
+class BulkAssetActionForm(forms.Form):
+    ACTION_CHOICES = [
+        ('assign', 'Assign to user'),
+        ('return', 'Return'),
+        ('retire', 'Retire'),
+    ]
+    SCOPE_CHOICES = [
+        ('selected', 'Selected assets'),
+        ('filter', 'All assets matching the current filter'),
+    ]
+
+    action = forms.ChoiceField(choices=ACTION_CHOICES, widget=forms.Select(attrs={'class': 'form-select form-select-sm'}))
+    scope = forms.ChoiceField(choices=SCOPE_CHOICES, initial='selected', widget=forms.Select(attrs={'class': 'form-select form-select-sm'}))
+    assigned_to = forms.ModelChoiceField(
+        queryset=User.objects.filter(userprofile__role='user'),
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-select form-select-sm'}),
+        empty_label="Select User"
+    )
+    notes = forms.CharField(required=False, widget=forms.TextInput(attrs={'class': 'form-control form-control-sm', 'placeholder': 'Notes (optional)'}))
+    idempotency_key = idempotency_key_field()
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('action') == 'assign' and not cleaned_data.get('assigned_to'):
+            self.add_error('assigned_to', "Select the user to assign the assets to.")
+        return cleaned_data
+
+
+class ReturnAssetForm(forms.Form):
+    # The assignment being closed, so a stale page cannot return a newer one
+    assignment = forms.IntegerField(widget=forms.HiddenInput)
+    idempotency_key = idempotency_key_field()
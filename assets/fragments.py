@@ -0,0 +1,37 @@
+"""
+Cached template fragments for asset rows (asset_list) and asset pages
+(asset_detail).
+
+The templates wrap those blocks in ``{% cache %}`` keyed on the asset's pk,
+its updated_at and the viewer's role, in the 'fragments' cache. Any save
+bumps updated_at, so an edited asset is simply rendered under a new key; the
+signal handlers in assets.signals also delete the old keys right away, and
+cover changes that do not touch updated_at (a new assignment, a renamed
+user).
+"""
+from django.core.cache import caches
+from django.core.cache.utils import make_template_fragment_key
+
+from .models import UserProfile
+
+FRAGMENT_CACHE = 'fragments'
+ROW_FRAGMENT = 'asset_row'
+DETAIL_FRAGMENT = 'asset_detail'
+
+# Every value user_role.name can take in a template (None: no profile)
+ROLE_NAMES = [role for role, _ in UserProfile.ROLE_CHOICES] + [None]
+
+
+def fragment_keys(asset_pk, updated_at):
+    return [
+        make_template_fragment_key(fragment, [asset_pk, updated_at, role])
+        for fragment in (ROW_FRAGMENT, DETAIL_FRAGMENT)
+        for role in ROLE_NAMES
+    ]
+
+
+def invalidate_asset_fragments(versions):
+    """Drop the cached fragments for ``versions``, an iterable of (pk, updated_at)."""
+    keys = [key for pk, updated_at in versions if updated_at is not None for key in fragment_keys(pk, updated_at)]
+    if keys:
+        caches[FRAGMENT_CACHE].delete_many(keys)
@@ -0,0 +1,78 @@
+"""
+Point-in-time ("as of") queries over the assignment history.
+
+Each AssetAssignment is the half-open interval [assigned_date, returned_date),
+open-ended while the asset has not been returned. An asset was held by
+someone at instant T when its interval contains T.
+
+- PostgreSQL: the containment test is written as
+  ``tstzrange(assigned_date, returned_date, '[)') @> T`` so it is served by
+  the GiST index on that expression (migration 0005), whatever T is.
+- Other databases: the equivalent pair of range comparisons, served by the
+  (returned_date, assigned_date) index plus the open-assignment index.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db import connection
+from django.db.models import BooleanField, Q
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import AssetAssignment
+
+
+def _period_sql():
+    """The period expression of the GiST index, built from the model's table and column names."""
+    quote = connection.ops.quote_name
+    table = quote(AssetAssignment._meta.db_table)
+    start, end = (quote(AssetAssignment._meta.get_field(field).column) for field in ('assigned_date', 'returned_date'))
+    return f"tstzrange({table}.{start}, {table}.{end}, '[)')"
+
+
+def parse_as_of(value):
+    """
+    Parse an as-of parameter into an aware datetime, or return None.
+
+    A date alone means the end of that day, i.e. who held what when the day
+    closed.
+    """
+    if not value:
+        return None
+    try:
+        day = parse_date(value)
+        moment = None if day else parse_datetime(value)
+    except ValueError:
+        return None
+    if day is not None:
+        moment = datetime.combine(day + timedelta(days=1), time.min) - timedelta(microseconds=1)
+    if moment is None:
+        return None
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def held_at(moment, queryset=None):
+    """Return the assignments in ``queryset`` whose interval contains ``moment``."""
+    if queryset is None:
+        queryset = AssetAssignment.objects.all()
+    if connection.vendor == 'postgresql':
+        return queryset.filter(
+            RawSQL(f"{_period_sql()} @> %s::timestamptz", [moment], output_field=BooleanField())
+        )
+    return queryset.filter(
+        Q(returned_date__isnull=True) | Q(returned_date__gt=moment),
+        assigned_date__lte=moment,
+    )
+
+
+def holder_at(asset, moment):
+    """Return the assignment of ``asset`` open at ``moment``, or None."""
+    return (
+        held_at(moment, AssetAssignment.objects.filter(asset=asset))
+        .select_related('assigned_to')
+        .order_by('-assigned_date')
+        .first()
+    )
+
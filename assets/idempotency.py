@@ -0,0 +1,82 @@
+"""
+Idempotency keys for state-changing POSTs (assign, return, bulk actions).
+
+Forms carry a random key in a hidden field, generated when the form is
+rendered; API clients can send an ``Idempotency-Key`` header instead. The
+view runs its change inside ``idempotent()``, which records the key in the
+same transaction. A retried or double-submitted request with the same key
+then costs one indexed lookup and raises DuplicateRequest instead of being
+applied again; if the first attempt failed, nothing was recorded and the
+retry runs normally. Concurrent duplicates are serialized by the unique
+(user, key) constraint.
+
+Keys are kept for ASSET_IDEMPOTENCY_KEY_TTL seconds; cleanup_idempotency_keys
+deletes older ones.
+"""
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import IdempotencyKey
+
+FORM_FIELD = 'idempotency_key'
+HEADER = 'HTTP_IDEMPOTENCY_KEY'
+MAX_LENGTH = 64
+
+
+def get_ttl():
+    return getattr(settings, 'ASSET_IDEMPOTENCY_KEY_TTL', 24 * 60 * 60)
+
+
+def new_key():
+    return uuid.uuid4().hex
+
+
+class DuplicateRequest(Exception):
+    """The request's idempotency key was already used; ``record`` is the first use."""
+
+    def __init__(self, record):
+        super().__init__(f"Request {record.key} was already processed.")
+        self.record = record
+
+
+def request_key(request):
+    """Return the request's idempotency key (header first, then form field), or None."""
+    key = request.META.get(HEADER) or request.POST.get(FORM_FIELD)
+    return key[:MAX_LENGTH] if key else None
+
+
+@contextmanager
+def idempotent(request, action):
+    """
+    Run the block in a transaction that also records the request's key.
+    Yields the IdempotencyKey (unsaved when the request has no key); set its
+    ``summary`` to the outcome to show on retries.
+    """
+    key = request_key(request)
+    record = IdempotencyKey(user=request.user, key=key or '', action=action)
+    with transaction.atomic():
+        if key:
+            existing = IdempotencyKey.objects.filter(user=request.user, key=key).first()
+            if existing is not None:
+                raise DuplicateRequest(existing)
+            try:
+                with transaction.atomic():
+                    record.save()
+            except IntegrityError:
+                # A concurrent request with the same key committed first
+                raise DuplicateRequest(IdempotencyKey.objects.get(user=request.user, key=key))
+        yield record
+        if key:
+            record.save(update_fields=['summary'])
+
+
+def cleanup_expired_keys():
+    """Delete keys older than the TTL and return how many were deleted."""
+    cutoff = timezone.now() - timedelta(seconds=get_ttl())
+    deleted, _ = IdempotencyKey.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,276 @@
+"""
+Bulk asset import from CSV or XLSX.
+
+Rows are read as a stream (csv.reader, or openpyxl in read-only mode),
+validated against the Asset field limits and choices, and written with
+``bulk_create(update_conflicts=True)`` keyed on serial_number, one
+transaction per batch. Invalid rows are skipped and listed in the report;
+they never abort the rest of the import.
+
+Existing assets (matched by serial number) get their descriptive fields
+updated; their status is left alone, since status changes have to go
+through the edit/assign/return workflows that keep assignments consistent.
+Each created or changed asset gets its AssetEvent, as an edit would.
+
+Departments and companies are given by name; each batch maps the names to
+lookup rows (see lookups.py) whatever their spelling, creating new ones.
+"""
+import csv
+import io
+import time
+
+from django.conf import settings
+from django.db import transaction
+from openpyxl import load_workbook
+
+from .audit import AUDITED_ATTNAMES, AUDITED_FIELDS, field_changes, make_event, record_events
+from .autocomplete import reset_index
+from .lookups import find_or_create
+from .models import Asset, Company, Department
+from .search import build_search_text, refresh_search_text
+from .stats import invalidate_asset_stats
+
+# Accepted header spellings (normalised to lower case, spaces -> underscores)
+HEADER_ALIASES = {
+    'serial_number': 'serial_number',
+    'serial': 'serial_number',
+    'display_name': 'display_name',
+    'name': 'display_name',
+    'department': 'department',
+    'model_category': 'model_category',
+    'category': 'model_category',
+    'status': 'status',
+    'company': 'company',
+}
+REQUIRED_FIELDS = ['serial_number', 'display_name', 'department', 'model_category', 'company']
+UPDATE_FIELDS = ['display_name', 'department', 'model_category', 'company', 'updated_at']
+
+# Status values an import may give a new asset ('assigned' needs an assignment)
+IMPORTABLE_STATUSES = {'available', 'maintenance', 'retired'}
+
+MAX_REPORTED_ERRORS = 1000
+
+
+def get_batch_size():
+    return getattr(settings, 'ASSET_IMPORT_BATCH_SIZE', 1000)
+
+
+class RowError:
+    def __init__(self, row_number, serial_number, messages):
+        self.row_number = row_number
+        self.serial_number = serial_number
+        self.messages = messages
+
+    def __str__(self):
+        return f"Row {self.row_number} ({self.serial_number or 'no serial'}): {'; '.join(self.messages)}"
+
+
+class ImportResult:
+    def __init__(self):
+        self.total_rows = 0
+        self.created = 0
+        self.updated = 0
+        self.errors = []
+        self.error_count = 0
+        self.elapsed = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.total_rows / self.elapsed if self.elapsed else 0.0
+
+    def add_error(self, error):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(error)
+
+    def write_error_report(self, stream):
+        """Write the per-row errors as CSV to a text stream."""
+        writer = csv.writer(stream)
+        writer.writerow(['Row', 'Serial Number', 'Errors'])
+        for error in self.errors:
+            writer.writerow([error.row_number, error.serial_number, '; '.join(error.messages)])
+
+
+def _normalise_header(value):
+    return str(value or '').strip().lower().replace(' ', '_')
+
+
+def _choice_lookup(choices):
+    """Map both stored values and display labels (any case) to the stored value."""
+    lookup = {}
+    for value, label in choices:
+        lookup[value.lower()] = value
+        lookup[label.lower()] = value
+    return lookup
+
+
+CATEGORY_LOOKUP = _choice_lookup(Asset.CATEGORY_CHOICES)
+STATUS_LOOKUP = _choice_lookup(Asset.STATUS_CHOICES)
+# Columns holding the name of a lookup row
+LOOKUP_MODELS = {'department': Department, 'company': Company}
+
+
+def _max_length(name):
+    model = LOOKUP_MODELS.get(name)
+    return model._meta.get_field('name').max_length if model else Asset._meta.get_field(name).max_length
+
+
+MAX_LENGTHS = {name: _max_length(name) for name in HEADER_ALIASES.values()}
+
+
+def read_rows(uploaded_file, filename):
+    """Yield (row_number, {field: value}) pairs from a CSV or XLSX file object."""
+    if filename.lower().endswith('.xlsx'):
+        workbook = load_workbook(uploaded_file, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = next(rows, None) or ()
+            fields = [HEADER_ALIASES.get(_normalise_header(cell)) for cell in header]
+            for row_number, row in enumerate(rows, start=2):
+                if not any(cell not in (None, '') for cell in row):
+                    continue
+                yield row_number, {field: row[i] for i, field in enumerate(fields) if field and i < len(row)}
+        finally:
+            workbook.close()
+    else:
+        text = io.TextIOWrapper(uploaded_file, encoding='utf-8-sig', newline='')
+        reader = csv.reader(text)
+        header = next(reader, None) or []
+        fields = [HEADER_ALIASES.get(_normalise_header(cell)) for cell in header]
+        for row_number, row in enumerate(reader, start=2):
+            if not any(cell.strip() for cell in row):
+                continue
+            yield row_number, {field: row[i] for i, field in enumerate(fields) if field and i < len(row)}
+
+
+def validate_row(values, seen_serials):
+    """Return (cleaned values, list of error messages) for one input row."""
+    cleaned = {field: str(value).strip() if value is not None else '' for field, value in values.items()}
+    errors = []
+
+    for field in REQUIRED_FIELDS:
+        if not cleaned.get(field):
+            errors.append(f"{field.replace('_', ' ')} is required")
+    for field, value in cleaned.items():
+        if value and len(value) > MAX_LENGTHS[field]:
+            errors.append(f"{field.replace('_', ' ')} is longer than {MAX_LENGTHS[field]} characters")
+
+    if cleaned.get('model_category'):
+        category = CATEGORY_LOOKUP.get(cleaned['model_category'].lower())
+        if category is None:
+            errors.append(f"unknown category '{cleaned['model_category']}'")
+        cleaned['model_category'] = category
+
+    status = STATUS_LOOKUP.get(cleaned.get('status', '').lower()) if cleaned.get('status') else 'available'
+    if status is None:
+        errors.append(f"unknown status '{cleaned['status']}'")
+    cleaned['status'] = status
+
+    serial = cleaned.get('serial_number')
+    if serial in Asset.RESERVED_SERIAL_NUMBERS:
+        errors.append(f"serial number '{serial}' is reserved for a page of the site")
+    elif serial and serial in seen_serials:
+        errors.append(f"duplicate serial number (first seen on row {seen_serials[serial]})")
+
+    return cleaned, errors
+
+
+def _build_assets(batch):
+    """(row_number, Asset) pairs for a batch of (row_number, cleaned values) pairs."""
+    lookups = {
+        field: find_or_create(model, {values[field] for _, values in batch})
+        for field, model in LOOKUP_MODELS.items()
+    }
+    built = []
+    for row_number, values in batch:
+        fields = {field: lookups[field][values[field]] if field in lookups else values[field] for field in REQUIRED_FIELDS}
+        asset = Asset(**fields, status=values['status'])
+        asset.search_text = build_search_text(asset)
+        built.append((row_number, asset))
+    return built
+
+
+def _write_batch(batch, result):
+    """Upsert a batch of (row_number, cleaned values) pairs in one transaction."""
+    serials = [values['serial_number'] for _, values in batch]
+    with transaction.atomic():
+        batch = _build_assets(batch)
+        existing = {
+            values['serial_number']: values
+            for values in Asset.objects.filter(serial_number__in=serials).values('pk', *AUDITED_ATTNAMES)
+        }
+
+        # The status column only applies to new assets (existing ones keep theirs)
+        assets = []
+        for row_number, asset in batch:
+            if asset.serial_number not in existing and asset.status not in IMPORTABLE_STATUSES:
+                result.add_error(RowError(row_number, asset.serial_number, [
+                    f"new assets cannot be imported as '{asset.status}'; use the assignment workflow"
+                ]))
+                continue
+            assets.append(asset)
+
+        Asset.objects.bulk_create(
+            assets,
+            update_conflicts=True,
+            unique_fields=['serial_number'],
+            update_fields=UPDATE_FIELDS,
+        )
+        # Updated rows may carry an assigned user's name in search_text
+        refresh_search_text(Asset.objects.filter(serial_number__in=existing))
+        record_events(_import_events(assets, existing))
+    result.updated += len(existing)
+    result.created += len(assets) - len(existing)
+
+
+def _import_events(assets, existing):
+    created = [asset for asset in assets if asset.serial_number not in existing]
+    if any(asset.pk is None for asset in created):
+        # Backends that cannot return ids from an upsert
+        pks = dict(Asset.objects.filter(serial_number__in=[asset.serial_number for asset in created])
+                   .values_list('serial_number', 'pk'))
+        for asset in created:
+            asset.pk = pks[asset.serial_number]
+
+    events = []
+    updated_fields = [field for field in AUDITED_FIELDS if field in UPDATE_FIELDS]
+    for asset in assets:
+        old_values = existing.get(asset.serial_number)
+        if old_values is None:
+            events.append(make_event(asset.pk, asset.serial_number, 'create', field_changes(None, asset.__dict__)))
+        else:
+            changes = field_changes(old_values, asset.__dict__, updated_fields)
+            if changes:
+                events.append(make_event(old_values['pk'], asset.serial_number, 'update', changes))
+    return events
+
+
+def import_assets(uploaded_file, filename, batch_size=None):
+    """Import assets from a CSV/XLSX file object and return an ImportResult."""
+    batch_size = batch_size or get_batch_size()
+    result = ImportResult()
+    seen_serials = {}
+    batch = []
+    started = time.perf_counter()
+
+    for row_number, values in read_rows(uploaded_file, filename):
+        result.total_rows += 1
+        cleaned, errors = validate_row(values, seen_serials)
+        if errors:
+            result.add_error(RowError(row_number, cleaned.get('serial_number', ''), errors))
+            continue
+        seen_serials[cleaned['serial_number']] = row_number
+        batch.append((row_number, cleaned))
+        if len(batch) >= batch_size:
+            _write_batch(batch, result)
+            batch = []
+
+    if batch:
+        _write_batch(batch, result)
+
+    # bulk_create bypasses the model signals that keep dashboard counts fresh
+    invalidate_asset_stats()
+    # ...and the ones that keep search suggestions current
+    reset_index()
+    result.elapsed = time.perf_counter() - started
+    return result
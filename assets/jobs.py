@@ -0,0 +1,154 @@
+"""
+Background export jobs.
+
+Exports run on a small in-process thread pool (no broker needed), so the
+request that starts one returns immediately. Progress is written to the
+ExportJob row as rows are produced, the finished file lands in
+ASSET_EXPORT_ROOT (outside MEDIA_ROOT, so only the download view serves
+it), and expired files are removed by cleanup_expired_exports() (run on
+every new job and by ``manage.py cleanup_exports``).
+
+A request by the same user for the same format and filters as a recent job
+reuses that job (running or finished) instead of generating the file
+again.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .exports import export_querysets, export_rows, write_csv, write_xlsx
+from .models import ExportJob
+from .search import parse_id
+
+logger = logging.getLogger(__name__)
+
+# How often (in rows) progress is written back to the job row
+PROGRESS_INTERVAL = 1000
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'ASSET_EXPORT_WORKERS', 2),
+                thread_name_prefix='asset-export',
+            )
+    return _executor
+
+
+def get_filter_hash(export_format, filters):
+    payload = json.dumps([export_format, filters], sort_keys=True)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def start_export(filters, export_format, user):
+    """
+    Return (job, reused) for an export of the assets matching ``filters``
+    (a dict with search/status/category/department/company/archived). A
+    recent identical job of the same user is reused.
+    """
+    cleanup_expired_exports()
+    now = timezone.now()
+    filter_hash = get_filter_hash(export_format, filters)
+    reuse_after = now - timedelta(seconds=getattr(settings, 'ASSET_EXPORT_REUSE_SECONDS', 300))
+
+    recent = (
+        ExportJob.objects
+        .filter(requested_by=user, filter_hash=filter_hash, status__in=['pending', 'running', 'done'], created_at__gte=reuse_after)
+        .order_by('-created_at')
+        .first()
+    )
+    if recent is not None:
+        return recent, True
+
+    job = ExportJob.objects.create(
+        requested_by=user, format=export_format, filters=filters, filter_hash=filter_hash,
+    )
+    transaction.on_commit(lambda: get_executor().submit(run_export_job, job.pk))
+    return job, False
+
+
+def _track_progress(rows, job_id):
+    count = 0
+    for row in rows:
+        yield row
+        count += 1
+        if count % PROGRESS_INTERVAL == 0:
+            ExportJob.objects.filter(pk=job_id).update(processed_rows=count)
+
+
+def run_export_job(job_id):
+    """Generate the file for one job. Runs on a pool thread."""
+    try:
+        job = ExportJob.objects.get(pk=job_id)
+        assets, archived = export_querysets(
+            job.filters.get('search', ''), job.filters.get('status', ''), job.filters.get('category', ''),
+            include_archived=job.filters.get('archived') == '1',
+            department_id=parse_id(job.filters.get('department')),
+            company_id=parse_id(job.filters.get('company')),
+        )
+        total = assets.count() + (archived.count() if archived is not None else 0)
+        ExportJob.objects.filter(pk=job_id).update(status='running', total_rows=total)
+
+        relative_path = f"{job.pk}.{job.format}"
+        path = Path(settings.ASSET_EXPORT_ROOT) / relative_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial_path = path.with_name(path.name + '.part')
+
+        rows = _track_progress(export_rows(assets, archived), job_id)
+        if job.format == 'csv':
+            with open(partial_path, 'w', newline='', encoding='utf-8') as output:
+                write_csv(rows, output)
+        else:
+            write_xlsx(rows, partial_path)
+        os.replace(partial_path, path)
+
+        now = timezone.now()
+        ttl = timedelta(seconds=getattr(settings, 'ASSET_EXPORT_TTL', 86400))
+        ExportJob.objects.filter(pk=job_id).update(
+            status='done', file=relative_path, processed_rows=total, finished_at=now, expires_at=now + ttl,
+        )
+    except Exception as exc:
+        logger.exception("Export job %s failed", job_id)
+        ExportJob.objects.filter(pk=job_id).update(status='failed', error=str(exc), finished_at=timezone.now())
+    finally:
+        # Pool threads keep their own connections; do not leak them
+        connections.close_all()
+
+
+def cleanup_expired_exports():
+    """
+    Delete expired export files and their jobs, and fail jobs that have been
+    pending/running for too long (e.g. the process was restarted mid-export).
+    Returns the number of jobs deleted.
+    """
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=getattr(settings, 'ASSET_EXPORT_STALE_SECONDS', 3600))
+    ExportJob.objects.filter(status__in=['pending', 'running'], created_at__lt=stale_before).update(
+        status='failed', error='The export did not finish (the worker was probably restarted).', finished_at=now,
+    )
+
+    ttl = timedelta(seconds=getattr(settings, 'ASSET_EXPORT_TTL', 86400))
+    expired = ExportJob.objects.filter(expires_at__lte=now) | ExportJob.objects.filter(
+        status='failed', finished_at__lte=now - ttl,
+    )
+    deleted = 0
+    for job in expired:
+        if job.file:
+            job.file.delete(save=False)
+        job.delete()
+        deleted += 1
+    return deleted
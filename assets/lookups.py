@@ -0,0 +1,82 @@
+"""
+Company and Department lookup tables.
+
+Assets (and user profiles) point at these rows by integer key instead of
+carrying free text, so filters compare indexed integers and one department
+is one row however it was typed. Names are stored normalized (surrounding
+and repeated whitespace removed) and are unique regardless of case;
+find_or_create() maps any spelling to the existing row.
+
+Both tables are small, so their id -> name maps are kept in the default
+cache (see lookup_names()). Company/Department save and delete signals drop
+them; ASSET_STATS_CACHE_TIMEOUT bounds how stale they get when the cache is
+per-process and another worker made the change.
+"""
+from django.core.cache import cache
+
+from .models import normalize_name
+from .stats import get_cache_timeout
+
+NAMES_KEY = 'assets:lookups:{model}'
+
+
+def lookup_key(name):
+    """What two spellings of the same name have in common."""
+    return normalize_name(name).casefold()
+
+
+def lookup_names(model):
+    """Return {id: name} for every row of ``model`` (Company or Department)."""
+    key = NAMES_KEY.format(model=model._meta.model_name)
+    names = cache.get(key)
+    if names is None:
+        names = dict(model.objects.values_list('pk', 'name'))
+        cache.set(key, names, get_cache_timeout())
+    return names
+
+
+async def alookup_names(model):
+    key = NAMES_KEY.format(model=model._meta.model_name)
+    names = await cache.aget(key)
+    if names is None:
+        names = {pk: name async for pk, name in model.objects.values_list('pk', 'name')}
+        await cache.aset(key, names, get_cache_timeout())
+    return names
+
+
+def lookup_name(model, pk):
+    """Name of one row, or None; reloads the map once for a row it has not seen."""
+    if pk is None:
+        return None
+    name = lookup_names(model).get(pk)
+    if name is None:
+        invalidate_lookup_names(model)
+        name = lookup_names(model).get(pk)
+    return name
+
+
+def lookup_choices(names):
+    """(id, name) pairs sorted by name, for a filter select."""
+    return sorted(names.items(), key=lambda item: item[1].casefold())
+
+
+def invalidate_lookup_names(model):
+    cache.delete(NAMES_KEY.format(model=model._meta.model_name))
+
+
+def find_or_create(model, names):
+    """
+    Return {name: row} for every name in ``names``, matching existing rows
+    whatever their spelling and creating the missing ones in one query.
+    """
+    wanted = {}
+    for name in names:
+        wanted.setdefault(lookup_key(name), []).append(name)
+    rows = {lookup_key(row.name): row for row in model.objects.all()}
+    missing = [model(name=normalize_name(spellings[0])) for key, spellings in wanted.items() if key not in rows]
+    if missing:
+        # A concurrent import may create the same row; the re-read picks it up
+        model.objects.bulk_create(missing, ignore_conflicts=True)
+        rows = {lookup_key(row.name): row for row in model.objects.all()}
+        invalidate_lookup_names(model)
+    return {name: rows[key] for key, spellings in wanted.items() for name in spellings}
@@ -0,0 +1,30 @@
+"""
+Move retired assets out of the hot Asset table into the archive tier.
+
+Assets retired (and not changed since) for more than
+ASSET_ARCHIVE_RETIRED_AFTER_DAYS are moved, with their assignment history,
+to ArchivedAsset/ArchivedAssignment. See assets/archive.py.
+
+Usage (e.g. nightly from cron, see crontab):
+    python manage.py archive_assets
+    python manage.py archive_assets --days 0
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from assets.archive import archive_retired
+from assets.audit import buffer
+
+
+class Command(BaseCommand):
+    help = "Archive assets that have been retired for longer than the grace period."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help="Archive assets retired more than this many days ago (default: ASSET_ARCHIVE_RETIRED_AFTER_DAYS).")
+
+    def handle(self, *args, **options):
+        if options['days'] is not None and options['days'] < 0:
+            raise CommandError("--days cannot be negative.")
+        moved = archive_retired(options['days'])
+        # The 'archive' events are queued on commit; write them before exiting
+        buffer.flush()
+        self.stdout.write(self.style.SUCCESS(f"Archived {moved} retired asset(s)."))
@@ -0,0 +1,30 @@
+"""
+Move old asset events into monthly archive rows.
+
+Events older than ASSET_AUDIT_ARCHIVE_AFTER_DAYS (whole months only) are
+folded into one AssetEventArchive row per asset and month and deleted from
+the live log, keeping the timeline index small.
+
+Usage (e.g. monthly from cron):
+    python manage.py archive_events
+    python manage.py archive_events --days 180
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from assets.audit import archive_cutoff, archive_events, buffer
+
+
+class Command(BaseCommand):
+    help = "Archive asset events older than the retention period into monthly rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help="Archive events older than this many days (default: ASSET_AUDIT_ARCHIVE_AFTER_DAYS).")
+
+    def handle(self, *args, **options):
+        if options['days'] is not None and options['days'] < 0:
+            raise CommandError("--days cannot be negative.")
+        # Queued events of this process are written first so none are missed
+        buffer.flush()
+        moved = archive_events(options['days'])
+        cutoff = archive_cutoff(options['days'])
+        self.stdout.write(self.style.SUCCESS(f"Archived {moved} event(s) from before {cutoff:%Y-%m-%d}."))
@@ -0,0 +1,142 @@
+"""
+Benchmark the main pages through the Django test client and save the
+results as JSON for comparison across commits.
+
+Usage:
+    python manage.py benchmark
+    python manage.py benchmark --iterations 50 --output bench/$(git rev-parse --short HEAD).json
+    python manage.py benchmark --compare bench/before.json --clear-caches
+    python manage.py benchmark --sizes 10000,100000,1000000 --output bench/sweep.json
+    python manage.py benchmark --history-sizes 100000,1000000,10000000 --output bench/as-of.json
+
+The asset_list search also runs under BasicSearchBackend and under the
+indexed backend, and the two are compared. The point-in-time (as-of)
+queries follow: held_at() itself, the as-of page and the API's ?as_of=.
+Autocomplete runs last, for the prefix index directly and for the API's
+?q=; the lookups are checked against the AUTOCOMPLETE_TARGET_MS p95 budget.
+
+Fill the database first (e.g. with generate_synthetic_data) so the numbers
+reflect realistic volumes. --sizes does that itself: before each step it
+adds synthetic assets until the table has that many rows, so run it on a
+scratch database. --history-sizes does the same for the assignment history
+and runs only the as-of queries at each size.
+"""
+import json
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from assets.benchmark import (
+    AUTOCOMPLETE_TARGET_MS, autocomplete_comparison, compare, run_benchmark, run_history_sweep, run_sweep,
+    search_comparison,
+)
+
+
+class Command(BaseCommand):
+    help = "Measure latency, query count and memory of the main pages."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help="Username to run as (default: the first admin).")
+        parser.add_argument('--iterations', type=int, default=20, help="Timed requests per page.")
+        parser.add_argument('--warmup', type=int, default=2, help="Untimed requests per page before measuring.")
+        parser.add_argument('--clear-caches', action='store_true', help="Clear all caches before every request.")
+        parser.add_argument('--output', help="Write the results to this JSON file.")
+        parser.add_argument('--compare', help="Compare with the results in this JSON file.")
+        parser.add_argument('--sizes', help="Comma-separated asset counts to grow the database to and benchmark at, "
+                                            "e.g. 10000,100000,1000000.")
+        parser.add_argument('--history-sizes', help="Comma-separated assignment counts to grow the history to and "
+                                                    "benchmark the as-of queries at, e.g. 100000,1000000,10000000.")
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError("--iterations must be at least 1.")
+        if options['user']:
+            user = User.objects.filter(username=options['user']).first()
+        else:
+            user = User.objects.filter(userprofile__role='admin').order_by('pk').first()
+        if user is None:
+            raise CommandError("No such user; pass --user with an existing username.")
+
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as source:
+                    baseline = json.load(source)
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"Could not read {options['compare']}: {exc}")
+
+        sweep = None
+        if options['sizes']:
+            sweep, option, unit = run_sweep, 'sizes', 'assets'
+        elif options['history_sizes']:
+            sweep, option, unit = run_history_sweep, 'history_sizes', 'assignments'
+        if sweep is not None:
+            sizes = self.parse_sizes(options[option], option)
+            runs = sweep(user, sizes, iterations=options['iterations'], warmup=options['warmup'],
+                         clear_caches=options['clear_caches'], stdout=self.stdout)
+            for size, results in runs.items():
+                self.stdout.write(f"\n--- {size} {unit} ---")
+                self.report(results, (baseline or {}).get('sizes', {}).get(str(size)), options['compare'])
+            output = {'sizes': runs}
+        else:
+            output = run_benchmark(user, iterations=options['iterations'], warmup=options['warmup'],
+                                   clear_caches=options['clear_caches'])
+            self.report(output, baseline, options['compare'])
+
+        if options['output']:
+            with open(options['output'], 'w') as target:
+                json.dump(output, target, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}."))
+
+    def parse_sizes(self, value, option):
+        flag = '--' + option.replace('_', '-')
+        try:
+            sizes = sorted({int(size) for size in value.split(',') if size.strip()})
+        except ValueError:
+            raise CommandError(f"{flag} must be comma-separated numbers.")
+        if not sizes or sizes[0] < 1:
+            raise CommandError(f"{flag} must be positive numbers.")
+        return sizes
+
+    def report(self, results, baseline, baseline_path):
+        rows = results['rows']
+        self.stdout.write(
+            f"{results['database']} database with {rows['users']} users, {rows['assets']} assets and "
+            f"{rows['assignments']} assignments; running as {results['user']}."
+        )
+        for name, result in results['scenarios'].items():
+            if 'status' not in result:
+                # A call timed directly (held_at(), PrefixIndex.search()), not a request
+                count = 'held' if 'held' in result else 'suggestions'
+                self.stdout.write(
+                    f"{name:<44} p50={result['p50_ms']:8.3f} ms  p95={result['p95_ms']:8.3f} ms  "
+                    f"queries={result['queries']:<4} {count}={result[count]}"
+                )
+                continue
+            rss = f"{result['peak_rss_kb']} KB" if result['peak_rss_kb'] is not None else 'n/a'
+            self.stdout.write(
+                f"{name:<44} p50={result['p50_ms']:8.1f} ms  p95={result['p95_ms']:8.1f} ms  "
+                f"ttfb={result['ttfb_p50_ms']:8.1f} ms  queries={result['queries']:<4} "
+                f"peak={result['peak_memory_kb']:9.1f} KB  rss={rss}  status={result['status']}"
+            )
+
+        comparison = search_comparison(results)
+        if comparison:
+            self.stdout.write("\nSearch, asset_list p50: BasicSearchBackend vs. indexed backend")
+            for term_name, basic, indexed, speedup, same in comparison:
+                ratio = f"{speedup:.1f}x" if speedup is not None else 'n/a'
+                matches = '' if same else '  MATCHES DIFFER'
+                self.stdout.write(f"{term_name:<30} {basic:8.1f} ms -> {indexed:8.1f} ms  {ratio}{matches}")
+
+        autocomplete = autocomplete_comparison(results)
+        if autocomplete:
+            self.stdout.write(f"\nAutocomplete p95, index lookup against the {AUTOCOMPLETE_TARGET_MS} ms target (API)")
+            for name, lookup, api, within in autocomplete:
+                verdict = 'ok' if within else self.style.WARNING('OVER TARGET')
+                self.stdout.write(f"{name:<30} {lookup:8.3f} ms  {verdict:<11} ({api:.1f} ms)")
+
+        if baseline is not None:
+            self.stdout.write(f"\nChange since {baseline.get('commit') or baseline_path}:")
+            for name, metric, old, new, change in compare(baseline, results):
+                delta = f"{change:+.1f}%" if change is not None else 'n/a'
+                self.stdout.write(f"{name:<44} {metric:<16} {old:>10} -> {new:<10} {delta}")
@@ -0,0 +1,48 @@
+"""
+Verify that every asset's status, assigned_user and current_assignment agree
+with its assignment history, and optionally repair the ones that do not.
+
+Usage:
+    python manage.py check_assignments
+    python manage.py check_assignments --repair
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from assets.consistency import find_inconsistencies, repair
+from assets.models import Asset
+
+SHOWN_SERIALS = 10
+
+
+class Command(BaseCommand):
+    help = "Check (and with --repair, fix) assets whose assignment state disagrees with their history."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repair', action='store_true', help="Rebuild the state of inconsistent assets from their history.")
+        parser.add_argument('--fail', action='store_true', help="Exit with an error if inconsistencies remain.")
+
+    def handle(self, *args, **options):
+        problems = find_inconsistencies()
+        if not problems:
+            self.stdout.write(self.style.SUCCESS("All assets are consistent with their assignment history."))
+            return
+
+        affected = sorted({pk for pks in problems.values() for pk in pks})
+        for description, pks in problems.items():
+            serials = Asset.objects.filter(pk__in=pks[:SHOWN_SERIALS]).values_list('serial_number', flat=True)
+            more = f" and {len(pks) - SHOWN_SERIALS} more" if len(pks) > SHOWN_SERIALS else ''
+            self.stdout.write(self.style.WARNING(f"{len(pks)} asset(s) {description}: {', '.join(serials)}{more}"))
+
+        if options['repair']:
+            for pk in affected:
+                repair(pk)
+            remaining = find_inconsistencies()
+            self.stdout.write(self.style.SUCCESS(f"Repaired {len(affected)} asset(s)."))
+            if remaining:
+                self.stdout.write(self.style.ERROR(f"{len(remaining)} check(s) still failing; run again for details."))
+        else:
+            remaining = problems
+            self.stdout.write(f"{len(affected)} asset(s) affected; run with --repair to fix them.")
+
+        if remaining and options['fail']:
+            raise CommandError("Assets are inconsistent with their assignment history.")
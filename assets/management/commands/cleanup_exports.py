@@ -0,0 +1,17 @@
+"""
+Delete expired background export files and their jobs.
+
+Usage (e.g. from cron):
+    python manage.py cleanup_exports
+"""
+from django.core.management.base import BaseCommand
+
+from assets.jobs import cleanup_expired_exports
+
+
+class Command(BaseCommand):
+    help = "Delete expired export files and fail export jobs that never finished."
+
+    def handle(self, *args, **options):
+        deleted = cleanup_expired_exports()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired export job(s)."))
@@ -0,0 +1,17 @@
+"""
+Delete idempotency keys older than ASSET_IDEMPOTENCY_KEY_TTL.
+
+Usage (e.g. from cron):
+    python manage.py cleanup_idempotency_keys
+"""
+from django.core.management.base import BaseCommand
+
+from assets.idempotency import cleanup_expired_keys
+
+
+class Command(BaseCommand):
+    help = "Delete expired idempotency keys of assign/return/bulk requests."
+
+    def handle(self, *args, **options):
+        deleted = cleanup_expired_keys()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired idempotency key(s)."))
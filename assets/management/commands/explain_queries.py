@@ -0,0 +1,142 @@
+"""
+Run EXPLAIN on the canonical queries behind each view and flag full table scans.
+
+Usage:
+    python manage.py explain_queries
+    python manage.py explain_queries --verbose --fail-on-seq-scan
+
+Planners happily sequential-scan small tables, so run this against a database
+with realistic volumes (e.g. a production snapshot) to get meaningful results.
+"""
+import re
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count, OuterRef, Subquery
+from django.utils import timezone
+
+from assets.exports import annotate_for_export
+from assets.history import held_at
+from assets.models import Asset, AssetAssignment, AssetEvent
+from assets.search import SQLITE_FTS_TABLE, get_search_backend
+
+# PostgreSQL: "Seq Scan on assets_asset". SQLite: "SCAN assets_asset" without
+# "USING ... INDEX", which would be an index-only or ordered index scan.
+SEQ_SCAN_PATTERNS = {
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+    'sqlite': re.compile(r'\bSCAN (\w+)\b(?! USING)'),
+}
+
+
+def _latest(queryset, field):
+    # As in asset_detail's ETag validator (assets.views)
+    return Subquery(queryset.filter(asset=OuterRef('pk')).order_by(f'-{field}').values(field)[:1])
+
+
+def canonical_queries():
+    """
+    Return (label, queryset, tables allowed to be scanned) for each hot path,
+    built the way the views build them: assignment state through
+    current_assignment, department/company through their lookup keys, and
+    the search through the configured backend (search_text).
+
+    Sample values come from the current database so the planner sees real
+    parameters; an empty database falls back to placeholders.
+    """
+    user_id = User.objects.values_list('pk', flat=True).first() or 0
+    sample = Asset.objects.values('pk', 'serial_number', 'department_id', 'company_id').first() or {
+        'pk': 0, 'serial_number': '', 'department_id': 0, 'company_id': 0,
+    }
+    search_term = sample['serial_number'][:6] or 'laptop'
+    list_order = ('-created_at', '-id')
+    listed = Asset.objects.select_related('assigned_user', 'department')
+    open_assignments = (
+        AssetAssignment.objects.filter(returned_date__isnull=True).select_related('asset', 'assigned_to', 'assigned_by')
+    )
+    # The dashboard's status counts read every asset by definition, like a
+    # full export
+    whole_table = {Asset._meta.db_table}
+    # The SQLite FTS5 table is a virtual table: its "SCAN" is the index lookup
+    search_tables = {SQLITE_FTS_TABLE}
+
+    return [
+        ('dashboard: status counts',
+         Asset.objects.order_by().values('department_id', 'status').annotate(count=Count('id')), whole_table),
+        ('dashboard: user asset count', Asset.objects.filter(assigned_user_id=user_id), set()),
+        ('dashboard: recent open assignments', open_assignments.order_by('-assigned_date')[:5], set()),
+        ('dashboard: department open assignments',
+         open_assignments.filter(asset__department_id=sample['department_id']).order_by('-assigned_date')[:5], set()),
+        ('dashboard: user open assignments',
+         open_assignments.filter(assigned_to_id=user_id).order_by('-assigned_date')[:5], set()),
+        # The ETag validator aggregates these columns over the filtered rows
+        ('asset_list: status validator', Asset.objects.filter(status='available').order_by().values('updated_at', 'id'), set()),
+        ('asset_list: first page', listed.order_by(*list_order)[:51], set()),
+        ('asset_list: status filter', listed.filter(status='available').order_by(*list_order)[:51], set()),
+        ('asset_list: category filter', listed.filter(model_category='laptop').order_by(*list_order)[:51], set()),
+        ('asset_list: department filter',
+         listed.filter(department_id=sample['department_id']).order_by(*list_order)[:51], set()),
+        ('asset_list: company filter', listed.filter(company_id=sample['company_id']).order_by(*list_order)[:51], set()),
+        ('asset_list: user assets', listed.filter(assigned_user_id=user_id).order_by(*list_order)[:51], set()),
+        ('asset_list: search',
+         get_search_backend().search(listed, search_term).order_by('-search_rank', *list_order)[:51], search_tables),
+        ('asset_detail: validator', Asset.objects.filter(serial_number=sample['serial_number']).values(
+            'updated_at',
+            last_assigned=_latest(AssetAssignment.objects.all(), 'assigned_date'),
+            last_returned=_latest(AssetAssignment.objects.filter(returned_date__isnull=False), 'returned_date'),
+            last_event=_latest(AssetEvent.objects.all(), 'created_at'),
+        ), set()),
+        ('asset_detail: asset',
+         Asset.objects.select_related('assigned_user', 'department', 'company').filter(serial_number=sample['serial_number']),
+         set()),
+        ('asset_detail: assignment history',
+         AssetAssignment.objects.filter(asset_id=sample['pk']).select_related('assigned_to', 'assigned_by')
+         .order_by('-assigned_date'), set()),
+        ('assign/return: current assignment',
+         Asset.objects.select_related('current_assignment').filter(pk=sample['pk']), set()),
+        ('as-of: assignments held now', held_at(timezone.now()).order_by('-assigned_date', '-id')[:51], set()),
+        # A full export reads every asset by definition; only the joins and
+        # latest-assignment subqueries have to be index-driven.
+        ('export: annotated rows', annotate_for_export(Asset.objects.order_by('serial_number')), whole_table),
+    ]
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN the canonical view queries and flag sequential scans."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose', action='store_true', help="Print the full plan for every query.")
+        parser.add_argument(
+            '--fail-on-seq-scan', action='store_true',
+            help="Exit with an error if any query sequential-scans a table (useful in CI).",
+        )
+
+    def handle(self, *args, **options):
+        pattern = SEQ_SCAN_PATTERNS.get(connection.vendor)
+        if pattern is None:
+            self.stdout.write(self.style.WARNING(
+                f"Sequential scan detection is not supported on '{connection.vendor}'; printing plans only."
+            ))
+
+        flagged = []
+        for label, queryset, allowed_tables in canonical_queries():
+            plan = queryset.explain()
+            scanned = set(pattern.findall(plan)) - allowed_tables if pattern else set()
+
+            if scanned:
+                flagged.append(label)
+                self.stdout.write(self.style.ERROR(f"SEQ SCAN  {label}: {', '.join(sorted(scanned))}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"OK        {label}"))
+
+            if options['verbose'] or scanned or pattern is None:
+                for line in plan.splitlines():
+                    self.stdout.write(f"          {line}")
+
+        if flagged:
+            message = f"{len(flagged)} quer{'y' if len(flagged) == 1 else 'ies'} use sequential scans."
+            if options['fail_on_seq_scan']:
+                raise CommandError(message)
+            self.stdout.write(self.style.WARNING(message))
+        else:
+            self.stdout.write(self.style.SUCCESS("No sequential scans found."))
@@ -0,0 +1,50 @@
+"""
+Fill the database with synthetic users, assets and assignment histories for
+capacity testing and benchmarks.
+
+Usage:
+    python manage.py generate_synthetic_data --users 1000 --assets 100000 --assignments 400000
+    python manage.py generate_synthetic_data --assets 50000 --seed 7 --days 730
+
+Synthetic users log in with the password in assets.synthetic.DEFAULT_PASSWORD.
+Run refresh_analytics --full afterwards to include the new history in the
+analytics snapshots.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from assets.synthetic import DEFAULT_BATCH_SIZE, generate
+
+
+class Command(BaseCommand):
+    help = "Bulk-create synthetic users, assets and assignment histories."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100, help="Number of users to create.")
+        parser.add_argument('--assets', type=int, default=1000, help="Number of assets to create.")
+        parser.add_argument('--assignments', type=int, default=3000,
+                            help="Approximate number of assignment records to create.")
+        parser.add_argument('--days', type=int, default=365, help="Length of the generated history in days.")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed; the same seed gives the same data.")
+        parser.add_argument('--prefix', default='synth', help="Prefix of the generated usernames and serial numbers.")
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help="Rows per bulk insert/transaction.")
+
+    def handle(self, *args, **options):
+        for option in ('users', 'assets', 'assignments', 'days'):
+            if options[option] < 0:
+                raise CommandError(f"--{option} cannot be negative.")
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+
+        try:
+            result = generate(
+                users=options['users'],
+                assets=options['assets'],
+                assignments=options['assignments'],
+                prefix=options['prefix'],
+                days=options['days'],
+                seed=options['seed'],
+                batch_size=options['batch_size'],
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(f"Created {result}."))
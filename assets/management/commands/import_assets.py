@@ -0,0 +1,49 @@
+"""
+Bulk-import assets from a CSV or XLSX file.
+
+Usage:
+    python manage.py import_assets inventory.xlsx
+    python manage.py import_assets inventory.csv --batch-size 5000 --report errors.csv
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from assets.imports import import_assets
+
+
+class Command(BaseCommand):
+    help = "Bulk-import assets from a CSV or XLSX file with batched upserts."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV or XLSX file to import.")
+        parser.add_argument('--batch-size', type=int, default=None, help="Rows per bulk upsert/transaction.")
+        parser.add_argument('--report', help="Write the per-row error report to this CSV file.")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not path.lower().endswith(('.csv', '.xlsx')):
+            raise CommandError("Only .csv and .xlsx files can be imported.")
+
+        try:
+            with open(path, 'rb') as source:
+                result = import_assets(source, path, batch_size=options['batch_size'])
+        except OSError as exc:
+            raise CommandError(f"Could not read {path}: {exc}")
+
+        self.stdout.write(
+            f"Read {result.total_rows} rows in {result.elapsed:.2f}s "
+            f"({result.rows_per_second:.0f} rows/sec): "
+            f"{result.created} created, {result.updated} updated, {result.error_count} skipped."
+        )
+
+        if options['report']:
+            with open(options['report'], 'w', newline='') as report:
+                result.write_error_report(report)
+            self.stdout.write(f"Error report written to {options['report']}.")
+        else:
+            for error in result.errors:
+                self.stdout.write(self.style.WARNING(str(error)))
+
+        if result.error_count:
+            self.stdout.write(self.style.WARNING(f"{result.error_count} rows were skipped."))
+        else:
+            self.stdout.write(self.style.SUCCESS("Import completed without errors."))
@@ -0,0 +1,30 @@
+"""
+Refresh the daily analytics snapshots behind the analytics dashboard.
+
+Usage (e.g. nightly from cron, shortly after midnight):
+    python manage.py refresh_analytics
+    python manage.py refresh_analytics --since 2024-01-01
+    python manage.py refresh_analytics --full
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from assets.analytics import refresh_analytics
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily analytics snapshots changed since the last run."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help="Recompute every day from the start of the history.")
+        parser.add_argument('--since', help="Also recompute every day from this date (YYYY-MM-DD).")
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            since = parse_date(options['since'])
+            if since is None:
+                raise CommandError("--since must be a date in YYYY-MM-DD format.")
+
+        days = refresh_analytics(full=options['full'], since=since)
+        self.stdout.write(self.style.SUCCESS(f"Recomputed {days} day(s) of analytics snapshots."))
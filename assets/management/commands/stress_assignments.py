@@ -0,0 +1,136 @@
+"""
+Hammer the assign/return views from many threads and check for anomalies.
+
+A few available assets are assigned and returned over and over by
+concurrent clients logged in as an asset incharge; some POSTs are sent
+twice with the same idempotency key, like a retry after a timeout. Afterwards
+the command verifies that:
+
+- no asset has more than one open assignment,
+- check_assignments finds nothing (status, assigned user and
+  current_assignment agree with the history),
+- every applied request had exactly one effect: one assignment opened per
+  recorded assign key and one closed per recorded return key.
+
+Run it on a scratch database (it leaves the assignments it made behind):
+    python manage.py stress_assignments --threads 16 --requests 200 --assets 5
+
+On SQLite, use DATABASE_SQLITE_WAL=True DATABASE_SQLITE_TRANSACTION_MODE=IMMEDIATE;
+without them, concurrent writers fail with "database is locked" (reported
+as errors, not anomalies).
+"""
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connections
+from django.db.models import Count
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from assets.consistency import find_inconsistencies
+from assets.models import Asset, AssetAssignment, IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = "Run concurrent assign/return requests and verify there are no anomalies."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help="Concurrent clients.")
+        parser.add_argument('--requests', type=int, default=100, help="Requests per client.")
+        parser.add_argument('--assets', type=int, default=5, help="Available assets to fight over (fewer means more contention).")
+        parser.add_argument('--retry-rate', type=float, default=0.2, help="Share of POSTs sent a second time with the same key.")
+        parser.add_argument('--user', help="Asset incharge to run as (default: the first one).")
+
+    def handle(self, *args, **options):
+        incharge = User.objects.filter(userprofile__role='asset_incharge')
+        if options['user']:
+            incharge = incharge.filter(username=options['user'])
+        incharge = incharge.order_by('pk').first()
+        if incharge is None:
+            raise CommandError("No asset incharge found; pass --user.")
+        holders = list(User.objects.filter(userprofile__role='user').values_list('pk', flat=True)[:20])
+        serials = list(
+            Asset.objects.filter(status='available', current_assignment__isnull=True)
+            .order_by('pk').values_list('serial_number', flat=True)[:options['assets']]
+        )
+        if not holders or not serials:
+            raise CommandError("Needs at least one user and one available asset.")
+
+        started_at = timezone.now()
+        last_assignment_id = AssetAssignment.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+        outcomes = Counter()
+        lock = threading.Lock()
+
+        def worker(seed):
+            rng = random.Random(seed)
+            client = Client()
+            client.force_login(incharge)
+            local = Counter()
+            try:
+                for _ in range(options['requests']):
+                    serial = rng.choice(serials)
+                    key = uuid.uuid4().hex
+                    if rng.random() < 0.5:
+                        url = reverse('assign_asset', args=[serial])
+                        data = {'assigned_to': rng.choice(holders), 'notes': '', 'idempotency_key': key}
+                    else:
+                        url = reverse('return_asset', args=[serial])
+                        current = Asset.objects.filter(serial_number=serial).values_list('current_assignment_id', flat=True).first()
+                        if current is None:
+                            local['skipped'] += 1
+                            continue
+                        data = {'assignment': current, 'idempotency_key': key}
+                    for _attempt in range(2 if rng.random() < options['retry_rate'] else 1):
+                        try:
+                            response = client.post(url, data)
+                            local[f'http {response.status_code}'] += 1
+                        except DatabaseError as exc:
+                            local[f'error: {exc}'] += 1
+            finally:
+                connections.close_all()
+                with lock:
+                    outcomes.update(local)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['threads']) as executor:
+            list(executor.map(worker, range(options['threads'])))
+        elapsed = time.perf_counter() - start
+
+        total = sum(count for outcome, count in outcomes.items() if outcome != 'skipped')
+        self.stdout.write(f"{total} requests in {elapsed:.1f}s ({total / elapsed:.0f} req/s) from {options['threads']} threads")
+        for outcome, count in sorted(outcomes.items()):
+            self.stdout.write(f"  {outcome}: {count}")
+
+        anomalies = {}
+        duplicated_open = (
+            AssetAssignment.objects.filter(returned_date__isnull=True)
+            .values('asset_id').annotate(count=Count('id')).filter(count__gt=1).count()
+        )
+        if duplicated_open:
+            anomalies['assets with several open assignments'] = duplicated_open
+        for description, pks in find_inconsistencies().items():
+            anomalies[description] = len(pks)
+
+        keys = IdempotencyKey.objects.filter(user=incharge, created_at__gte=started_at)
+        opened = AssetAssignment.objects.filter(pk__gt=last_assignment_id).count()
+        closed = AssetAssignment.objects.filter(returned_date__gte=started_at).count()
+        applied_assigns = keys.filter(action='assign').count()
+        applied_returns = keys.filter(action='return').count()
+        if opened != applied_assigns:
+            anomalies['assignments opened vs. applied assign requests'] = f"{opened} != {applied_assigns}"
+        if closed != applied_returns:
+            anomalies['assignments closed vs. applied return requests'] = f"{closed} != {applied_returns}"
+        self.stdout.write(f"Applied {applied_assigns} assign(s) and {applied_returns} return(s).")
+
+        if anomalies:
+            for description, count in anomalies.items():
+                self.stdout.write(self.style.ERROR(f"{description}: {count}"))
+            raise CommandError("Anomalies found.")
+        self.stdout.write(self.style.SUCCESS("No anomalies."))
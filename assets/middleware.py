@@ -0,0 +1,197 @@
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.utils.functional import SimpleLazyObject
+
+from .models import UserProfile
+
+db_logger = logging.getLogger('assets.db')
+
+
+class Role:
+    """
+    The current user's role, resolved once per request. Exposed to views as
+    ``request.user_role`` and to templates as ``user_role``.
+    """
+
+    def __init__(self, profile=None):
+        self.profile = profile
+        self.name = profile.role if profile else None
+
+    @classmethod
+    def for_user(cls, user):
+        if not user.is_authenticated:
+            return cls()
+        try:
+            return cls(user.userprofile)
+        except UserProfile.DoesNotExist:
+            return cls()
+
+    @classmethod
+    async def afor_user(cls, user):
+        if not user.is_authenticated:
+            return cls()
+        if type(user).userprofile.is_cached(user):
+            # Loaded with the user by ProfileModelBackend: no query
+            return cls.for_user(user)
+        return cls(await UserProfile.objects.filter(user=user).afirst())
+
+    @property
+    def display(self):
+        return self.profile.get_role_display() if self.profile else ''
+
+    @property
+    def is_admin(self):
+        return self.name == 'admin'
+
+    @property
+    def is_asset_incharge(self):
+        return self.name == 'asset_incharge'
+
+    @property
+    def is_admin_or_incharge(self):
+        return self.is_admin or self.is_asset_incharge
+
+    @property
+    def is_user(self):
+        return self.name == 'user'
+
+    @property
+    def department_id(self):
+        """The department a department-scoped asset incharge is limited to, else None."""
+        if self.is_asset_incharge and self.profile.department_scoped:
+            return self.profile.department_id
+        return None
+
+    def __str__(self):
+        return self.name or ''
+
+
+async def aresolve_role(request):
+    """
+    Resolve request.user and request.user_role for an async view. Both are
+    lazy objects that would query the database on first use, which is not
+    allowed on the event loop (and templates read them too).
+    """
+    if not getattr(request, '_role_resolved', False):
+        user = await request.auser()
+        request.user = user
+        request.user_role = await Role.afor_user(user)
+        request._role_resolved = True
+    return request.user_role
+
+
+class UserRoleMiddleware:
+    """
+    Attach a lazily resolved Role to every request. Must come after
+    AuthenticationMiddleware. Async views call aresolve_role() instead of
+    reading it lazily.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        request.user_role = SimpleLazyObject(lambda: Role.for_user(request.user))
+        # Under ASGI this returns the coroutine of the async chain, which the
+        # handler awaits: no switch to a thread for this middleware
+        return self.get_response(request)
+
+
+class QueryTimer:
+    """``connection.execute_wrapper`` that counts queries and sums their time."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+
+
+# Connections belong to a thread. Under ASGI a request's database work runs
+# in its sync thread (sync_to_async), not on the event loop, so async
+# middleware installs its execute wrapper there.
+
+def _add_execute_wrapper(wrapper):
+    connection.execute_wrappers.append(wrapper)
+
+
+def _remove_execute_wrapper(wrapper):
+    connection.execute_wrappers.remove(wrapper)
+
+
+async def aadd_execute_wrapper(wrapper):
+    await sync_to_async(_add_execute_wrapper)(wrapper)
+
+
+async def aremove_execute_wrapper(wrapper):
+    await sync_to_async(_remove_execute_wrapper)(wrapper)
+
+
+class DatabaseMetricsMiddleware:
+    """
+    Per-request database metrics: time spent opening (or health-checking) the
+    connection, and the number and total time of queries. Reported in a
+    Server-Timing header and logged to ``assets.db`` at DEBUG level. Enabled
+    by ASSET_DB_METRICS; put it first so session and auth queries count.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'ASSET_DB_METRICS', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        reused, connect_time = self._connect()
+        timer = QueryTimer()
+        with connection.execute_wrapper(timer):
+            response = self.get_response(request)
+        return self._report(request, response, reused, connect_time, timer)
+
+    async def __acall__(self, request):
+        reused, connect_time = await sync_to_async(self._connect)()
+        timer = QueryTimer()
+        await aadd_execute_wrapper(timer)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await aremove_execute_wrapper(timer)
+        return self._report(request, response, reused, connect_time, timer)
+
+    def _connect(self):
+        reused = connection.connection is not None
+        start = time.perf_counter()
+        connection.ensure_connection()
+        return reused, time.perf_counter() - start
+
+    def _report(self, request, response, reused, connect_time, timer):
+        response['Server-Timing'] = (
+            f'db-connect;dur={connect_time * 1000:.2f};desc="{"reused" if reused else "new"}", '
+            f'db;dur={timer.duration * 1000:.2f};desc="{timer.count} queries"'
+        )
+        db_logger.debug(
+            "%s %s: %s connection %.1f ms, %d queries %.1f ms",
+            request.method, request.path, 'reused' if reused else 'new',
+            connect_time * 1000, timer.count, timer.duration * 1000,
+        )
+        return response
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:19
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='asset',
+            index=models.Index(fields=['-created_at', '-id'], name='asset_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='asset',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='asset_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='asset',
+            index=models.Index(fields=['model_category', '-created_at', '-id'], name='asset_category_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='asset',
+            index=models.Index(fields=['assigned_user', '-created_at', '-id'], name='asset_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='assetassignment',
+            index=models.Index(fields=['asset', '-assigned_date'], name='assignment_asset_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='assetassignment',
+            index=models.Index(condition=models.Q(('returned_date__isnull', True)), fields=['asset'], name='assignment_open_asset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='assetassignment',
+            index=models.Index(condition=models.Q(('returned_date__isnull', True)), fields=['assigned_to', '-assigned_date'], name='assignment_open_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='assetassignment',
+            index=models.Index(condition=models.Q(('returned_date__isnull', True)), fields=['-assigned_date'], name='assignment_open_recent_idx'),
+        ),
+    ]
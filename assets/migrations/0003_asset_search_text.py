@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:21
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Concat
+
+SEARCH_SEPARATOR = '\x1f'
+
+
+def populate_search_text(apps, schema_editor):
+    Asset = apps.get_model('assets', 'Asset')
+    User = apps.get_model('auth', 'User')
+    username = Subquery(User.objects.filter(pk=OuterRef('assigned_user_id')).values('username')[:1])
+    Asset.objects.update(search_text=Concat(
+        'serial_number', Value(SEARCH_SEPARATOR),
+        'display_name', Value(SEARCH_SEPARATOR),
+        'department', Value(SEARCH_SEPARATOR),
+        Coalesce(username, Value('')),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0002_asset_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='asset',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        # The vendor-specific index (pg_trgm GIN / SQLite FTS5) is installed
+        # by the post_migrate handler in assets.signals.
+        migrations.RunPython(populate_search_text, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:29
+
+from django.conf import settings
+from django.db import migrations, models
+
+PERIOD_INDEX = 'assignment_period_gist_idx'
+
+
+def create_period_index(apps, schema_editor):
+    # GiST over the [assigned_date, returned_date) range answers "open at T"
+    # for any T; range types are PostgreSQL-only.
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {PERIOD_INDEX} ON assets_assetassignment "
+            "USING gist (tstzrange(assigned_date, returned_date, '[)'))"
+        )
+
+
+def drop_period_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f"DROP INDEX IF EXISTS {PERIOD_INDEX}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0004_exportjob'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='assetassignment',
+            index=models.Index(fields=['returned_date', 'assigned_date'], name='assignment_period_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='assetassignment',
+            index=models.Index(fields=['assigned_to', '-assigned_date'], name='assignment_user_date_idx'),
+        ),
+        migrations.RunPython(create_period_index, drop_period_index),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0005_assignment_period_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalyticsRefreshState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('last_run_at', models.DateTimeField(blank=True, null=True)),
+                ('last_assignment_id', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AnalyticsSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('dimension', models.CharField(choices=[('department', 'Department'), ('category', 'Category'), ('company', 'Company')], max_length=20)),
+                ('value', models.CharField(max_length=100)),
+                ('total_assets', models.PositiveIntegerField(default=0)),
+                ('assigned_assets', models.PositiveIntegerField(default=0)),
+                ('assigned_seconds', models.BigIntegerField(default=0)),
+                ('day_seconds', models.PositiveIntegerField(default=86400)),
+                ('assignments_started', models.PositiveIntegerField(default=0)),
+                ('assignments_returned', models.PositiveIntegerField(default=0)),
+                ('returned_seconds', models.BigIntegerField(default=0)),
+                ('idle_gaps', models.PositiveIntegerField(default=0)),
+                ('idle_seconds', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-date', 'dimension', 'value'],
+                'indexes': [models.Index(fields=['dimension', 'date'], name='analytics_dimension_date_idx')],
+                'constraints': [models.UniqueConstraint(fields=('date', 'dimension', 'value'), name='analytics_snapshot_unique')],
+            },
+        ),
+    ]
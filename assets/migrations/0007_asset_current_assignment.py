@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def set_current_assignments(apps, schema_editor):
+    # Point every asset at its latest open assignment; any disagreement with
+    # status/assigned_user is reported by the check_assignments command
+    Asset = apps.get_model('assets', 'Asset')
+    AssetAssignment = apps.get_model('assets', 'AssetAssignment')
+    latest_open = AssetAssignment.objects.filter(
+        asset=OuterRef('pk'), returned_date__isnull=True,
+    ).order_by('-assigned_date', '-pk')
+    Asset.objects.filter(
+        pk__in=AssetAssignment.objects.filter(returned_date__isnull=True).values('asset_id'),
+    ).update(current_assignment=Subquery(latest_open.values('pk')[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0006_analytics_snapshots'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='asset',
+            name='current_assignment',
+            field=models.OneToOneField(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='current_for', to='assets.assetassignment'),
+        ),
+        migrations.RunPython(set_current_assignments, migrations.RunPython.noop),
+    ]
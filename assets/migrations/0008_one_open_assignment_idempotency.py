@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+DUPLICATE_NOTE = "\n(Closed when enforcing one open assignment per asset)"
+
+
+def close_duplicate_open_assignments(apps, schema_editor):
+    # Keep the latest open assignment of each asset as its current one and
+    # close the older ones when it started, so the constraint below can be
+    # created
+    Asset = apps.get_model('assets', 'Asset')
+    AssetAssignment = apps.get_model('assets', 'AssetAssignment')
+    open_assignments = AssetAssignment.objects.filter(returned_date__isnull=True)
+    duplicated = (
+        open_assignments.values('asset_id').annotate(count=models.Count('id')).filter(count__gt=1).values('asset_id')
+    )
+    latest = {}
+    for assignment in open_assignments.filter(asset_id__in=duplicated).order_by('asset_id', '-assigned_date', '-pk'):
+        if assignment.asset_id not in latest:
+            latest[assignment.asset_id] = assignment
+            Asset.objects.filter(pk=assignment.asset_id).update(current_assignment=assignment)
+            continue
+        assignment.returned_date = latest[assignment.asset_id].assigned_date
+        assignment.notes += DUPLICATE_NOTE
+        assignment.save(update_fields=['returned_date', 'notes'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0007_asset_current_assignment'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdempotencyKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64)),
+                ('action', models.CharField(max_length=30)),
+                ('summary', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='assetassignment',
+            name='assignment_open_asset_idx',
+        ),
+        migrations.RunPython(close_duplicate_open_assignments, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='assetassignment',
+            constraint=models.UniqueConstraint(condition=models.Q(('returned_date__isnull', True)), fields=('asset',), name='assignment_one_open_per_asset'),
+        ),
+        migrations.AddField(
+            model_name='idempotencykey',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='idempotencykey',
+            constraint=models.UniqueConstraint(fields=('user', 'key'), name='idempotency_user_key_uniq'),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:06
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0009_asset_events'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='assetevent',
+            name='action',
+            field=models.CharField(choices=[('create', 'Created'), ('update', 'Updated'), ('assign', 'Assigned'), ('return', 'Returned'), ('retire', 'Retired'), ('delete', 'Deleted'), ('archive', 'Archived')], max_length=20),
+        ),
+        migrations.CreateModel(
+            name='ArchivedAsset',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('serial_number', models.CharField(db_index=True, max_length=100)),
+                ('display_name', models.CharField(max_length=200)),
+                ('department', models.CharField(max_length=100)),
+                ('model_category', models.CharField(choices=[('laptop', 'Laptop'), ('desktop', 'Desktop'), ('monitor', 'Monitor'), ('printer', 'Printer'), ('mobile', 'Mobile Phone'), ('tablet', 'Tablet'), ('other', 'Other')], max_length=20)),
+                ('status', models.CharField(choices=[('available', 'Available'), ('assigned', 'Assigned'), ('maintenance', 'Under Maintenance'), ('retired', 'Retired')], max_length=20)),
+                ('company', models.CharField(max_length=100)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('search_text', models.TextField(blank=True, default='')),
+                ('reason', models.CharField(choices=[('retired', 'Retired'), ('deleted', 'Deleted')], max_length=20)),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('archived_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedAssignment',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('assigned_date', models.DateTimeField()),
+                ('returned_date', models.DateTimeField()),
+                ('notes', models.TextField(blank=True)),
+                ('asset', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='assignments', to='assets.archivedasset')),
+                ('assigned_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('assigned_to', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-assigned_date'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='archivedasset',
+            index=models.Index(fields=['-created_at', '-id'], name='archived_asset_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedassignment',
+            index=models.Index(fields=['asset', '-assigned_date'], name='archived_assignment_asset_idx'),
+        ),
+    ]
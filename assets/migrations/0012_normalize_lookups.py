@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:05
+
+from collections import Counter, defaultdict
+
+from django.db import migrations
+from django.db.models import Count
+
+# Name given to rows whose department or company was left blank
+BLANK_NAME = 'Unspecified'
+
+# (model, free-text field) pairs per lookup table
+SOURCES = {
+    'Department': [('Asset', 'department'), ('ArchivedAsset', 'department'), ('UserProfile', 'department')],
+    'Company': [('Asset', 'company'), ('ArchivedAsset', 'company')],
+}
+
+
+def _normalize(name):
+    return ' '.join(str(name).split()) or BLANK_NAME
+
+
+def create_lookups(apps, schema_editor):
+    """
+    One lookup row per distinct name, ignoring case and whitespace. The row
+    is named after the most used spelling; every spelling then points at it
+    with one UPDATE.
+    """
+    for lookup_name, sources in SOURCES.items():
+        Lookup = apps.get_model('assets', lookup_name)
+        spellings = defaultdict(Counter)
+        for model_name, field in sources:
+            Model = apps.get_model('assets', model_name)
+            for value, count in Model.objects.order_by().values_list(field).annotate(count=Count('pk')):
+                spellings[_normalize(value).casefold()][_normalize(value)] += count
+
+        rows = {}
+        for key, counts in spellings.items():
+            # Most used spelling first, then alphabetical for a stable choice
+            name = min(counts, key=lambda spelling: (-counts[spelling], spelling))
+            rows[key] = Lookup.objects.create(name=name)
+
+        for model_name, field in sources:
+            Model = apps.get_model('assets', model_name)
+            for value in Model.objects.order_by().values_list(field, flat=True).distinct():
+                Model.objects.filter(**{field: value}).update(**{f'{field}_ref': rows[_normalize(value).casefold()]})
+
+
+def restore_names(apps, schema_editor):
+    for lookup_name, sources in SOURCES.items():
+        Lookup = apps.get_model('assets', lookup_name)
+        for model_name, field in sources:
+            Model = apps.get_model('assets', model_name)
+            for row in Lookup.objects.all():
+                Model.objects.filter(**{f'{field}_ref': row}).update(**{field: row.name})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0011_company_department'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_lookups, restore_names),
+    ]
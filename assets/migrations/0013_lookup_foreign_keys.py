@@ -0,0 +1,118 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0012_normalize_lookups'),
+    ]
+
+    operations = [
+        # A default lets the text columns be re-added if this is reversed
+        migrations.AlterField(
+            model_name='asset',
+            name='department',
+            field=models.CharField(default='', max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='asset',
+            name='company',
+            field=models.CharField(default='', max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='archivedasset',
+            name='department',
+            field=models.CharField(default='', max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='archivedasset',
+            name='company',
+            field=models.CharField(default='', max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='userprofile',
+            name='department',
+            field=models.CharField(default='', max_length=100),
+        ),
+        migrations.RemoveField(
+            model_name='asset',
+            name='department',
+        ),
+        migrations.RemoveField(
+            model_name='asset',
+            name='company',
+        ),
+        migrations.RemoveField(
+            model_name='archivedasset',
+            name='department',
+        ),
+        migrations.RemoveField(
+            model_name='archivedasset',
+            name='company',
+        ),
+        migrations.RemoveField(
+            model_name='userprofile',
+            name='department',
+        ),
+        migrations.RenameField(
+            model_name='asset',
+            old_name='department_ref',
+            new_name='department',
+        ),
+        migrations.RenameField(
+            model_name='asset',
+            old_name='company_ref',
+            new_name='company',
+        ),
+        migrations.RenameField(
+            model_name='archivedasset',
+            old_name='department_ref',
+            new_name='department',
+        ),
+        migrations.RenameField(
+            model_name='archivedasset',
+            old_name='company_ref',
+            new_name='company',
+        ),
+        migrations.RenameField(
+            model_name='userprofile',
+            old_name='department_ref',
+            new_name='department',
+        ),
+        migrations.AlterField(
+            model_name='asset',
+            name='department',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, to='assets.department'),
+        ),
+        migrations.AlterField(
+            model_name='asset',
+            name='company',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, to='assets.company'),
+        ),
+        migrations.AlterField(
+            model_name='archivedasset',
+            name='department',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='assets.department'),
+        ),
+        migrations.AlterField(
+            model_name='archivedasset',
+            name='company',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='assets.company'),
+        ),
+        migrations.AlterField(
+            model_name='userprofile',
+            name='department',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='profiles', to='assets.department'),
+        ),
+        migrations.AddIndex(
+            model_name='asset',
+            index=models.Index(fields=['department', '-created_at', '-id'], name='asset_department_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='asset',
+            index=models.Index(fields=['company', '-created_at', '-id'], name='asset_company_created_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:37
+
+import assets.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0013_lookup_foreign_keys'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='exportjob',
+            name='file',
+            field=models.FileField(blank=True, storage=assets.models.export_storage, upload_to=''),
+        ),
+    ]
@@ -1,7 +1,47 @@
+import uuid
+
+from django.conf import settings
 from django.db import models
 from django.contrib.auth.models import User
+from django.core.files.storage import FileSystemStorage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models.functions import Lower
 from django.utils import timezone
 
+from .search import build_search_text
+
+def normalize_name(name):
+    """A lookup name without surrounding or repeated whitespace."""
+    return ' '.join(str(name).split())
+
+class LookupModel(models.Model):
+    """A name in a lookup table (see assets.lookups), unique regardless of case."""
+    name = models.CharField(max_length=100)
+
+    def __str__(self):
+        return self.name
+
+    def save(self, *args, **kwargs):
+        self.name = normalize_name(self.name)
+        super().save(*args, **kwargs)
+
+    class Meta:
+        abstract = True
+        ordering = ['name']
+
+class Company(LookupModel):
+    class Meta(LookupModel.Meta):
+        verbose_name_plural = 'companies'
+        constraints = [
+            models.UniqueConstraint(Lower('name'), name='company_name_ci_uniq'),
+        ]
+
+class Department(LookupModel):
+    class Meta(LookupModel.Meta):
+        constraints = [
+            models.UniqueConstraint(Lower('name'), name='department_name_ci_uniq'),
+        ]
+
 class UserProfile(models.Model):
     ROLE_CHOICES = [
         ('admin', 'Admin'),
@@ -12,7 +52,11 @@ class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='user')
     employee_id = models.CharField(max_length=20, unique=True)
-    department = models.CharField(max_length=100)
+    department = models.ForeignKey(Department, on_delete=models.PROTECT, related_name='profiles')
+    # Asset incharges only: see and manage the assets of their own department only
+    department_scoped = models.BooleanField(
+        default=False, help_text="Asset incharge only: limit access to the assets of this department.",
+    )
     phone = models.CharField(max_length=15, blank=True)
     
     def __str__(self):
@@ -35,22 +79,59 @@ class Asset(models.Model):
         ('tablet', 'Tablet'),
         ('other', 'Other'),
     ]
+
+    # Fixed pages under /assets/ (see urls.py): an asset with one of these
+    # serial numbers could not be reached at /assets/<serial_number>/
+    RESERVED_SERIAL_NUMBERS = frozenset({'create', 'import', 'bulk', 'as-of'})
     
     serial_number = models.CharField(max_length=100, unique=True)
     display_name = models.CharField(max_length=200)
-    department = models.CharField(max_length=100)
+    # Indexed by asset_department_created_idx / asset_company_created_idx
+    department = models.ForeignKey(Department, on_delete=models.PROTECT, db_index=False)
     model_category = models.CharField(max_length=20, choices=CATEGORY_CHOICES)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='available')
-    company = models.CharField(max_length=100)
+    company = models.ForeignKey(Company, on_delete=models.PROTECT, db_index=False)
     assigned_user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    # The open assignment, if any. Maintained with status and assigned_user
+    # by assets.services; check_assignments verifies and repairs it.
+    current_assignment = models.OneToOneField(
+        'AssetAssignment', on_delete=models.SET_NULL, null=True, blank=True, editable=False, related_name='current_for',
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Denormalized serial/name/department/username used by the search backends
+    search_text = models.TextField(blank=True, default='', editable=False)
     
     def __str__(self):
         return f"{self.serial_number} - {self.display_name}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the loaded state so signal handlers can tell what changed
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs):
+        self.search_text = build_search_text(self)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'search_text' not in update_fields:
+            kwargs['update_fields'] = [*update_fields, 'search_text']
+        super().save(*args, **kwargs)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination over (created_at, id) in asset_list
+            models.Index(fields=['-created_at', '-id'], name='asset_created_id_idx'),
+            # Status / category filters and the per-user listing, each kept in list order
+            models.Index(fields=['status', '-created_at', '-id'], name='asset_status_created_idx'),
+            models.Index(fields=['model_category', '-created_at', '-id'], name='asset_category_created_idx'),
+            models.Index(fields=['assigned_user', '-created_at', '-id'], name='asset_user_created_idx'),
+            # Department / company filters and department-scoped incharges
+            models.Index(fields=['department', '-created_at', '-id'], name='asset_department_created_idx'),
+            models.Index(fields=['company', '-created_at', '-id'], name='asset_company_created_idx'),
+        ]
 
 class AssetAssignment(models.Model):
     asset = models.ForeignKey(Asset, on_delete=models.CASCADE)
@@ -62,6 +143,285 @@ class AssetAssignment(models.Model):
     
     def __str__(self):
         return f"{self.asset.serial_number} assigned to {self.assigned_to.username}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets the audit signal handlers tell an assignment from a return
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
     
     class Meta:
         ordering = ['-assigned_date']
+        indexes = [
+            # Assignment history and latest-assignment lookups per asset
+            models.Index(fields=['asset', '-assigned_date'], name='assignment_asset_date_idx'),
+            # Partial indexes over open assignments only (returned_date IS NULL)
+            models.Index(
+                fields=['assigned_to', '-assigned_date'],
+                condition=models.Q(returned_date__isnull=True),
+                name='assignment_open_user_idx',
+            ),
+            models.Index(
+                fields=['-assigned_date'],
+                condition=models.Q(returned_date__isnull=True),
+                name='assignment_open_recent_idx',
+            ),
+            # As-of queries (see history.py); PostgreSQL also gets a GiST
+            # index on the assignment period, created in migration 0005
+            models.Index(fields=['returned_date', 'assigned_date'], name='assignment_period_idx'),
+            models.Index(fields=['assigned_to', '-assigned_date'], name='assignment_user_date_idx'),
+        ]
+        constraints = [
+            # At most one open assignment per asset; its unique partial index
+            # also serves the open-assignment lookups per asset
+            models.UniqueConstraint(
+                fields=['asset'],
+                condition=models.Q(returned_date__isnull=True),
+                name='assignment_one_open_per_asset',
+            ),
+        ]
+
+def export_storage():
+    """Export files live in ASSET_EXPORT_ROOT, which is not served as media."""
+    return FileSystemStorage(location=settings.ASSET_EXPORT_ROOT)
+
+class ExportJob(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    FORMAT_CHOICES = [
+        ('xlsx', 'Excel (XLSX)'),
+        ('csv', 'CSV'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES, default='xlsx')
+    filters = models.JSONField(default=dict, blank=True)
+    # Hash of format + filters, used to reuse recent identical exports
+    filter_hash = models.CharField(max_length=40)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    total_rows = models.PositiveIntegerField(default=0)
+    processed_rows = models.PositiveIntegerField(default=0)
+    file = models.FileField(storage=export_storage, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.get_format_display()} export {self.pk} ({self.status})"
+
+    @property
+    def percent(self):
+        if self.status == 'done':
+            return 100
+        return int(self.processed_rows * 100 / self.total_rows) if self.total_rows else 0
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['filter_hash', 'status', '-created_at'], name='exportjob_reuse_idx'),
+        ]
+
+class AnalyticsSnapshot(models.Model):
+    """
+    One day of usage metrics for one department, category or company,
+    maintained by analytics.refresh_analytics(). Rates are derived from these
+    sums so any date range can be rolled up with a single aggregate.
+    """
+    DIMENSION_CHOICES = [
+        ('department', 'Department'),
+        ('category', 'Category'),
+        ('company', 'Company'),
+    ]
+
+    date = models.DateField()
+    dimension = models.CharField(max_length=20, choices=DIMENSION_CHOICES)
+    value = models.CharField(max_length=100)
+    # In-service (not retired) assets at the end of the day
+    total_assets = models.PositiveIntegerField(default=0)
+    # Assets held by someone at the end of the day
+    assigned_assets = models.PositiveIntegerField(default=0)
+    # Seconds of the day covered by assignments, summed over assets
+    assigned_seconds = models.BigIntegerField(default=0)
+    # Length of the day in seconds (differs from 86400 on DST changes)
+    day_seconds = models.PositiveIntegerField(default=86400)
+    assignments_started = models.PositiveIntegerField(default=0)
+    assignments_returned = models.PositiveIntegerField(default=0)
+    # Total duration of the assignments returned that day
+    returned_seconds = models.BigIntegerField(default=0)
+    # Gaps between an asset's return and its next assignment starting that day
+    idle_gaps = models.PositiveIntegerField(default=0)
+    idle_seconds = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.date} {self.dimension}={self.value}"
+
+    class Meta:
+        ordering = ['-date', 'dimension', 'value']
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'dimension', 'value'], name='analytics_snapshot_unique'),
+        ]
+        indexes = [
+            # Dashboard roll-ups: one dimension over a date range
+            models.Index(fields=['dimension', 'date'], name='analytics_dimension_date_idx'),
+        ]
+
+class AnalyticsRefreshState(models.Model):
+    """Watermark of the last analytics refresh (a single row)."""
+    name = models.CharField(max_length=50, unique=True)
+    last_run_at = models.DateTimeField(null=True, blank=True)
+    # Highest AssetAssignment id seen, so back-dated assignments are noticed
+    last_assignment_id = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} (last run {self.last_run_at})"
+
+class IdempotencyKey(models.Model):
+    """
+    A state-changing request that was applied, recorded in the same
+    transaction, so a retry carrying the same key is recognised instead of
+    applied twice (see idempotency.py).
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    key = models.CharField(max_length=64)
+    action = models.CharField(max_length=30)
+    # Outcome shown again when the request is retried
+    summary = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.action} {self.key} by {self.user_id}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='idempotency_user_key_uniq'),
+        ]
+
+class AssetEvent(models.Model):
+    """
+    One change to an asset, appended by assets.audit (never updated). The
+    asset is referenced without a database constraint, so the events of a
+    deleted asset stay in the log.
+    """
+    ACTION_CHOICES = [
+        ('create', 'Created'),
+        ('update', 'Updated'),
+        ('assign', 'Assigned'),
+        ('return', 'Returned'),
+        ('retire', 'Retired'),
+        ('delete', 'Deleted'),
+        ('archive', 'Archived'),
+    ]
+
+    asset = models.ForeignKey(
+        Asset, on_delete=models.DO_NOTHING, db_constraint=False, related_name='events',
+    )
+    # Kept so the events of a deleted asset still say which asset it was
+    serial_number = models.CharField(max_length=100)
+    action = models.CharField(max_length=20, choices=ACTION_CHOICES)
+    actor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    # {field: [old, new]}; a created asset has None as every old value
+    changes = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    # When the change happened (events are written later, in batches)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.serial_number} {self.action} at {self.created_at}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Asset events are append-only.")
+        super().save(*args, **kwargs)
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        indexes = [
+            # Per-asset timeline: one range scan, newest first
+            models.Index(fields=['asset', '-created_at', '-id'], name='asset_event_timeline_idx'),
+            # Archiving scans the oldest events
+            models.Index(fields=['created_at'], name='asset_event_created_idx'),
+        ]
+
+class AssetEventArchive(models.Model):
+    """
+    One calendar month of an asset's events, moved out of AssetEvent by
+    ``archive_events`` and stored as a single compact row.
+    """
+    asset = models.ForeignKey(
+        Asset, on_delete=models.DO_NOTHING, db_constraint=False, related_name='archived_events',
+    )
+    serial_number = models.CharField(max_length=100)
+    month = models.DateField()
+    event_count = models.PositiveIntegerField(default=0)
+    # [[created_at (ISO 8601), action, actor username, changes], ...], oldest first
+    events = models.JSONField(default=list, encoder=DjangoJSONEncoder)
+
+    def __str__(self):
+        return f"{self.serial_number} {self.month:%Y-%m} ({self.event_count} events)"
+
+    class Meta:
+        ordering = ['-month']
+        constraints = [
+            models.UniqueConstraint(fields=['asset', 'month'], name='asset_event_archive_month_uniq'),
+        ]
+
+class ArchivedAsset(models.Model):
+    """
+    A retired or deleted asset moved out of Asset by assets.archive, with the
+    id it had there. Kept for history; searched and exported only on request.
+    """
+    REASON_CHOICES = [
+        ('retired', 'Retired'),
+        ('deleted', 'Deleted'),
+    ]
+
+    id = models.BigIntegerField(primary_key=True)
+    # Not unique: a deleted serial number may be reused by a new asset
+    serial_number = models.CharField(max_length=100, db_index=True)
+    display_name = models.CharField(max_length=200)
+    department = models.ForeignKey(Department, on_delete=models.PROTECT, related_name='+')
+    model_category = models.CharField(max_length=20, choices=Asset.CATEGORY_CHOICES)
+    status = models.CharField(max_length=20, choices=Asset.STATUS_CHOICES)
+    company = models.ForeignKey(Company, on_delete=models.PROTECT, related_name='+')
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    search_text = models.TextField(blank=True, default='')
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    archived_at = models.DateTimeField(default=timezone.now)
+    archived_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+
+    def __str__(self):
+        return f"{self.serial_number} - {self.display_name} ({self.get_reason_display().lower()})"
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # Same keyset order as asset_list, for the "include archived" mode
+            models.Index(fields=['-created_at', '-id'], name='archived_asset_created_idx'),
+        ]
+
+class ArchivedAssignment(models.Model):
+    """A closed AssetAssignment of an archived asset, with the id it had."""
+    id = models.BigIntegerField(primary_key=True)
+    asset = models.ForeignKey(ArchivedAsset, on_delete=models.CASCADE, related_name='assignments')
+    assigned_to = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    assigned_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    assigned_date = models.DateTimeField()
+    returned_date = models.DateTimeField()
+    notes = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"{self.asset.serial_number} assigned to {self.assigned_to.username}"
+
+    class Meta:
+        ordering = ['-assigned_date']
+        indexes = [
+            models.Index(fields=['asset', '-assigned_date'], name='archived_assignment_asset_idx'),
+        ]
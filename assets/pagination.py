@@ -0,0 +1,187 @@
+"""
+Keyset (cursor) pagination over (created_at, id), newest first.
+
+Unlike OFFSET pagination, each page is fetched with a range condition on the
+last row the client saw, so page N costs the same as page 1. Cursors are
+opaque URL-safe tokens; a malformed or tampered token simply falls back to
+the first page.
+
+An optional integer ``rank`` annotation (e.g. search relevance) can be put
+in front of the key, giving the order (-rank, -created_at, -id). Other models
+can pass their own ``date_field`` (or None to page by id alone).
+
+paginate_many() pages through several querysets with the same key fields
+and distinct ids (the hot and archived assets) as if they were one: each
+contributes its next page_size + 1 rows and those are merged.
+"""
+import base64
+import json
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+def get_page_size(requested=None):
+    """Return the requested page size clamped to the configured bounds."""
+    default = getattr(settings, 'ASSET_LIST_PAGE_SIZE', 50)
+    maximum = getattr(settings, 'ASSET_LIST_MAX_PAGE_SIZE', 500)
+    try:
+        size = int(requested) if requested else default
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, maximum))
+
+
+def encode_cursor(obj, direction, rank=None, date_field='created_at'):
+    payload = {'d': direction, 'i': obj.pk}
+    if date_field:
+        payload['t'] = getattr(obj, date_field).isoformat()
+    if rank:
+        payload['r'] = getattr(obj, rank)
+    encoded = base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+    return encoded.rstrip('=')
+
+
+def decode_cursor(token, rank=None, date_field='created_at'):
+    """
+    Return (direction, key values) for a cursor token, or None if it is
+    invalid. The key values line up with keyset_fields(rank, date_field).
+    """
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        direction = payload['d']
+        values = [int(payload['i'])]
+        if date_field:
+            values.insert(0, parse_datetime(payload['t']))
+        if rank:
+            values.insert(0, int(payload['r']))
+    except (ValueError, TypeError, KeyError, AttributeError):
+        return None
+    if direction not in ('next', 'prev') or None in values:
+        return None
+    return direction, values
+
+
+def keyset_fields(rank=None, date_field='created_at'):
+    return [field for field in (rank, date_field) if field] + ['id']
+
+
+def keyset_filter(fields, values, lookup):
+    """
+    Row-value comparison ``(f1, f2, ...) <lookup> (v1, v2, ...)`` spelled out
+    as ORed prefixes, since not every backend supports tuple comparisons.
+    """
+    condition = Q()
+    for i, field in enumerate(fields):
+        prefix = Q(**{f'{field}__{lookup}': values[i]})
+        for equal_field, equal_value in zip(fields[:i], values[:i]):
+            prefix &= Q(**{equal_field: equal_value})
+        condition |= prefix
+    return condition
+
+
+class CursorPage:
+    """One page of results plus the tokens needed to move either way."""
+
+    def __init__(self, items, next_cursor=None, prev_cursor=None, page_size=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.page_size = page_size
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.prev_cursor is not None
+
+
+def paginate(queryset, cursor=None, page_size=None, rank=None, date_field='created_at'):
+    """
+    Return a CursorPage of ``queryset`` ordered by (-rank, -date_field, -id),
+    where ``rank`` is the name of an optional integer annotation.
+
+    One extra row is fetched to find out whether another page exists in the
+    direction of travel, so no COUNT query is needed.
+    """
+    rows, position, page_size = _page_query(queryset, cursor, page_size, rank, date_field)
+    return _page(list(rows), position, page_size, rank, date_field)
+
+
+async def apaginate(queryset, cursor=None, page_size=None, rank=None, date_field='created_at'):
+    """paginate() for async views."""
+    rows, position, page_size = _page_query(queryset, cursor, page_size, rank, date_field)
+    return _page([row async for row in rows], position, page_size, rank, date_field)
+
+
+def paginate_many(querysets, cursor=None, page_size=None, rank=None, date_field='created_at'):
+    """paginate() over the union of ``querysets``."""
+    rows = []
+    for queryset in querysets:
+        query, position, size = _page_query(queryset, cursor, page_size, rank, date_field)
+        rows.extend(query)
+    return _page(_merge(rows, position, size, rank, date_field), position, size, rank, date_field)
+
+
+async def apaginate_many(querysets, cursor=None, page_size=None, rank=None, date_field='created_at'):
+    """paginate_many() for async views."""
+    rows = []
+    for queryset in querysets:
+        query, position, size = _page_query(queryset, cursor, page_size, rank, date_field)
+        rows.extend([row async for row in query])
+    return _page(_merge(rows, position, size, rank, date_field), position, size, rank, date_field)
+
+
+def _merge(rows, position, page_size, rank, date_field):
+    """Order rows from several querysets the way one query would have, keeping page_size + 1."""
+    fields = keyset_fields(rank, date_field)
+    backwards = position is not None and position[0] == 'prev'
+    rows.sort(key=lambda row: [getattr(row, field) for field in fields], reverse=not backwards)
+    return rows[:page_size + 1]
+
+
+def _page_query(queryset, cursor, page_size, rank, date_field):
+    """Return (unevaluated rows queryset, decoded cursor position, page size)."""
+    page_size = get_page_size(page_size)
+    fields = keyset_fields(rank, date_field)
+    descending = [f'-{field}' for field in fields]
+    position = decode_cursor(cursor, rank, date_field)
+
+    if position is None:
+        rows = queryset.order_by(*descending)
+    elif position[0] == 'next':
+        rows = queryset.filter(keyset_filter(fields, position[1], 'lt')).order_by(*descending)
+    else:
+        rows = queryset.filter(keyset_filter(fields, position[1], 'gt')).order_by(*fields)
+    return rows[:page_size + 1], position, page_size
+
+
+def _page(rows, position, page_size, rank, date_field):
+    if position is None:
+        items = rows[:page_size]
+        has_next, has_prev = len(rows) > page_size, False
+    elif position[0] == 'next':
+        items = rows[:page_size]
+        has_next, has_prev = len(rows) > page_size, True
+    else:
+        items = list(reversed(rows[:page_size]))
+        has_next, has_prev = True, len(rows) > page_size
+
+    return CursorPage(
+        items,
+        next_cursor=encode_cursor(items[-1], 'next', rank, date_field) if items and has_next else None,
+        prev_cursor=encode_cursor(items[0], 'prev', rank, date_field) if items and has_prev else None,
+        page_size=page_size,
+    )
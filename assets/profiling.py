@@ -0,0 +1,294 @@
+"""
+Request instrumentation and the data behind the admin profiling page.
+
+InstrumentationMiddleware records one RequestSample per request: the view
+name, wall time, number and time of database queries, template render time
+(measured by the TimedDjangoTemplates backend, see TEMPLATES in settings)
+and response size. Samples go into a bounded in-memory ring buffer
+(ASSET_PROFILING_BUFFER_SIZE, per process), so memory use stays constant.
+
+Queries are also grouped by "shape" (the SQL with whitespace and IN lists
+normalised; parameters are already placeholders). A shape run at least
+ASSET_PROFILING_N_PLUS_ONE_THRESHOLD times in one request is flagged as a
+likely N+1 and logged to ``assets.profiling``.
+
+Admins can add ``?_profile=1`` to any GET URL to run that view under
+cProfile; the top of the profile is kept with the sample. For an async view
+the profile covers the work it hands to sync_to_async (queries and template
+rendering), not the coroutine itself.
+
+Both this middleware and DatabaseMetricsMiddleware are async-capable, so
+under ASGI they add no thread switch to a request.
+"""
+import cProfile
+import contextvars
+import io
+import logging
+import pstats
+import re
+import threading
+import time
+from collections import Counter, deque
+
+from asgiref.sync import async_to_sync, iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template as DjangoTemplate, reraise
+
+from .middleware import QueryTimer, aadd_execute_wrapper, aremove_execute_wrapper, aresolve_role
+
+logger = logging.getLogger('assets.profiling')
+
+PROFILE_PARAM = '_profile'
+PROFILE_LINES = 40
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_IN_LIST_RE = re.compile(r'IN \((?:%s, )*%s\)')
+
+
+def sql_shape(sql):
+    """Normalise a query so repeated executions with different parameters compare equal."""
+    return _IN_LIST_RE.sub('IN (...)', _WHITESPACE_RE.sub(' ', sql).strip())
+
+
+def get_buffer_size():
+    return getattr(settings, 'ASSET_PROFILING_BUFFER_SIZE', 2000)
+
+
+def get_n_plus_one_threshold():
+    return getattr(settings, 'ASSET_PROFILING_N_PLUS_ONE_THRESHOLD', 5)
+
+
+class RequestSample:
+    __slots__ = (
+        'view', 'method', 'path', 'status', 'started_at', 'wall_ms', 'query_count', 'query_ms',
+        'template_ms', 'response_bytes', 'repeated_queries', 'profile',
+    )
+
+    def __init__(self, method, path):
+        self.view = None
+        self.method = method
+        self.path = path
+        self.status = None
+        self.started_at = time.time()
+        self.wall_ms = 0.0
+        self.query_count = 0
+        self.query_ms = 0.0
+        self.template_ms = 0.0
+        self.response_bytes = None
+        # [(sql shape, times run)] for shapes at or above the N+1 threshold
+        self.repeated_queries = []
+        self.profile = None
+
+    @property
+    def n_plus_one(self):
+        return bool(self.repeated_queries)
+
+
+class ShapeCountingTimer(QueryTimer):
+    """QueryTimer that also counts executions per SQL shape."""
+
+    def __init__(self):
+        super().__init__()
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        self.shapes[sql_shape(sql)] += 1
+        return super().__call__(execute, sql, params, many, context)
+
+
+class SampleBuffer:
+    """Thread-safe ring buffer of the most recent RequestSamples."""
+
+    def __init__(self, size=None):
+        self._samples = deque(maxlen=size or get_buffer_size())
+        self._lock = threading.Lock()
+
+    def append(self, sample):
+        with self._lock:
+            self._samples.append(sample)
+
+    def snapshot(self):
+        with self._lock:
+            return list(self._samples)
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+
+samples = SampleBuffer()
+
+# The sample of the request being handled, for the template backend
+_current_sample = contextvars.ContextVar('assets_profiling_sample', default=None)
+
+
+class TimedTemplate(DjangoTemplate):
+    def render(self, context=None, request=None):
+        # Only top-level renders come through the backend Template; includes
+        # and parent templates render inside them, so nothing is counted twice.
+        sample = _current_sample.get()
+        if sample is None:
+            return super().render(context, request)
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            sample.template_ms += (time.perf_counter() - start) * 1000
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """
+    The Django template backend, with each render added to the template time
+    of the request being profiled. Outside a profiled request (or with
+    ASSET_PROFILING off) it costs one context variable lookup.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+class InstrumentationMiddleware:
+    """
+    Record a RequestSample for every request (see module docstring). Put it
+    near the top of MIDDLEWARE so session and auth queries are included.
+    Enabled by ASSET_PROFILING.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'ASSET_PROFILING', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            # Under ASGI, only a profiled request pays for a thread switch
+            self.process_view = self._aprocess_view
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        sample = RequestSample(request.method, request.path)
+        token = _current_sample.set(sample)
+        timer = ShapeCountingTimer()
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(timer):
+                response = self.get_response(request)
+        finally:
+            _current_sample.reset(token)
+        return self._record(request, response, sample, timer, start)
+
+    async def __acall__(self, request):
+        # Sync code called from the views (queries, rendering) runs with a copy of this context
+        sample = RequestSample(request.method, request.path)
+        token = _current_sample.set(sample)
+        timer = ShapeCountingTimer()
+        start = time.perf_counter()
+        await aadd_execute_wrapper(timer)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await aremove_execute_wrapper(timer)
+            _current_sample.reset(token)
+        return self._record(request, response, sample, timer, start)
+
+    def _record(self, request, response, sample, timer, start):
+        sample.wall_ms = (time.perf_counter() - start) * 1000
+        sample.query_count = timer.count
+        sample.query_ms = timer.duration * 1000
+        sample.status = response.status_code
+        match = getattr(request, 'resolver_match', None)
+        sample.view = match.view_name if match else None
+        if not response.streaming:
+            sample.response_bytes = len(response.content)
+
+        threshold = get_n_plus_one_threshold()
+        sample.repeated_queries = [(shape, count) for shape, count in timer.shapes.most_common() if count >= threshold]
+        if sample.repeated_queries:
+            shape, count = sample.repeated_queries[0]
+            logger.warning("Possible N+1 in %s (%s): %d x %s", sample.view, sample.path, count, shape[:200])
+
+        samples.append(sample)
+        return response
+
+    def _wants_profile(self, request):
+        # GET only: returning a response here skips the process_view of the
+        # middleware below, including the CSRF check
+        return request.method == 'GET' and PROFILE_PARAM in request.GET
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not self._wants_profile(request) or not request.user_role.is_admin:
+            return None
+        return self._profile(request, view_func, view_args, view_kwargs)
+
+    async def _aprocess_view(self, request, view_func, view_args, view_kwargs):
+        if not self._wants_profile(request) or not (await aresolve_role(request)).is_admin:
+            return None
+        return await sync_to_async(self._profile)(request, view_func, view_args, view_kwargs)
+
+    def _profile(self, request, view_func, view_args, view_kwargs):
+        if iscoroutinefunction(view_func):
+            # The coroutine runs on the event loop, but the work it hands to
+            # sync_to_async (queries, rendering) comes back to this thread,
+            # which is the part the profile shows
+            view_func = async_to_sync(view_func)
+        profiler = cProfile.Profile()
+        response = profiler.runcall(view_func, request, *view_args, **view_kwargs)
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(PROFILE_LINES)
+        sample = _current_sample.get()
+        if sample is not None:
+            sample.profile = output.getvalue()
+        return response
+
+
+# --- Reporting ---
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _mean(values):
+    return sum(values) / len(values) if values else None
+
+
+def summarize(records):
+    """Per-view statistics, slowest p95 first."""
+    by_view = {}
+    for sample in records:
+        by_view.setdefault(sample.view or sample.path, []).append(sample)
+
+    rows = []
+    for view, view_samples in by_view.items():
+        wall = [sample.wall_ms for sample in view_samples]
+        sizes = [sample.response_bytes for sample in view_samples if sample.response_bytes is not None]
+        rows.append({
+            'view': view,
+            'count': len(view_samples),
+            'p50': percentile(wall, 50),
+            'p95': percentile(wall, 95),
+            'p99': percentile(wall, 99),
+            'max': max(wall),
+            'avg_queries': _mean([sample.query_count for sample in view_samples]),
+            'avg_query_ms': _mean([sample.query_ms for sample in view_samples]),
+            'avg_template_ms': _mean([sample.template_ms for sample in view_samples]),
+            'avg_bytes': _mean(sizes),
+            'n_plus_one': sum(1 for sample in view_samples if sample.n_plus_one),
+        })
+    rows.sort(key=lambda row: row['p95'], reverse=True)
+    return rows
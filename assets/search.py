@@ -0,0 +1,237 @@
+"""
+Pluggable asset search backends.
+
+All backends match exactly what the original four-way ``icontains`` OR
+matched (serial number, display name, department, assigned username), but the
+indexed ones search a single maintained column, ``Asset.search_text``, which
+holds those four values joined by SEARCH_SEPARATOR:
+
+- PostgreSQL: a pg_trgm GIN index on UPPER(search_text) serves the
+  ``icontains`` LIKE directly.
+- SQLite: an FTS5 table with the trigram tokenizer, kept in sync by triggers.
+- Anything else: the plain OR of ``icontains`` lookups.
+
+The backend is picked from the database vendor, or forced with the
+ASSET_SEARCH_BACKEND setting (a dotted path to a backend class).
+"""
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Case, IntegerField, OuterRef, Q, Subquery, Value, When
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce, Concat
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Joins the searchable fields; a query can only match across two fields if it
+# contains this control character itself, so matching stays per-field.
+SEARCH_SEPARATOR = '\x1f'
+
+SQLITE_FTS_TABLE = 'assets_asset_search'
+SQLITE_FTS_MIN_QUERY_LENGTH = 3  # the trigram tokenizer cannot match shorter strings
+POSTGRES_TRGM_INDEX = 'asset_search_trgm_idx'
+
+
+def build_search_text(asset):
+    """Return the search_text value for an Asset instance."""
+    username = asset.assigned_user.username if asset.assigned_user_id else ''
+    return SEARCH_SEPARATOR.join([asset.serial_number, asset.display_name, asset.department.name, username])
+
+
+def search_text_expression(username=None):
+    """
+    Database expression equivalent to build_search_text, for set-based
+    updates. Pass ``username`` when the same assigned user is being written in
+    the same UPDATE (use '' for unassigning): the subquery would otherwise see
+    the row's old assigned_user_id.
+    """
+    from django.contrib.auth.models import User
+
+    from .models import Department
+
+    if username is None:
+        username = Subquery(User.objects.filter(pk=OuterRef('assigned_user_id')).values('username')[:1])
+    else:
+        username = Value(username)
+    return Concat(
+        'serial_number', Value(SEARCH_SEPARATOR),
+        'display_name', Value(SEARCH_SEPARATOR),
+        Subquery(Department.objects.filter(pk=OuterRef('department_id')).values('name')[:1]), Value(SEARCH_SEPARATOR),
+        Coalesce(username, Value('')),
+    )
+
+
+def refresh_search_text(queryset):
+    """Recompute search_text for every asset in ``queryset`` in a single UPDATE."""
+    return queryset.update(search_text=search_text_expression())
+
+
+def search_rank(query):
+    """
+    Integer relevance used to order search results: exact serial number
+    matches first, then serial number prefixes, then display name prefixes.
+    """
+    return Case(
+        When(serial_number__iexact=query, then=Value(3)),
+        When(serial_number__istartswith=query, then=Value(2)),
+        When(display_name__istartswith=query, then=Value(1)),
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+class BasicSearchBackend:
+    """The original behaviour: OR of four icontains lookups, one across a join."""
+
+    def filter(self, queryset, query):
+        return queryset.filter(
+            Q(serial_number__icontains=query) |
+            Q(display_name__icontains=query) |
+            Q(department__name__icontains=query) |
+            Q(assigned_user__username__icontains=query)
+        )
+
+    def search(self, queryset, query):
+        """Filter ``queryset`` and annotate each match with ``search_rank``."""
+        return self.filter(queryset, query).annotate(search_rank=search_rank(query))
+
+
+class TrigramSearchBackend(BasicSearchBackend):
+    """
+    Single-column icontains on search_text. On PostgreSQL this is served by the
+    pg_trgm GIN index created in install_search_index().
+    """
+
+    def filter(self, queryset, query):
+        return queryset.filter(search_text__icontains=query)
+
+
+class SQLiteFTSSearchBackend(TrigramSearchBackend):
+    """Substring match through the FTS5 trigram table; short queries fall back to LIKE."""
+
+    def filter(self, queryset, query):
+        if len(query) < SQLITE_FTS_MIN_QUERY_LENGTH or SEARCH_SEPARATOR in query:
+            return super().filter(queryset, query)
+        phrase = '"%s"' % query.replace('"', '""')
+        return queryset.filter(
+            id__in=RawSQL(f"SELECT rowid FROM {SQLITE_FTS_TABLE} WHERE {SQLITE_FTS_TABLE} MATCH %s", [phrase])
+        )
+
+
+def parse_id(value):
+    """A department/company filter value: a positive integer key, else None."""
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return None
+    return value if value > 0 else None
+
+
+def apply_asset_filters(assets, search_query, status_filter, category_filter, department_id=None, company_id=None):
+    """The asset list filters (search, status, category, department, company), unranked, for export and bulk actions."""
+    if search_query:
+        assets = get_search_backend().filter(assets, search_query)
+    return apply_field_filters(assets, status_filter, category_filter, department_id, company_id)
+
+
+def apply_field_filters(assets, status_filter, category_filter, department_id=None, company_id=None):
+    """The asset list filters other than the search; lookups by integer key."""
+    if status_filter:
+        assets = assets.filter(status=status_filter)
+    if category_filter:
+        assets = assets.filter(model_category=category_filter)
+    if department_id:
+        assets = assets.filter(department_id=department_id)
+    if company_id:
+        assets = assets.filter(company_id=company_id)
+    return assets
+
+
+_backend = None
+
+
+def get_search_backend():
+    """Return the configured search backend instance (resolved once per process)."""
+    global _backend
+    if _backend is None:
+        path = getattr(settings, 'ASSET_SEARCH_BACKEND', None)
+        if path:
+            backend_class = import_string(path)
+        elif connection.vendor == 'postgresql':
+            backend_class = TrigramSearchBackend
+        elif connection.vendor == 'sqlite' and _sqlite_fts_installed():
+            backend_class = SQLiteFTSSearchBackend
+        else:
+            backend_class = BasicSearchBackend
+        _backend = backend_class()
+    return _backend
+
+
+async def aget_search_backend():
+    """get_search_backend() for async views (resolving it may query the database once)."""
+    return _backend if _backend is not None else await sync_to_async(get_search_backend)()
+
+
+def _sqlite_fts_installed():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [SQLITE_FTS_TABLE])
+        return cursor.fetchone() is not None
+
+
+def install_search_index(using_connection):
+    """
+    Create the vendor-specific search index if it does not exist yet.
+
+    This runs on every post_migrate rather than once in a migration: on SQLite,
+    any later migration that alters assets_asset rebuilds the table and drops
+    its triggers, so they have to be re-created (and the index rebuilt).
+    """
+    try:
+        with transaction.atomic(using=using_connection.alias):
+            if using_connection.vendor == 'postgresql':
+                _install_postgres_index(using_connection)
+            elif using_connection.vendor == 'sqlite':
+                _install_sqlite_fts(using_connection)
+    except DatabaseError as exc:
+        logger.warning("Could not install the asset search index; search will not be indexed: %s", exc)
+
+
+def _install_postgres_index(using_connection):
+    with using_connection.cursor() as cursor:
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS {POSTGRES_TRGM_INDEX} "
+            "ON assets_asset USING gin (UPPER(search_text) gin_trgm_ops)"
+        )
+
+
+def _install_sqlite_fts(using_connection):
+    table = SQLITE_FTS_TABLE
+    with using_connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s", [f'{table}_a_']
+        )
+        if cursor.fetchone()[0] == 3:
+            return
+
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5("
+            "search_text, content='assets_asset', content_rowid='id', tokenize='trigram')"
+        )
+        cursor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_ai AFTER INSERT ON assets_asset BEGIN "
+            f"INSERT INTO {table}(rowid, search_text) VALUES (new.id, new.search_text); END"
+        )
+        cursor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_ad AFTER DELETE ON assets_asset BEGIN "
+            f"INSERT INTO {table}({table}, rowid, search_text) VALUES ('delete', old.id, old.search_text); END"
+        )
+        cursor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_au AFTER UPDATE OF search_text ON assets_asset BEGIN "
+            f"INSERT INTO {table}({table}, rowid, search_text) VALUES ('delete', old.id, old.search_text); "
+            f"INSERT INTO {table}(rowid, search_text) VALUES (new.id, new.search_text); END"
+        )
+        cursor.execute(f"INSERT INTO {table}({table}) VALUES ('rebuild')")
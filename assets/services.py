@@ -0,0 +1,227 @@
+"""
+Asset assignment workflows.
+
+An asset's status, assigned_user and current_assignment always change
+together, inside one transaction that holds the asset row lock
+(select_for_update), so they cannot disagree and two concurrent requests
+cannot both assign or return the same asset. The assignment_one_open_per_asset
+constraint backs this up where row locks are not available (SQLite).
+
+- assign(), release() and save_asset() handle one asset (the assign/return
+  views, the edit form and the admin).
+- bulk_assign(), bulk_return() and bulk_retire() lock the affected rows,
+  then run a handful of ``UPDATE``/``bulk_create`` statements instead of a
+  read-modify-save per asset. Every affected asset still gets its own
+  AssetAssignment row (opened or closed) and its AssetEvents, which is the
+  audit trail the single asset views leave behind.
+"""
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Concat
+from django.utils import timezone
+
+from .audit import make_event, record_events
+from .models import Asset, AssetAssignment
+from .search import search_text_expression
+from .stats import invalidate_asset_stats
+
+# Statuses from which an asset can be assigned (matches the Assign button)
+ASSIGNABLE_STATUSES = ('available', 'maintenance')
+
+RETIREMENT_NOTE = "\n(Automatically returned due to asset retirement)"
+
+# Keeps "IN (...)" lists under database parameter limits
+CHUNK_SIZE = 500
+
+
+class AssignmentError(Exception):
+    """The asset is not in a state that allows the requested change."""
+
+
+def _lock_asset(asset):
+    """Return a fresh copy of ``asset`` with its row locked for the transaction."""
+    return Asset.objects.select_for_update().get(pk=asset.pk)
+
+
+def _close(assignment, when, note=None):
+    assignment.returned_date = when
+    if note:
+        assignment.notes += note
+    assignment.save()
+
+
+def assign(asset, user, assigned_by, notes=''):
+    """
+    Assign an available or under-maintenance asset to ``user`` and return the
+    new AssetAssignment. Raises AssignmentError if it is assigned or retired.
+    """
+    try:
+        with transaction.atomic():
+            asset = _lock_asset(asset)
+            if asset.current_assignment_id is not None or asset.status not in ASSIGNABLE_STATUSES:
+                raise AssignmentError(f"Asset {asset.serial_number} is {asset.get_status_display().lower()}.")
+            assignment = AssetAssignment.objects.create(asset=asset, assigned_to=user, assigned_by=assigned_by, notes=notes)
+            asset.current_assignment = assignment
+            asset.assigned_user = user
+            asset.status = 'assigned'
+            asset.save()
+    except IntegrityError:
+        # The one-open-assignment constraint caught a concurrent assignment
+        # (only possible where select_for_update does not lock, e.g. SQLite)
+        raise AssignmentError(f"Asset {asset.serial_number} was assigned meanwhile.")
+    return assignment
+
+
+def release(asset, status='available', note=None, assignment_id=None):
+    """
+    Close the asset's current assignment and give it ``status``; return the
+    closed AssetAssignment. Raises AssignmentError if it is not assigned, or
+    if ``assignment_id`` is given and is no longer the current assignment.
+    """
+    with transaction.atomic():
+        asset = _lock_asset(asset)
+        assignment = asset.current_assignment
+        if assignment is None:
+            raise AssignmentError(f"Asset {asset.serial_number} has no active assignment.")
+        if assignment_id is not None and assignment.pk != assignment_id:
+            raise AssignmentError(f"Asset {asset.serial_number} was returned or reassigned meanwhile.")
+        _close(assignment, timezone.now(), note)
+        asset.current_assignment = None
+        asset.assigned_user = None
+        asset.status = status
+        asset.save()
+    return assignment
+
+
+def save_asset(asset):
+    """
+    Save an asset edited through a form. Moving an assigned asset to another
+    status closes its current assignment, which is returned (else None).
+    Raises AssignmentError if the assignment changed since ``asset`` was
+    loaded, or if the status became 'assigned' without an assignment.
+    """
+    with transaction.atomic():
+        locked = _lock_asset(asset)
+        if locked.current_assignment_id != asset.current_assignment_id:
+            raise AssignmentError(f"Asset {asset.serial_number} was assigned or returned meanwhile; please reload.")
+        closed = None
+        if asset.status != 'assigned' and locked.current_assignment is not None:
+            closed = locked.current_assignment
+            _close(closed, timezone.now(), RETIREMENT_NOTE if asset.status == 'retired' else None)
+            asset.current_assignment = None
+            asset.assigned_user = None
+        elif asset.status == 'assigned' and locked.current_assignment is None:
+            raise AssignmentError("Use Assign to assign an asset to a user.")
+        asset.save()
+    return closed
+
+
+class BulkResult:
+    def __init__(self, action, affected=0, skipped=0):
+        self.action = action
+        self.affected = affected
+        self.skipped = skipped
+
+    def __str__(self):
+        message = f"{self.affected} asset{'s' if self.affected != 1 else ''} {self.action}"
+        if self.skipped:
+            message += f", {self.skipped} skipped"
+        return message + "."
+
+
+def _chunks(items):
+    for start in range(0, len(items), CHUNK_SIZE):
+        yield items[start:start + CHUNK_SIZE]
+
+
+def _lock(assets):
+    """
+    Lock the given assets for the rest of the transaction and return
+    (pk, assigned_user_id, serial_number, status) tuples. Rows are locked in
+    pk order so concurrent bulk operations cannot deadlock.
+    """
+    return list(
+        assets.select_for_update().order_by('pk').values_list('pk', 'assigned_user_id', 'serial_number', 'status')
+    )
+
+
+def bulk_assign(assets, user, assigned_by, notes=''):
+    """
+    Assign every available/maintenance asset in ``assets`` to ``user``. Assets
+    that still have an open assignment (e.g. one sent to maintenance while
+    assigned) are skipped, like assign() refuses them.
+    """
+    with transaction.atomic():
+        total = assets.count()
+        locked = _lock(assets.filter(status__in=ASSIGNABLE_STATUSES, current_assignment__isnull=True))
+        ids = [pk for pk, *_ in locked]
+        now = timezone.now()
+
+        AssetAssignment.objects.bulk_create(
+            [AssetAssignment(asset_id=pk, assigned_to=user, assigned_by=assigned_by, assigned_date=now, notes=notes)
+             for pk in ids],
+            batch_size=CHUNK_SIZE,
+        )
+        open_assignment = AssetAssignment.objects.filter(asset=OuterRef('pk'), returned_date__isnull=True)
+        for chunk in _chunks(ids):
+            Asset.objects.filter(pk__in=chunk).update(
+                status='assigned', assigned_user=user, updated_at=now,
+                current_assignment=Subquery(open_assignment.values('pk')[:1]),
+                search_text=search_text_expression(username=user.username),
+            )
+        changes = {'assigned_to': [None, user.username]}
+        if notes:
+            changes['notes'] = [None, notes]
+        record_events([make_event(pk, serial, 'assign', changes, when=now) for pk, _, serial, _ in locked])
+
+    invalidate_asset_stats(user_ids={user.pk} | {user_id for _, user_id, *_ in locked})
+    return BulkResult('assigned', affected=len(ids), skipped=total - len(ids))
+
+
+def _close_and_update(assets, eligible, new_status, action, note=None):
+    """
+    Close the open assignments of the ``eligible`` subset of ``assets`` and
+    set its status, unassigning them. The rest are reported as skipped.
+    """
+    with transaction.atomic():
+        total = assets.count()
+        locked = _lock(eligible)
+        ids = [pk for pk, *_ in locked]
+        now = timezone.now()
+        usernames = dict(
+            User.objects.filter(pk__in={user_id for _, user_id, *_ in locked if user_id}).values_list('pk', 'username')
+        )
+
+        for chunk in _chunks(ids):
+            open_assignments = AssetAssignment.objects.filter(asset_id__in=chunk, returned_date__isnull=True)
+            if note:
+                open_assignments.update(returned_date=now, notes=Concat('notes', Value(note)))
+            else:
+                open_assignments.update(returned_date=now)
+            Asset.objects.filter(pk__in=chunk).update(
+                status=new_status, assigned_user=None, current_assignment=None, updated_at=now,
+                search_text=search_text_expression(username=''),
+            )
+
+        events = []
+        for pk, user_id, serial, status in locked:
+            if user_id:
+                events.append(make_event(pk, serial, 'return', {'assigned_to': [usernames.get(user_id), None]}, when=now))
+            if status != new_status:
+                action_name = 'retire' if new_status == 'retired' else 'update'
+                events.append(make_event(pk, serial, action_name, {'status': [status, new_status]}, when=now))
+        record_events(events)
+
+    invalidate_asset_stats(user_ids={user_id for _, user_id, *_ in locked})
+    return BulkResult(action, affected=len(ids), skipped=total - len(ids))
+
+
+def bulk_return(assets):
+    """Return every currently assigned asset in ``assets``."""
+    return _close_and_update(assets, assets.filter(status='assigned'), 'available', 'returned')
+
+
+def bulk_retire(assets):
+    """Retire every asset in ``assets`` that is not retired yet, closing open assignments."""
+    return _close_and_update(assets, assets.exclude(status='retired'), 'retired', 'retired', note=RETIREMENT_NOTE)
@@ -0,0 +1,188 @@
+"""
+Signal handlers for the assets app. Connected in AssetsConfig.ready().
+"""
+from django.contrib.auth.models import User
+from django.db import connections
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_save
+from django.dispatch import receiver
+
+from .audit import record_asset_delete, record_asset_save, record_assignment_save
+from .autocomplete import index_add, index_remove, record_asset_change
+from .conditional import bump_pages_version
+from .fragments import invalidate_asset_fragments
+from .lookups import invalidate_lookup_names
+from .models import Asset, AssetAssignment, Company, Department, IdempotencyKey, UserProfile
+from .search import install_search_index, refresh_search_text
+from .stats import invalidate_asset_stats
+
+
+@receiver(post_migrate)
+def ensure_search_index(sender, using, **kwargs):
+    if sender.name == 'assets':
+        install_search_index(connections[using])
+
+
+@receiver(post_save, sender=User)
+def refresh_assigned_asset_search_text(sender, instance, created, update_fields, **kwargs):
+    # Assets embed their assigned user's username in search_text. Saves that
+    # cannot have touched the username (e.g. last_login updates) are skipped.
+    if created or (update_fields is not None and 'username' not in update_fields):
+        return
+    refresh_search_text(Asset.objects.filter(assigned_user=instance))
+
+
+@receiver(post_save, sender=Asset)
+def invalidate_fragments_on_save(sender, instance, created, **kwargs):
+    if not created:
+        loaded = getattr(instance, '_loaded_values', {})
+        invalidate_asset_fragments([(instance.pk, loaded.get('updated_at'))])
+
+
+@receiver(post_save, sender=Asset)
+def invalidate_stats_on_save(sender, instance, created, **kwargs):
+    loaded = getattr(instance, '_loaded_values', {})
+    old_user_id = loaded.get('assigned_user_id')
+    # Status counts are kept per department
+    status_changed = (
+        created or loaded.get('status') != instance.status
+        or loaded.get('department_id') != instance.department_id
+    )
+    invalidate_asset_stats(
+        user_ids={old_user_id, instance.assigned_user_id},
+        status_counts=status_changed,
+    )
+
+
+@receiver(post_save, sender=Asset)
+def update_autocomplete_on_save(sender, instance, created, **kwargs):
+    old_values = None if created else getattr(instance, '_loaded_values', None)
+    record_asset_change(old_values, instance.__dict__)
+
+
+@receiver(post_save, sender=Asset)
+def audit_asset_save(sender, instance, created, **kwargs):
+    record_asset_save(instance, created)
+
+
+@receiver(post_save, sender=Asset)
+def remember_saved_values(sender, instance, **kwargs):
+    # Must stay the last Asset post_save handler: the ones above compare
+    # against the values as they were before this save
+    instance._loaded_values = {field.attname: getattr(instance, field.attname) for field in Asset._meta.concrete_fields}
+
+
+@receiver(post_delete, sender=Asset)
+def invalidate_caches_on_delete(sender, instance, **kwargs):
+    invalidate_asset_stats(user_ids={instance.assigned_user_id})
+    invalidate_asset_fragments([(instance.pk, instance.updated_at)])
+    record_asset_change(instance.__dict__, None)
+    record_asset_delete(instance)
+
+
+@receiver(post_save, sender=AssetAssignment)
+def audit_assignment_save(sender, instance, created, **kwargs):
+    record_assignment_save(instance, created)
+    instance._loaded_values = {field.attname: getattr(instance, field.attname) for field in AssetAssignment._meta.concrete_fields}
+
+
+@receiver(post_save, sender=AssetAssignment)
+@receiver(post_delete, sender=AssetAssignment)
+def invalidate_fragments_on_assignment_change(sender, instance, **kwargs):
+    # The detail page shows the assignment history, which an assignment
+    # change does not always accompany with an asset save
+    invalidate_asset_fragments(Asset.objects.filter(pk=instance.asset_id).values_list('pk', 'updated_at'))
+
+
+@receiver(post_save, sender=User)
+def invalidate_fragments_on_user_rename(sender, instance, created, update_fields, **kwargs):
+    # Rows and pages show the assigned user's full name
+    if created or (update_fields is not None and not {'username', 'first_name', 'last_name'} & set(update_fields)):
+        return
+    invalidate_asset_fragments(Asset.objects.filter(assigned_user=instance).values_list('pk', 'updated_at'))
+    bump_pages_version()
+
+
+@receiver(post_save, sender=User)
+def bump_pages_on_user_create(sender, instance, created, **kwargs):
+    # The asset list's bulk form offers every user to assign to
+    if created:
+        bump_pages_version()
+
+
+@receiver(post_delete, sender=User)
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def bump_pages_on_user_change(sender, instance, **kwargs):
+    # A profile's role decides whether the bulk form offers its user;
+    # profiles are rarely saved, so any save counts
+    bump_pages_version()
+
+
+@receiver(post_save, sender=IdempotencyKey)
+def bump_pages_on_idempotency_key(sender, instance, created, **kwargs):
+    # The asset list's bulk form embeds a fresh key; once it is spent the
+    # cached page must not be revalidated, even if the action changed no rows
+    if created:
+        bump_pages_version()
+
+
+@receiver(pre_save, sender=User)
+def remember_username(sender, instance, update_fields, **kwargs):
+    if instance.pk and (update_fields is None or 'username' in update_fields):
+        instance._old_username = User.objects.filter(pk=instance.pk).values_list('username', flat=True).first()
+
+
+@receiver(post_save, sender=User)
+def update_autocomplete_on_user_save(sender, instance, created, **kwargs):
+    old_username = getattr(instance, '_old_username', None)
+    if created:
+        index_add('user', instance.username)
+    elif old_username and old_username != instance.username:
+        index_remove('user', old_username)
+        index_add('user', instance.username)
+
+
+@receiver(post_delete, sender=User)
+def update_autocomplete_on_user_delete(sender, instance, **kwargs):
+    index_remove('user', instance.username)
+
+
+@receiver(pre_save, sender=Company)
+@receiver(pre_save, sender=Department)
+def remember_lookup_name(sender, instance, **kwargs):
+    if instance.pk:
+        instance._old_name = sender.objects.filter(pk=instance.pk).values_list('name', flat=True).first()
+
+
+@receiver(post_save, sender=Company)
+@receiver(post_save, sender=Department)
+def refresh_assets_on_lookup_rename(sender, instance, created, **kwargs):
+    invalidate_lookup_names(sender)
+    # The asset list's filters offer every name
+    bump_pages_version()
+    old_name = getattr(instance, '_old_name', None)
+    if created or old_name == instance.name:
+        return
+    assets = Asset.objects.filter(**{sender._meta.model_name: instance})
+    if sender is Department:
+        # Assets embed their department's name in search_text
+        refresh_search_text(assets)
+        index_remove('department', old_name)
+        index_add('department', instance.name)
+    # Rows and pages show the name
+    invalidate_asset_fragments(assets.values_list('pk', 'updated_at'))
+
+
+@receiver(post_save, sender=Department)
+def update_autocomplete_on_department_create(sender, instance, created, **kwargs):
+    if created:
+        index_add('department', instance.name)
+
+
+@receiver(post_delete, sender=Company)
+@receiver(post_delete, sender=Department)
+def forget_deleted_lookup(sender, instance, **kwargs):
+    invalidate_lookup_names(sender)
+    bump_pages_version()
+    if sender is Department:
+        index_remove('department', instance.name)
@@ -0,0 +1,100 @@
+"""
+Cached asset statistics for the dashboard.
+
+All status counts come from a single GROUP BY (department, status) query
+and are kept in the default cache, so the organisation-wide and the
+per-department counts (for department-scoped incharges) share one entry.
+Asset save/delete signals (see assets.signals) drop the affected keys, so
+in the steady state the dashboard serves counts from memory.
+ASSET_STATS_CACHE_TIMEOUT bounds how stale a count can get when the cache
+is per-process (LocMemCache) and another worker made the change.
+
+aget_status_counts() and aget_user_asset_count() are the same for async
+views, using the async cache and ORM APIs.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from .models import Asset
+
+STATUS_COUNTS_KEY = 'assets:stats:status_counts'
+USER_COUNT_KEY = 'assets:stats:user_count:{user_id}'
+
+
+def get_cache_timeout():
+    return getattr(settings, 'ASSET_STATS_CACHE_TIMEOUT', 60)
+
+
+def get_status_counts(department_id=None):
+    """
+    Return a dict with the number of assets per status, plus 'total', for
+    one department or (by default) all of them. Every status in
+    Asset.STATUS_CHOICES is present, even when zero.
+    """
+    by_department = cache.get(STATUS_COUNTS_KEY)
+    if by_department is None:
+        by_department = _by_department(_status_rows())
+        cache.set(STATUS_COUNTS_KEY, by_department, get_cache_timeout())
+    return _status_counts(by_department, department_id)
+
+
+async def aget_status_counts(department_id=None):
+    by_department = await cache.aget(STATUS_COUNTS_KEY)
+    if by_department is None:
+        by_department = _by_department([row async for row in _status_rows()])
+        await cache.aset(STATUS_COUNTS_KEY, by_department, get_cache_timeout())
+    return _status_counts(by_department, department_id)
+
+
+def _status_rows():
+    return Asset.objects.order_by().values('department_id', 'status').annotate(count=Count('id'))
+
+
+def _by_department(rows):
+    """{department_id: {status: count}}"""
+    by_department = {}
+    for row in rows:
+        by_department.setdefault(row['department_id'], {})[row['status']] = row['count']
+    return by_department
+
+
+def _status_counts(by_department, department_id=None):
+    counts = {status: 0 for status, _ in Asset.STATUS_CHOICES}
+    for department, statuses in by_department.items():
+        if department_id is None or department == department_id:
+            for status, count in statuses.items():
+                counts[status] += count
+    counts['total'] = sum(counts.values())
+    return counts
+
+
+def get_user_asset_count(user):
+    """Return the number of assets currently assigned to ``user``."""
+    key = USER_COUNT_KEY.format(user_id=user.pk)
+    count = cache.get(key)
+    if count is None:
+        count = Asset.objects.filter(assigned_user=user).count()
+        cache.set(key, count, get_cache_timeout())
+    return count
+
+
+async def aget_user_asset_count(user):
+    key = USER_COUNT_KEY.format(user_id=user.pk)
+    count = await cache.aget(key)
+    if count is None:
+        count = await Asset.objects.filter(assigned_user=user).acount()
+        await cache.aset(key, count, get_cache_timeout())
+    return count
+
+
+def invalidate_asset_stats(user_ids=(), status_counts=True):
+    """
+    Drop cached statistics. Call this after bulk writes that bypass model
+    signals (QuerySet.update(), bulk_create()).
+    """
+    keys = [USER_COUNT_KEY.format(user_id=user_id) for user_id in user_ids if user_id is not None]
+    if status_counts:
+        keys.append(STATUS_COUNTS_KEY)
+    if keys:
+        cache.delete_many(keys)
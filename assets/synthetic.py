@@ -0,0 +1,248 @@
+"""
+Synthetic data for capacity testing and benchmarks.
+
+generate() writes N users (with profiles), M assets spread over every
+category and status, and roughly K assignment records, all with
+bulk_create in batches of ``batch_size`` rows per transaction.
+
+The data is realistic enough for the query planner to behave as in
+production: assets are created over the last ``days`` days, each asset's
+assignments are consecutive, non-overlapping periods after its creation,
+and an asset with status 'assigned' has exactly one open assignment, its
+current_assignment, whose holder is its assigned_user.
+
+Output depends only on ``seed`` and the rows already generated with the
+same ``prefix``, so repeated runs are comparable; running again appends
+new rows instead of failing on the unique usernames and serial numbers.
+"""
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from .autocomplete import reset_index
+from .lookups import find_or_create
+from .models import Asset, AssetAssignment, Company, Department, UserProfile
+from .search import build_search_text
+from .stats import invalidate_asset_stats
+
+DEFAULT_BATCH_SIZE = 5000
+DEFAULT_PASSWORD = 'synthetic123'
+
+# Share of assets per status (assigned assets dominate a real inventory)
+STATUS_WEIGHTS = {
+    'available': 30,
+    'assigned': 55,
+    'maintenance': 10,
+    'retired': 5,
+}
+
+DEPARTMENTS = [
+    'Engineering', 'Marketing', 'Sales', 'HR', 'Finance', 'IT Operations',
+    'IT Administration', 'Legal', 'Support', 'Research', 'Facilities', 'Design',
+]
+COMPANIES = ['Acme Corp', 'Globex', 'Initech', 'Umbrella', 'Stark Industries', 'Wayne Enterprises']
+MODELS = {
+    'laptop': ['ThinkPad T14', 'MacBook Pro 14', 'Latitude 7440', 'EliteBook 840', 'XPS 13'],
+    'desktop': ['OptiPlex 7010', 'ThinkCentre M70', 'iMac 24', 'ProDesk 600'],
+    'monitor': ['UltraSharp U2723', 'ThinkVision T27', 'LG 27UK850', 'Samsung S80'],
+    'printer': ['LaserJet Pro M404', 'Brother HL-L2350', 'Canon imageCLASS'],
+    'mobile': ['iPhone 15', 'Galaxy S24', 'Pixel 8'],
+    'tablet': ['iPad Air', 'Galaxy Tab S9', 'Surface Go'],
+    'other': ['Docking Station', 'Headset', 'Webcam', 'Projector'],
+}
+FIRST_NAMES = ['James', 'Mary', 'Wei', 'Priya', 'Ahmed', 'Sofia', 'Kenji', 'Amara', 'Lucas', 'Olga', 'Diego', 'Fatima']
+LAST_NAMES = ['Smith', 'Garcia', 'Chen', 'Patel', 'Khan', 'Rossi', 'Tanaka', 'Okafor', 'Silva', 'Ivanova', 'Lopez', 'Haddad']
+
+
+class GenerationResult:
+    """Counts and timing of one generate() run."""
+
+    def __init__(self):
+        self.users = 0
+        self.assets = 0
+        self.assignments = 0
+        self.elapsed = 0.0
+
+    def __str__(self):
+        return (
+            f"{self.users} users, {self.assets} assets and {self.assignments} assignments "
+            f"in {self.elapsed:.1f}s"
+        )
+
+
+def _batches(count, batch_size):
+    """Yield (start, stop) ranges covering ``count`` items."""
+    for start in range(0, count, batch_size):
+        yield start, min(start + batch_size, count)
+
+
+def _next_number(queryset, field, prefix):
+    """Return how many rows the previous runs with this prefix generated."""
+    return queryset.filter(**{f'{field}__startswith': prefix}).count()
+
+
+def generate_users(count, prefix='synth', batch_size=DEFAULT_BATCH_SIZE, rng=None, result=None):
+    """
+    Create ``count`` users with the 'user' role (about 5% asset incharges)
+    and return {id: username} for them. All share DEFAULT_PASSWORD, hashed
+    once.
+    """
+    rng = rng or random.Random()
+    result = result or GenerationResult()
+    password = make_password(DEFAULT_PASSWORD)
+    offset = _next_number(User.objects, 'username', f'{prefix}_user')
+    departments = list(find_or_create(Department, DEPARTMENTS).values())
+    created = {}
+
+    for start, stop in _batches(count, batch_size):
+        users = []
+        profiles = []
+        for number in range(offset + start, offset + stop):
+            first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            users.append(User(
+                username=f'{prefix}_user{number:07d}',
+                first_name=first_name,
+                last_name=last_name,
+                email=f'{first_name}.{last_name}.{number}@example.com'.lower(),
+                password=password,
+            ))
+        with transaction.atomic():
+            User.objects.bulk_create(users)
+            for user in users:
+                number = user.username[len(prefix) + 5:]
+                profiles.append(UserProfile(
+                    user=user,
+                    role='asset_incharge' if rng.random() < 0.05 else 'user',
+                    employee_id=f'{prefix.upper()}-{number}',
+                    department=rng.choice(departments),
+                ))
+            UserProfile.objects.bulk_create(profiles)
+        created.update((user.pk, user.username) for user in users)
+        result.users += len(users)
+    return created
+
+
+def _history(rng, created_at, now, count, open_last):
+    """
+    Return ``count`` consecutive (assigned, returned) periods starting after
+    ``created_at``; the last one has no return date when ``open_last``.
+    """
+    periods = []
+    moment = created_at
+    span = (now - created_at) / (count + 1)
+    for index in range(count):
+        assigned = moment + rng.random() * span / 4
+        if open_last and index == count - 1:
+            periods.append((assigned, None))
+            break
+        returned = assigned + span / 4 + rng.random() * span / 2
+        periods.append((assigned, min(returned, now)))
+        moment = returned
+    return periods
+
+
+def generate_assets(count, assignments, usernames, prefix='synth', days=365, batch_size=DEFAULT_BATCH_SIZE,
+                    rng=None, result=None):
+    """
+    Create ``count`` assets and about ``assignments`` assignment records for
+    them, held by the users in ``usernames`` ({id: username}). Assignments are made by admins and incharges.
+    """
+    rng = rng or random.Random()
+    result = result or GenerationResult()
+    if not usernames:
+        raise ValueError("Assets with assignments need at least one user.")
+
+    assigners = list(
+        UserProfile.objects.filter(role__in=['admin', 'asset_incharge']).values_list('user_id', flat=True)[:1000]
+    ) or list(usernames)[:1]
+    user_ids = list(usernames)
+    statuses = list(STATUS_WEIGHTS)
+    weights = list(STATUS_WEIGHTS.values())
+    categories = [category for category, _ in Asset.CATEGORY_CHOICES]
+    per_asset = assignments / count if count else 0
+    now = timezone.now()
+    offset = _next_number(Asset.objects, 'serial_number', f'{prefix.upper()}-')
+    departments = list(find_or_create(Department, DEPARTMENTS).values())
+    companies = list(find_or_create(Company, COMPANIES).values())
+
+    for start, stop in _batches(count, batch_size):
+        assets = []
+        for number in range(offset + start, offset + stop):
+            category = rng.choice(categories)
+            status = rng.choices(statuses, weights)[0]
+            asset = Asset(
+                serial_number=f'{prefix.upper()}-{number:09d}',
+                display_name=rng.choice(MODELS[category]),
+                department=rng.choice(departments),
+                model_category=category,
+                status=status,
+                company=rng.choice(companies),
+            )
+            # Number of history rows for this asset, averaging ``per_asset``
+            history = int(per_asset) + (1 if rng.random() < per_asset % 1 else 0)
+            if status == 'assigned':
+                history = max(history, 1)
+                asset.assigned_user_id = rng.choice(user_ids)
+                # build_search_text reads the username from the related object
+                asset.assigned_user = User(pk=asset.assigned_user_id, username=usernames[asset.assigned_user_id])
+            asset.search_text = build_search_text(asset)
+            asset._synthetic = (now - timedelta(seconds=rng.random() * days * 86400), history)
+            assets.append(asset)
+
+        with transaction.atomic():
+            Asset.objects.bulk_create(assets)
+            # created_at is auto_now_add, so bulk_create stamped every row with
+            # the current time; spread them over the history window
+            for asset in assets:
+                asset.created_at = asset._synthetic[0]
+            Asset.objects.bulk_update(assets, ['created_at'], batch_size=1000)
+
+            records = []
+            for asset in assets:
+                created_at, history = asset._synthetic
+                periods = _history(rng, created_at, now, history, open_last=asset.status == 'assigned')
+                for index, (assigned, returned) in enumerate(periods):
+                    is_open = returned is None
+                    records.append(AssetAssignment(
+                        asset_id=asset.pk,
+                        assigned_to_id=asset.assigned_user_id if is_open else rng.choice(user_ids),
+                        assigned_by_id=rng.choice(assigners),
+                        assigned_date=assigned,
+                        returned_date=returned,
+                        notes='' if rng.random() < 0.8 else f'Synthetic assignment {index + 1}',
+                    ))
+            AssetAssignment.objects.bulk_create(records, batch_size=batch_size)
+            open_assignment = AssetAssignment.objects.filter(asset=OuterRef('pk'), returned_date__isnull=True)
+            Asset.objects.filter(pk__gte=assets[0].pk, pk__lte=assets[-1].pk, status='assigned').update(
+                current_assignment=Subquery(open_assignment.values('pk')[:1]),
+            )
+        result.assets += len(assets)
+        result.assignments += len(records)
+    return result
+
+
+def generate(users=100, assets=1000, assignments=3000, prefix='synth', days=365, seed=0,
+             batch_size=DEFAULT_BATCH_SIZE):
+    """Generate a complete synthetic data set and return a GenerationResult."""
+    rng = random.Random(seed)
+    result = GenerationResult()
+    started = time.perf_counter()
+
+    usernames = generate_users(users, prefix, batch_size, rng, result)
+    if assets:
+        if not usernames:
+            # Reuse existing users when no new ones were asked for
+            usernames = dict(User.objects.filter(userprofile__role='user').values_list('pk', 'username')[:10000])
+        generate_assets(assets, assignments, usernames, prefix, days, batch_size, rng, result)
+
+    # bulk_create bypasses the model signals that keep the caches current
+    invalidate_asset_stats()
+    reset_index()
+    result.elapsed = time.perf_counter() - started
+    return result
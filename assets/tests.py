@@ -0,0 +1,434 @@
+"""
+Query-count regression tests, and a concurrency test of the assignment
+services.
+
+Run with a database configured, e.g.:
+    DATABASE_URL=sqlite:///db.sqlite3 python manage.py test assets
+"""
+import random
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.db import DatabaseError, connection, connections
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .analytics import refresh_analytics
+from .archive import archive_assets
+from .autocomplete import PrefixIndex
+from .consistency import find_inconsistencies
+from .forms import AssetForm
+from .imports import validate_row
+from .lookups import find_or_create
+from .models import AnalyticsSnapshot, Asset, AssetAssignment, AssetEvent, Company, Department, ExportJob, UserProfile
+from .services import AssignmentError, assign, bulk_assign, release
+from .synthetic import generate
+
+
+def make_user(username, role):
+    user = User.objects.create_user(username, password='secret', first_name=username.title())
+    UserProfile.objects.create(
+        user=user, role=role, employee_id=username.upper(),
+        department=find_or_create(Department, ['Engineering'])['Engineering'],
+    )
+    return user
+
+
+def add_assets(count, prefix='test'):
+    """Add ``count`` synthetic assets with about two assignments each."""
+    generate(users=5, assets=count, assignments=count * 2, prefix=prefix, seed=count)
+
+
+def clear_caches():
+    for cache in caches.all():
+        cache.clear()
+
+
+# Audit events are written as soon as their transaction commits
+@override_settings(ASSET_AUDIT_FLUSH_INTERVAL=0)
+class QueryCountTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = make_user('admin', 'admin')
+        cls.incharge = make_user('incharge', 'asset_incharge')
+        find_or_create(Company, ['Acme'])
+
+    def setUp(self):
+        clear_caches()
+        self.client.force_login(self.admin)
+
+    def get(self, url, status=200, **headers):
+        """GET ``url`` and read the whole body, so a streamed response runs its queries too."""
+        response = self.client.get(url, headers=headers)
+        self.assertEqual(response.status_code, status)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            self.get(url)
+        return len(queries)
+
+
+class ExportQueryCountTests(QueryCountTestCase):
+    """The export is a fixed number of queries, however many assets it covers."""
+
+    def assert_constant(self, url):
+        add_assets(20, prefix='small')
+        small = self.count_queries(url)
+        add_assets(180, prefix='large')
+        clear_caches()
+        with self.assertNumQueries(small):
+            self.get(url)
+
+    def test_csv_export(self):
+        self.assert_constant(reverse('export_assets_excel') + '?format=csv')
+
+    def test_xlsx_export(self):
+        self.assert_constant(reverse('export_assets_excel'))
+
+
+
+class ViewQueryCountTests(QueryCountTestCase):
+    """The main views run a fixed number of queries, whatever the page holds."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        add_assets(60)
+        cls.holder = User.objects.filter(userprofile__role='user').first()
+
+    def assigned_asset(self):
+        return Asset.objects.filter(current_assignment__isnull=False).order_by('pk').first()
+
+    def available_asset(self):
+        return Asset.objects.filter(status='available', current_assignment__isnull=True).order_by('pk').first()
+
+    # An assign or return writes one asset and one assignment, so its cost
+    # does not depend on the data. The bound leaves room for signal and
+    # audit handlers (and savepoints for the idempotency key and the row
+    # lock) without pinning each of them.
+    WRITE_QUERIES = 25
+
+    @contextmanager
+    def assertMaxQueries(self, count):
+        with CaptureQueriesContext(connection) as queries:
+            yield
+        self.assertLessEqual(len(queries), count, '\n'.join(query['sql'] for query in queries))
+
+    def assert_steady_queries(self, url, count):
+        # The first request fills the caches (stats, lookups, fragments)
+        self.get(url)
+        with self.assertNumQueries(count):
+            self.get(url)
+
+    def test_dashboard(self):
+        self.assert_steady_queries(reverse('dashboard'), 3)
+
+    def test_asset_list(self):
+        self.assert_steady_queries(reverse('asset_list'), 4)
+
+    def test_asset_list_with_cold_caches(self):
+        # Rendering every row from scratch still queries per page, not per
+        # row; the two extra queries load the department and company names
+        with self.assertNumQueries(6):
+            self.get(reverse('asset_list'))
+
+    def test_asset_detail(self):
+        asset = self.assigned_asset()
+        self.assert_steady_queries(reverse('asset_detail', args=[asset.serial_number]), 5)
+
+    def test_assign(self):
+        self.client.force_login(self.incharge)
+        asset = self.available_asset()
+        with self.assertMaxQueries(self.WRITE_QUERIES):
+            response = self.client.post(reverse('assign_asset', args=[asset.serial_number]), {
+                'assigned_to': self.holder.pk, 'notes': '', 'idempotency_key': 'assign-1',
+            })
+        self.assertEqual(response.status_code, 302)
+        asset.refresh_from_db()
+        self.assertEqual(asset.assigned_user, self.holder)
+
+    def test_return(self):
+        self.client.force_login(self.incharge)
+        asset = self.assigned_asset()
+        with self.assertMaxQueries(self.WRITE_QUERIES):
+            response = self.client.post(reverse('return_asset', args=[asset.serial_number]), {
+                'assignment': asset.current_assignment_id, 'idempotency_key': 'return-1',
+            })
+        self.assertEqual(response.status_code, 302)
+        asset.refresh_from_db()
+        self.assertIsNone(asset.current_assignment)
+
+
+class ConditionalGetTests(QueryCountTestCase):
+    """An unchanged asset_list or asset_detail page costs a 304 and a few queries."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        add_assets(20)
+
+    def assert_not_modified(self, url):
+        etag = self.get(url)['ETag']
+        # Session, user with profile, and the validator's aggregate
+        with self.assertNumQueries(3):
+            response = self.get(url, status=304, if_none_match=etag)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+
+    def test_asset_list(self):
+        self.assert_not_modified(reverse('asset_list') + '?status=available')
+
+    def test_asset_detail(self):
+        asset = Asset.objects.filter(current_assignment__isnull=False).first()
+        self.assert_not_modified(reverse('asset_detail', args=[asset.serial_number]))
+
+    def test_change_invalidates(self):
+        url = reverse('asset_list')
+        etag = self.get(url)['ETag']
+        asset = Asset.objects.first()
+        asset.display_name += ' (renamed)'
+        asset.save()
+        self.get(url, if_none_match=etag)
+
+    def test_api_assignments_follow_asset_changes(self):
+        url = reverse('api_assignment_list')
+        etag = self.get(url)['ETag']
+        asset = AssetAssignment.objects.select_related('asset').first().asset
+        asset.serial_number += '-R'
+        asset.save()
+        self.assertIn(asset.serial_number, self.get(url, if_none_match=etag).content.decode())
+
+    def test_spent_idempotency_key_invalidates(self):
+        # A bulk action that changes no rows still uses up the page's key
+        self.client.force_login(self.incharge)
+        url = reverse('asset_list')
+        response = self.get(url)
+        key = response.context['bulk_form']['idempotency_key'].value()
+        available = Asset.objects.filter(status='available').first()
+        self.client.post(reverse('asset_bulk_action'), {
+            'action': 'return', 'scope': 'selected', 'selected': [available.serial_number], 'idempotency_key': key,
+        })
+        self.get(url)  # Shows the flash message
+        self.get(url, if_none_match=response['ETag'])
+
+    def test_other_user_does_not_match(self):
+        url = reverse('asset_list')
+        etag = self.get(url)['ETag']
+        self.client.force_login(self.incharge)
+        self.get(url, if_none_match=etag)
+
+
+@override_settings(ASSET_AUDIT_FLUSH_INTERVAL=0)
+class ConcurrentAssignmentTests(TransactionTestCase):
+    """
+    Threads assigning and returning the same few assets through the services
+    (what stress_assignments does through the views) leave no inconsistency.
+
+    SQLite has no row locks: there the threads run in write-ahead-log mode
+    with IMMEDIATE transactions (DATABASE_SQLITE_WAL and
+    DATABASE_SQLITE_TRANSACTION_MODE), which serialize them instead.
+    """
+    THREADS = 6
+    ROUNDS = 25
+
+    def setUp(self):
+        self.sqlite = connection.vendor == 'sqlite'
+        if self.sqlite:
+            if connection.creation.is_in_memory_db(connection.settings_dict['NAME']):
+                self.skipTest("Threads cannot share an in-memory SQLite database; use a file database.")
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode=WAL')
+
+    def connect_worker(self):
+        if self.sqlite:
+            # This thread's own connection (the mode is read when it opens);
+            # the settings are left alone
+            connection.ensure_connection()
+            connection.transaction_mode = 'IMMEDIATE'
+
+    def test_no_inconsistencies(self):
+        incharge = make_user('incharge', 'asset_incharge')
+        add_assets(5)
+        holders = list(User.objects.filter(userprofile__role='user')[:5])
+        assets = list(Asset.objects.order_by('pk')[:3])
+        for asset in assets:
+            if asset.current_assignment_id is not None:
+                release(asset)
+        errors = []
+
+        def worker(seed):
+            rng = random.Random(seed)
+            try:
+                self.connect_worker()
+                for _ in range(self.ROUNDS):
+                    asset = rng.choice(assets)
+                    try:
+                        if rng.random() < 0.5:
+                            assign(asset, rng.choice(holders), incharge)
+                        else:
+                            release(asset)
+                    except AssignmentError:
+                        # Lost the race: the asset was already assigned or returned
+                        pass
+            except DatabaseError as exc:
+                errors.append(exc)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(find_inconsistencies(), {})
+        for asset in assets:
+            self.assertLessEqual(AssetAssignment.objects.filter(asset=asset, returned_date__isnull=True).count(), 1)
+
+
+@override_settings(ASSET_AUDIT_FLUSH_INTERVAL=0)
+class ReturnEventTests(TestCase):
+    """A return logs the status the asset went back to; an assignment does not repeat 'assigned'."""
+
+    def setUp(self):
+        self.incharge = make_user('incharge', 'asset_incharge')
+        add_assets(3)
+        self.asset = Asset.objects.filter(current_assignment__isnull=True).exclude(status='retired').first()
+        self.asset.status = 'available'
+        self.asset.save()
+        self.holder = User.objects.filter(userprofile__role='user').first()
+
+    def status_changes(self):
+        return [
+            (event.action, event.changes['status'])
+            for event in AssetEvent.objects.filter(asset=self.asset).order_by('id')
+            if 'status' in event.changes
+        ]
+
+    def test_release_to_maintenance(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            assign(self.asset, self.holder, self.incharge)
+        AssetEvent.objects.all().delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            release(self.asset, status='maintenance')
+        self.assertEqual(self.status_changes(), [('update', ['assigned', 'maintenance'])])
+        self.assertTrue(AssetEvent.objects.filter(asset=self.asset, action='return').exists())
+
+    def test_assign_has_no_status_update(self):
+        AssetEvent.objects.all().delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            assign(self.asset, self.holder, self.incharge)
+        self.assertEqual(self.status_changes(), [])
+
+
+class BulkAssignTests(TestCase):
+    def test_skips_assets_with_an_open_assignment(self):
+        incharge = make_user('incharge', 'asset_incharge')
+        add_assets(10)
+        holder = User.objects.filter(userprofile__role='user').first()
+        # Sent to maintenance without closing its assignment
+        stuck = Asset.objects.filter(current_assignment__isnull=False).first()
+        Asset.objects.filter(pk=stuck.pk).update(status='maintenance')
+        free = Asset.objects.filter(status='available', current_assignment__isnull=True).first()
+
+        result = bulk_assign(Asset.objects.filter(pk__in=[stuck.pk, free.pk]), holder, incharge)
+
+        self.assertEqual((result.affected, result.skipped), (1, 1))
+        stuck.refresh_from_db()
+        self.assertEqual(stuck.status, 'maintenance')
+        self.assertEqual(AssetAssignment.objects.filter(asset=stuck, returned_date__isnull=True).count(), 1)
+
+
+class ExportDownloadTests(TestCase):
+    """Export files are kept out of MEDIA_ROOT and only handed to their requester (or an admin)."""
+
+    def setUp(self):
+        self.owner = make_user('owner', 'asset_incharge')
+        self.job = ExportJob.objects.create(requested_by=self.owner, format='csv', status='done')
+        self.job.file.save(f'{self.job.pk}.csv', ContentFile(b'Serial Number\n'))
+        self.addCleanup(self.job.file.delete, save=False)
+        self.url = reverse('export_job_download', args=[self.job.pk])
+
+    def test_file_is_outside_media_root(self):
+        self.assertFalse(Path(self.job.file.path).is_relative_to(settings.MEDIA_ROOT))
+
+    def test_owner_and_admin_can_download(self):
+        for user in (self.owner, make_user('admin', 'admin')):
+            self.client.force_login(user)
+            response = self.client.get(self.url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(b''.join(response.streaming_content), b'Serial Number\n')
+
+    def test_other_incharge_cannot_download(self):
+        self.client.force_login(make_user('other', 'asset_incharge'))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+
+class AnalyticsArchiveTests(TestCase):
+    def test_full_refresh_counts_archived_assignments(self):
+        add_assets(30)
+        returned = AssetAssignment.objects.filter(asset__current_assignment__isnull=True).values_list('asset', flat=True)
+        retired = Asset.objects.filter(pk__in=list(returned.distinct().order_by('asset')[:10]))
+        retired.update(status='retired')
+
+        def totals():
+            refresh_analytics(full=True)
+            return AnalyticsSnapshot.objects.filter(dimension='department').aggregate(
+                started=Sum('assignments_started'), returned=Sum('assignments_returned'), seconds=Sum('assigned_seconds'),
+            )
+
+        before = totals()
+        self.assertGreater(before['started'], 0)
+        self.assertEqual(archive_assets(retired, 'retired'), 10)
+        self.assertEqual(totals(), before)
+
+
+class ReservedSerialNumberTests(TestCase):
+    """Serial numbers that are fixed paths under /assets/ are refused."""
+
+    def test_asset_form(self):
+        form = AssetForm(data={'serial_number': 'import', 'display_name': 'X'}, is_new_asset=True)
+        self.assertIn('serial_number', form.errors)
+
+    def test_import_row(self):
+        _cleaned, errors = validate_row({
+            'serial_number': 'as-of', 'display_name': 'X', 'department': 'IT', 'model_category': 'laptop', 'company': 'Acme',
+        }, {})
+        self.assertEqual(errors, ["serial number 'as-of' is reserved for a page of the site"])
+
+
+class PrefixIndexEvictionTests(TestCase):
+    """Over budget, the least recently added or suggested entries go first."""
+
+    def setUp(self):
+        self.index = PrefixIndex(max_entries=10)
+        self.index.load(('serial', f'OLD-{number}') for number in range(10))
+
+    def serials(self):
+        return {text for _kind, text in self.index.search('', limit=20)}
+
+    def test_fresh_entries_outlive_old_ones(self):
+        for number in range(5):
+            self.index.add('serial', f'NEW-{number}')
+        serials = self.serials()
+        self.assertTrue({f'NEW-{number}' for number in range(5)} <= serials)
+        self.assertNotIn('OLD-9', serials)
+
+    def test_suggested_entries_are_kept(self):
+        self.index.search('OLD-9')
+        self.index.add('serial', 'NEW-0')
+        serials = self.serials()
+        self.assertIn('OLD-9', serials)
+        self.assertIn('NEW-0', serials)
+        self.assertNotIn('OLD-8', serials)
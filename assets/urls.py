@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import views, api
 
 urlpatterns = [
     path('create-admin/', views.create_admin),
@@ -8,10 +8,27 @@ urlpatterns = [
     path('logout/', views.logout_view, name='logout'),
     path('assets/', views.asset_list, name='asset_list'),
     path('assets/create/', views.asset_create, name='asset_create'),
+    path('assets/import/', views.asset_import, name='asset_import'),
+    path('assets/bulk/', views.asset_bulk_action, name='asset_bulk_action'),
+    path('assets/as-of/', views.assignments_as_of, name='assignments_as_of'),
     path('assets/<str:serial_number>/', views.asset_detail, name='asset_detail'),
     path('assets/<str:serial_number>/edit/', views.asset_edit, name='asset_edit'),
     path('assets/<str:serial_number>/delete/', views.asset_delete, name='asset_delete'),
     path('assets/<str:serial_number>/assign/', views.assign_asset, name='assign_asset'),
     path('assets/<str:serial_number>/return/', views.return_asset, name='return_asset'),
     path('assets/export/excel/', views.export_assets_excel, name='export_assets_excel'), # New URL for Excel export
+    path('analytics/', views.analytics_dashboard, name='analytics_dashboard'),
+    path('profiling/', views.profiling_dashboard, name='profiling_dashboard'),
+    path('analytics/export/', views.analytics_export, name='analytics_export'),
+    path('exports/', views.export_job_create, name='export_job_create'),
+    path('exports/<uuid:job_id>/', views.export_job_detail, name='export_job_detail'),
+    path('exports/<uuid:job_id>/progress/', views.export_job_progress, name='export_job_progress'),
+    path('exports/<uuid:job_id>/download/', views.export_job_download, name='export_job_download'),
+
+    # Read-only JSON API
+    path('api/assets/', api.asset_list, name='api_asset_list'),
+    path('api/assets/<str:serial_number>/', api.asset_detail, name='api_asset_detail'),
+    path('api/assignments/', api.assignment_list, name='api_assignment_list'),
+    path('api/profiles/', api.profile_list, name='api_profile_list'),
+    path('api/autocomplete/', api.autocomplete, name='api_autocomplete'),
 ]
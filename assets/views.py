@@ -1,15 +1,44 @@
+import logging
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth.models import User
+from django.conf import settings
 from django.contrib import messages
-from django.db.models import Q, Count
-from django.http import JsonResponse, HttpResponse
+from django.contrib.messages import get_messages
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.http import Http404, JsonResponse, HttpResponse, StreamingHttpResponse, FileResponse
+from django.urls import reverse
 from django.utils import timezone
-import openpyxl # For Excel export
-
-from .models import Asset, UserProfile, AssetAssignment
-from .forms import AssetForm, AssetAssignmentForm
+from django.utils.dateparse import parse_date
+from django.utils.http import urlencode
+from django.middleware.csrf import get_token
+from django.views.decorators.cache import cache_control
+
+from .models import Asset, AssetAssignment, AssetEvent, ExportJob, AnalyticsSnapshot, AnalyticsRefreshState, Company, Department
+from .access import can_view, visible_assets, visible_assignments
+from .audit import atimeline
+from .conditional import acondition, apages_version, make_etag
+from .archive import delete_asset, filter_archived
+from .analytics import STATE_NAME as ANALYTICS_STATE, ANALYTICS_EXPORT_HEADERS, analytics_export_rows, rollup
+from .forms import AssetForm, AssetAssignmentForm, AssetImportForm, BulkAssetActionForm, ReturnAssetForm
+from .history import held_at, parse_as_of
+from .idempotency import DuplicateRequest, idempotent
+from .imports import import_assets
+from .lookups import alookup_names, lookup_choices
+from .middleware import aresolve_role
+from .pagination import apaginate_many, paginate
+from .search import aget_search_backend, apply_asset_filters, apply_field_filters, parse_id
+from .stats import aget_status_counts, aget_user_asset_count
+from .services import AssignmentError, assign, bulk_assign, bulk_return, bulk_retire, release, save_asset
+from .exports import export_querysets, export_rows, stream_csv, build_xlsx, XLSX_CONTENT_TYPE
+from .jobs import start_export
+from . import profiling
+
+logger = logging.getLogger(__name__)
 
 # Helper functions for role-based access
 def is_admin(user):
@@ -21,6 +50,29 @@ def is_asset_incharge(user):
 def is_admin_or_incharge(user):
     return is_admin(user) or is_asset_incharge(user)
 
+def get_user_profile(request):
+    # Resolved once per request by UserRoleMiddleware (profile loaded with the user)
+    profile = request.user_role.profile
+    if profile is None:
+        raise Http404("No UserProfile matches the given query.")
+    return profile
+
+async def aget_user_profile(request):
+    await aresolve_role(request)
+    return get_user_profile(request)
+
+async def arender(request, template_name, context):
+    # Rendering is CPU-bound and may query lazily (cached fragments, messages,
+    # related objects), so it runs in the request's sync thread
+    return await sync_to_async(render)(request, template_name, context)
+
+# dashboard, asset_list and asset_detail are async: under ASGI
+# (asset_management/asgi.py) a request waiting on the database does not hold
+# a worker. They work unchanged under WSGI.
+#
+# asset_list and asset_detail also answer conditional GETs: an unchanged page
+# costs one aggregate query and a 304 (see conditional.py).
+
 def login_view(request):
     if request.method == 'POST':
         username = request.POST['username']
@@ -39,22 +91,26 @@ def logout_view(request):
     return redirect('login')
 
 @login_required
-def dashboard(request):
-    user_profile = get_object_or_404(UserProfile, user=request.user)
+async def dashboard(request):
+    user_profile = await aget_user_profile(request)
     
     # Get asset statistics based on user role
-    if is_admin_or_incharge(request.user):
-        total_assets = Asset.objects.count()
-        assigned_assets = Asset.objects.filter(status='assigned').count()
-        available_assets = Asset.objects.filter(status='available').count()
-        maintenance_assets = Asset.objects.filter(status='maintenance').count()
-        recent_assignments = AssetAssignment.objects.filter(returned_date__isnull=True).order_by('-assigned_date')[:5]
+    # Counts come from the cached stats service (one GROUP BY on a cache miss)
+    recent_assignments = visible_assignments(request).filter(returned_date__isnull=True).select_related('asset', 'assigned_to', 'assigned_by')
+    if request.user_role.is_admin_or_incharge:
+        # A department-scoped incharge gets their department's counts
+        status_counts = await aget_status_counts(request.user_role.department_id)
+        total_assets = status_counts['total']
+        assigned_assets = status_counts['assigned']
+        available_assets = status_counts['available']
+        maintenance_assets = status_counts['maintenance']
+        recent_assignments = recent_assignments.order_by('-assigned_date')[:5]
     else:  # regular user
-        total_assets = Asset.objects.filter(assigned_user=request.user).count()
+        total_assets = await aget_user_asset_count(request.user)
         assigned_assets = total_assets
         available_assets = 0
         maintenance_assets = 0
-        recent_assignments = AssetAssignment.objects.filter(assigned_to=request.user, returned_date__isnull=True).order_by('-assigned_date')[:5]
+        recent_assignments = recent_assignments.order_by('-assigned_date')[:5]
     
     context = {
         'user_profile': user_profile,
@@ -62,78 +118,192 @@ def dashboard(request):
         'assigned_assets': assigned_assets,
         'available_assets': available_assets,
         'maintenance_assets': maintenance_assets,
-        'recent_assignments': recent_assignments,
+        'recent_assignments': [assignment async for assignment in recent_assignments],
     }
-    return render(request, 'assets/dashboard.html', context)
-
-@login_required
-def asset_list(request):
-    user_profile = get_object_or_404(UserProfile, user=request.user)
+    return await arender(request, 'assets/dashboard.html', context)
+
+async def _listed_assets(request):
+    """
+    The querysets asset_list pages through: the visible assets matching the
+    filters, and the matching archived assets when asked for (else None).
+    """
+    # Filter assets based on user role (see access.py)
+    assets = visible_assets(request)
     
-    # Filter assets based on user role
-    if is_admin_or_incharge(request.user):
-        assets = Asset.objects.all()
-    else:
-        assets = Asset.objects.filter(assigned_user=request.user)
-    
-    # Search functionality
+    # Search functionality (serial number, name, department or assigned user),
+    # ranked by relevance through the configured search backend
     search_query = request.GET.get('search')
     if search_query:
-        assets = assets.filter(
-            Q(serial_number__icontains=search_query) |
-            Q(display_name__icontains=search_query) |
-            Q(department__icontains=search_query) |
-            Q(assigned_user__username__icontains=search_query) # Search by assigned user
-        )
+        assets = (await aget_search_backend()).search(assets, search_query)
     
-    # Filter functionality
+    # Department and company filters compare integer keys
     status_filter = request.GET.get('status')
-    if status_filter:
-        assets = assets.filter(status=status_filter)
-    
     category_filter = request.GET.get('category')
-    if category_filter:
-        assets = assets.filter(model_category=category_filter)
+    department_filter = parse_id(request.GET.get('department'))
+    company_filter = parse_id(request.GET.get('company'))
+    assets = apply_field_filters(assets, status_filter, category_filter, department_filter, company_filter)
+
+    archived = None
+    # Opt-in: archived (retired or deleted) assets too; they were nobody's anymore
+    if request.user_role.is_admin_or_incharge and request.GET.get('archived') == '1':
+        # A department-scoped incharge only sees their department's archive too
+        archived = filter_archived(
+            search_query, status_filter, category_filter,
+            request.user_role.department_id or department_filter, company_filter,
+        )
+    return assets, archived
+
+async def _asset_list_state(request):
+    """Latest updated_at and row count of each listed table: one aggregate query per table."""
+    if not hasattr(request, '_asset_list_state'):
+        request._asset_list_state = [
+            await queryset.order_by().aaggregate(last=Max('updated_at'), count=Count('id'))
+            for queryset in await _listed_assets(request) if queryset is not None
+        ]
+    return request._asset_list_state
+
+async def _page_may_be_cached(request):
+    """Resolve the role; False while flash messages wait to be shown, which needs a fresh render."""
+    await aresolve_role(request)
+    return not get_messages(request)
+
+async def _page_etag(request, *parts):
+    # The page embeds a CSRF token derived from the secret in the cookie;
+    # get_token() creates the secret now if this is the first visit
+    get_token(request)
+    return make_etag(request, await apages_version(), request.META['CSRF_COOKIE'], *parts)
+
+async def asset_list_etag(request):
+    if not await _page_may_be_cached(request):
+        return None
+    states = await _asset_list_state(request)
+    return await _page_etag(request, *[(state['last'], state['count']) for state in states])
+
+async def asset_list_last_modified(request):
+    return max((state['last'] for state in await _asset_list_state(request) if state['last']), default=None)
+
+@login_required
+@cache_control(private=True, no_cache=True)
+@acondition(asset_list_etag, asset_list_last_modified)
+async def asset_list(request):
+    user_profile = await aget_user_profile(request)
+    assets, archived = await _listed_assets(request)
+    include_archived = archived is not None
+    search_query = request.GET.get('search')
+    status_filter = request.GET.get('status')
+    category_filter = request.GET.get('category')
+    department_filter = parse_id(request.GET.get('department'))
+    company_filter = parse_id(request.GET.get('company'))
     
     # Determine if export button should be shown
     # It's shown if user is admin/incharge AND any filter/search is active
-    show_export_button = is_admin_or_incharge(request.user)
+    show_export_button = request.user_role.is_admin_or_incharge
+
+    querysets = [assets.select_related('assigned_user', 'department')]
+    if include_archived:
+        querysets.append(archived.select_related('department'))
+
+    # Keyset pagination: only one page of rows is fetched and rendered
+    page = await apaginate_many(
+        querysets,
+        cursor=request.GET.get('cursor'),
+        page_size=request.GET.get('page_size'),
+        rank='search_rank' if search_query else None,
+    )
+
+    # Current filters without the cursor, used to build next/prev links
+    filter_params = request.GET.copy()
+    filter_params.pop('cursor', None)
+
+    # Filter choices from the cached lookup names (no query in the steady state)
+    departments = companies = ()
+    if request.user_role.is_admin_or_incharge:
+        if request.user_role.department_id is None:
+            departments = lookup_choices(await alookup_names(Department))
+        companies = lookup_choices(await alookup_names(Company))
 
     context = {
-        'assets': assets,
+        'assets': page.items,
+        'page': page,
+        'filter_query': filter_params.urlencode(),
         'user_profile': user_profile,
         'search_query': search_query,
         'status_filter': status_filter,
         'category_filter': category_filter,
+        'department_filter': department_filter,
+        'company_filter': company_filter,
+        'departments': departments,
+        'companies': companies,
+        'include_archived': include_archived,
         'status_choices': Asset.STATUS_CHOICES,
         'category_choices': Asset.CATEGORY_CHOICES,
         'show_export_button': show_export_button, # Pass flag to template
+        'bulk_form': BulkAssetActionForm() if request.user_role.is_asset_incharge else None,
     }
-    return render(request, 'assets/asset_list.html', context)
+    return await arender(request, 'assets/asset_list.html', context)
+
+def _latest(queryset, field):
+    return Subquery(queryset.filter(asset=OuterRef('pk')).order_by(f'-{field}').values(field)[:1])
+
+async def _asset_detail_state(request, serial_number):
+    """
+    The asset's updated_at and the latest change to its assignments and to
+    its stored events (written in batches, after the asset row), in one
+    query of indexed lookups; None if it is missing or not visible.
+    """
+    if not hasattr(request, '_asset_detail_state'):
+        request._asset_detail_state = await visible_assets(request).filter(serial_number=serial_number).values(
+            'updated_at',
+            last_assigned=_latest(AssetAssignment.objects.all(), 'assigned_date'),
+            last_returned=_latest(AssetAssignment.objects.filter(returned_date__isnull=False), 'returned_date'),
+            last_event=_latest(AssetEvent.objects.all(), 'created_at'),
+        ).afirst()
+    return request._asset_detail_state
+
+async def asset_detail_etag(request, serial_number):
+    if not await _page_may_be_cached(request):
+        return None
+    state = await _asset_detail_state(request, serial_number)
+    if state is None:
+        # Missing or not visible: the view answers with a 404 or a redirect
+        return None
+    return await _page_etag(request, *state.values())
+
+async def asset_detail_last_modified(request, serial_number):
+    state = await _asset_detail_state(request, serial_number)
+    return max((moment for moment in state.values() if moment), default=None)
 
 @login_required
-def asset_detail(request, serial_number):
-    asset = get_object_or_404(Asset, serial_number=serial_number)
-    user_profile = get_object_or_404(UserProfile, user=request.user)
+@cache_control(private=True, no_cache=True)
+@acondition(asset_detail_etag, asset_detail_last_modified)
+async def asset_detail(request, serial_number):
+    asset = await Asset.objects.select_related('assigned_user', 'department', 'company').filter(serial_number=serial_number).afirst()
+    if asset is None:
+        raise Http404("No Asset matches the given query.")
+    user_profile = await aget_user_profile(request)
     
     # Check permissions for viewing
-    if user_profile.role == 'user' and asset.assigned_user != request.user:
+    if not can_view(request, asset):
         messages.error(request, 'You do not have permission to view this asset.')
         return redirect('asset_list')
     
-    assignments = AssetAssignment.objects.filter(asset=asset).order_by('-assigned_date')
+    # Left lazy: only queried when the cached history fragment is missing
+    assignments = AssetAssignment.objects.filter(asset=asset).select_related('assigned_to', 'assigned_by').order_by('-assigned_date')
     
     context = {
         'asset': asset,
         'user_profile': user_profile,
         'assignments': assignments,
     }
-    return render(request, 'assets/asset_detail.html', context)
+    if user_profile.role in ('admin', 'asset_incharge'):
+        # Outside the cached fragment: events do not change updated_at
+        context['events'] = await atimeline(asset)
+    return await arender(request, 'assets/asset_detail.html', context)
 
 @login_required
 @user_passes_test(is_admin) # Only Admin can create
 def asset_create(request):
-    user_profile = get_object_or_404(UserProfile, user=request.user)
+    user_profile = get_user_profile(request)
     
     if request.method == 'POST':
         form = AssetForm(request.POST, user_role=user_profile.role, is_new_asset=True)
@@ -149,11 +319,33 @@ def asset_create(request):
     
     return render(request, 'assets/asset_form.html', {'form': form, 'title': 'Create Asset'})
 
+@login_required
+@user_passes_test(is_admin) # Only Admin can import, as with create
+def asset_import(request):
+    result = None
+    if request.method == 'POST':
+        form = AssetImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            uploaded = form.cleaned_data['file']
+            result = import_assets(uploaded.file, uploaded.name)
+            messages.success(
+                request,
+                f'Imported {result.created} new and {result.updated} updated assets '
+                f'({result.rows_per_second:.0f} rows/sec).'
+            )
+            if result.error_count:
+                messages.warning(request, f'{result.error_count} rows were skipped. See the report below.')
+            form = AssetImportForm()
+    else:
+        form = AssetImportForm()
+
+    return render(request, 'assets/asset_import.html', {'form': form, 'result': result})
+
 @login_required
 @user_passes_test(lambda u: is_admin(u) or is_asset_incharge(u)) # Admin or Incharge can access edit form
 def asset_edit(request, serial_number):
-    asset = get_object_or_404(Asset, serial_number=serial_number)
-    user_profile = get_object_or_404(UserProfile, user=request.user)
+    asset = get_object_or_404(visible_assets(request), serial_number=serial_number)
+    user_profile = get_user_profile(request)
     
     # Specific permission check for editing
     if user_profile.role == 'user': # Should be caught by @user_passes_test, but as a fallback
@@ -161,7 +353,7 @@ def asset_edit(request, serial_number):
         return redirect('asset_detail', serial_number=serial_number)
     
     if request.method == 'POST':
-        form = AssetForm(request.POST, instance=asset, user_role=user_profile.role, is_new_asset=False)
+        form = AssetForm(request.POST, instance=asset, user_role=user_profile.role, is_new_asset=False, department_id=request.user_role.department_id)
         
         # IMPORTANT: If the serial_number field is disabled (which it is for existing assets
         # when edited by an Asset Incharge), it will not be in request.POST.
@@ -170,46 +362,27 @@ def asset_edit(request, serial_number):
         if 'serial_number' in form.fields and form.fields['serial_number'].widget.attrs.get('disabled'):
             del form.fields['serial_number']
         
-        print(f"DEBUG: asset_edit POST request for {serial_number}")
-        print(f"DEBUG: request.POST data: {request.POST}")
-        
         if form.is_valid():
-            print(f"DEBUG: Form is valid. Cleaned data: {form.cleaned_data}")
-            
             updated_asset = form.save(commit=False) # Save without committing first
             # The serial_number on updated_asset will correctly retain its original value
             # because it was not included in the form's data for update.
 
-            # Handle status change to 'retired' (this logic is correct and should remain)
-            new_status = form.cleaned_data.get('status')
-            if new_status == 'retired':
-                if updated_asset.assigned_user:
-                    updated_asset.assigned_user = None
-                    messages.info(request, f"Asset {updated_asset.serial_number} was unassigned as its status changed to Retired.")
-                
-                active_assignments = AssetAssignment.objects.filter(asset=updated_asset, returned_date__isnull=True)
-                for assignment in active_assignments:
-                    assignment.returned_date = timezone.now()
-                    assignment.notes += "\n(Automatically returned due to asset retirement)"
-                    assignment.save()
-                    messages.info(request, f"Active assignment for {updated_asset.serial_number} was closed due to asset retirement.")
-
-            updated_asset.save() # Now save the instance
-            messages.success(request, 'Asset updated successfully.')
-            
-            # Verify asset still exists after save
+            # Moving an assigned asset to another status (e.g. Retired) closes
+            # its assignment in the same transaction as the save
             try:
-                test_asset = Asset.objects.get(serial_number=serial_number)
-                print(f"DEBUG: Asset {test_asset.serial_number} still exists with status {test_asset.status}")
-            except Asset.DoesNotExist:
-                print(f"ERROR: Asset {serial_number} DOES NOT EXIST after save!")
-            
+                closed = save_asset(updated_asset)
+            except AssignmentError as e:
+                messages.error(request, str(e))
+                return redirect('asset_detail', serial_number=serial_number)
+            if closed:
+                messages.info(request, f"Active assignment for {updated_asset.serial_number} was closed as its status changed to {updated_asset.get_status_display()}.")
+            messages.success(request, 'Asset updated successfully.')
             return redirect('asset_detail', serial_number=updated_asset.serial_number)
         else:
-            print(f"DEBUG: Form is NOT valid. Errors: {form.errors}")
+            logger.debug("asset_edit: invalid form for %s: %s", serial_number, form.errors.as_json())
             messages.error(request, 'Error updating asset. Please check the form.')
     else:
-        form = AssetForm(instance=asset, user_role=user_profile.role, is_new_asset=False)
+        form = AssetForm(instance=asset, user_role=user_profile.role, is_new_asset=False, department_id=request.user_role.department_id)
     
     return render(request, 'assets/asset_form.html', {'form': form, 'title': 'Edit Asset', 'asset': asset})
 
@@ -217,10 +390,11 @@ def asset_edit(request, serial_number):
 @user_passes_test(is_admin) # Only Admin can delete
 def asset_delete(request, serial_number):
     asset = get_object_or_404(Asset, serial_number=serial_number)
-    user_profile = get_object_or_404(UserProfile, user=request.user)
+    user_profile = get_user_profile(request)
     
     if request.method == 'POST':
-        asset.delete()
+        # Moved to the archive tables with its assignment history
+        delete_asset(asset, request.user)
         messages.success(request, 'Asset deleted successfully.')
         return redirect('asset_list')
     
@@ -229,23 +403,24 @@ def asset_delete(request, serial_number):
 @login_required
 @user_passes_test(is_asset_incharge) # Only Asset Incharge can assign
 def assign_asset(request, serial_number):
-    asset = get_object_or_404(Asset, serial_number=serial_number)
-    user_profile = get_object_or_404(UserProfile, user=request.user)
+    asset = get_object_or_404(visible_assets(request), serial_number=serial_number)
+    user_profile = get_user_profile(request)
     
     if request.method == 'POST':
         form = AssetAssignmentForm(request.POST)
         if form.is_valid():
-            assignment = form.save(commit=False)
-            assignment.asset = asset
-            assignment.assigned_by = request.user
-            assignment.save()
-            
-            # Update asset status and assigned user
-            asset.assigned_user = assignment.assigned_to
-            asset.status = 'assigned'
-            asset.save()
-            
-            messages.success(request, f'Asset assigned to {assignment.assigned_to.username} successfully.')
+            # Creates the assignment and updates the asset under a row lock;
+            # a resubmitted form (same idempotency key) is not applied twice
+            try:
+                with idempotent(request, 'assign') as record:
+                    assignment = assign(asset, form.cleaned_data['assigned_to'], request.user, form.cleaned_data['notes'])
+                    record.summary = f'Asset assigned to {assignment.assigned_to.username} successfully.'
+            except DuplicateRequest as e:
+                messages.info(request, f'This request was already processed. {e.record.summary}')
+            except AssignmentError as e:
+                messages.error(request, str(e))
+            else:
+                messages.success(request, record.summary)
             return redirect('asset_detail', serial_number=serial_number)
     else:
         form = AssetAssignmentForm()
@@ -255,26 +430,75 @@ def assign_asset(request, serial_number):
 @login_required
 @user_passes_test(is_asset_incharge) # Only Asset Incharge can return
 def return_asset(request, serial_number):
-    asset = get_object_or_404(Asset, serial_number=serial_number)
-    user_profile = get_object_or_404(UserProfile, user=request.user)
-    
-    # Find the active assignment
-    assignment = AssetAssignment.objects.filter(asset=asset, returned_date__isnull=True).first()
+    asset = get_object_or_404(visible_assets(request), serial_number=serial_number)
+    user_profile = get_user_profile(request)
     
-    if assignment:
-        assignment.returned_date = timezone.now()
-        assignment.save()
-        
-        # Update asset status
-        asset.assigned_user = None
-        asset.status = 'available'
-        asset.save()
-        
-        messages.success(request, 'Asset returned successfully.')
-    else:
+    if request.method == 'POST':
+        form = ReturnAssetForm(request.POST)
+        if form.is_valid():
+            # Closes the current assignment and makes the asset available again
+            try:
+                with idempotent(request, 'return') as record:
+                    release(asset, assignment_id=form.cleaned_data['assignment'])
+                    record.summary = 'Asset returned successfully.'
+            except DuplicateRequest as e:
+                messages.info(request, f'This request was already processed. {e.record.summary}')
+            except AssignmentError as e:
+                messages.error(request, str(e))
+            else:
+                messages.success(request, record.summary)
+        return redirect('asset_detail', serial_number=serial_number)
+
+    if asset.current_assignment_id is None:
         messages.error(request, 'No active assignment found for this asset.')
-    
-    return redirect('asset_detail', serial_number=serial_number)
+        return redirect('asset_detail', serial_number=serial_number)
+    form = ReturnAssetForm(initial={'assignment': asset.current_assignment_id})
+    return render(request, 'assets/return_asset.html', {'form': form, 'asset': asset})
+
+@login_required
+@user_passes_test(is_asset_incharge) # Only Asset Incharge can assign/return/retire
+def asset_bulk_action(request):
+    # Filters of the list the action was started from, kept for the redirect
+    filter_params = {key: request.POST.get(key, '') for key in ('search', 'status', 'category', 'department', 'company')}
+    list_url = f"{reverse('asset_list')}?{urlencode({k: v for k, v in filter_params.items() if v})}"
+
+    if request.method != 'POST':
+        return redirect(list_url)
+
+    form = BulkAssetActionForm(request.POST)
+    if not form.is_valid():
+        for errors in form.errors.values():
+            for error in errors:
+                messages.error(request, error)
+        return redirect(list_url)
+
+    if form.cleaned_data['scope'] == 'filter':
+        assets = apply_asset_filters(
+            visible_assets(request), filter_params['search'], filter_params['status'], filter_params['category'],
+            parse_id(filter_params['department']), parse_id(filter_params['company']),
+        )
+    else:
+        selected = request.POST.getlist('selected')
+        if not selected:
+            messages.error(request, 'Select at least one asset.')
+            return redirect(list_url)
+        assets = visible_assets(request).filter(serial_number__in=selected)
+
+    action = form.cleaned_data['action']
+    try:
+        with idempotent(request, f'bulk_{action}') as record:
+            if action == 'assign':
+                result = bulk_assign(assets, form.cleaned_data['assigned_to'], request.user, notes=form.cleaned_data['notes'])
+            elif action == 'return':
+                result = bulk_return(assets)
+            else:
+                result = bulk_retire(assets)
+            record.summary = str(result)
+    except DuplicateRequest as e:
+        messages.info(request, f'This request was already processed. {e.record.summary}')
+    else:
+        messages.success(request, record.summary)
+    return redirect(list_url)
 
 @login_required
 @user_passes_test(is_admin_or_incharge) # Only Admin or Asset Incharge can export
@@ -284,10 +508,6 @@ def export_assets_excel(request):
     status_filter = request.GET.get('status', '') # Default to empty string
     category_filter = request.GET.get('category', '') # Default to empty string
 
-    print(f"DEBUG: export_assets_excel - Received search_query: '{search_query}'")
-    print(f"DEBUG: export_assets_excel - Received status_filter: '{status_filter}'")
-    print(f"DEBUG: export_assets_excel - Received category_filter: '{category_filter}'")
-
     # Get filters from request.GET and handle 'None' string values
     search_query = request.GET.get('search', '')
     if search_query == 'None':
@@ -301,62 +521,177 @@ def export_assets_excel(request):
     if category_filter == 'None':
         category_filter = ''
 
-    print(f"DEBUG: export_assets_excel - Processed search_query: '{search_query}'")
-    print(f"DEBUG: export_assets_excel - Processed status_filter: '{status_filter}'")
-    print(f"DEBUG: export_assets_excel - Processed category_filter: '{category_filter}'")
+    logger.debug(
+        "export_assets_excel: search=%r status=%r category=%r", search_query, status_filter, category_filter,
+    )
 
-    assets = Asset.objects.all().order_by('serial_number')
+    # A department-scoped incharge exports their own department only
+    department_filter = request.user_role.department_id or parse_id(request.GET.get('department'))
+    assets, archived = export_querysets(
+        search_query, status_filter, category_filter, include_archived=request.GET.get('archived') == '1',
+        department_id=department_filter, company_id=parse_id(request.GET.get('company')),
+    )
 
-    if search_query:
-        assets = assets.filter(
-            Q(serial_number__icontains=search_query) |
-            Q(display_name__icontains=search_query) |
-            Q(department__icontains=search_query) |
-            Q(assigned_user__username__icontains=search_query)
+    # Rows are generated lazily from a chunked iterator, so memory stays flat
+    # regardless of how many assets match the filters.
+    rows = export_rows(assets, archived)
+
+    if request.GET.get('format') == 'csv':
+        response = StreamingHttpResponse(stream_csv(rows), content_type='text/csv')
+        response['Content-Disposition'] = 'attachment; filename="asset_report.csv"'
+        return response
+
+    return FileResponse(build_xlsx(rows), as_attachment=True, filename='asset_report.xlsx', content_type=XLSX_CONTENT_TYPE)
+
+@login_required
+@user_passes_test(is_admin_or_incharge) # Audit view: Admin or Asset Incharge
+def assignments_as_of(request):
+    """Who held which assets at a given moment, from the assignment history."""
+    as_of_value = request.GET.get('at', '')
+    moment = parse_as_of(as_of_value)
+    username = request.GET.get('user', '').strip()
+    serial_number = request.GET.get('serial', '').strip()
+
+    page = None
+    if moment is not None:
+        assignments = held_at(moment, visible_assignments(request))
+        if username:
+            assignments = assignments.filter(assigned_to__username=username)
+        if serial_number:
+            assignments = assignments.filter(asset__serial_number=serial_number)
+        page = paginate(
+            assignments.select_related('asset', 'assigned_to', 'assigned_by'),
+            cursor=request.GET.get('cursor'),
+            page_size=request.GET.get('page_size'),
+            date_field='assigned_date',
         )
-    if status_filter:
-        assets = assets.filter(status=status_filter)
-    if category_filter:
-        assets = assets.filter(model_category=category_filter)
-
-    print(f"DEBUG: export_assets_excel - Number of assets found for export: {assets.count()}")
-    print(f"DEBUG: export_assets_excel - Final Query SQL: {assets.query}") # Print the generated SQL query
-
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = 'attachment; filename="asset_report.xlsx"'
-
-    workbook = openpyxl.Workbook()
-    sheet = workbook.active
-    sheet.title = "Asset Report"
-
-    # Add headers
-    headers = [
-        "Serial Number", "Display Name", "Department", "Model Category",
-        "Status", "Company", "Assigned User", "Employee ID", "Assigned Date", "Returned Date"
-    ]
-    sheet.append(headers)
-
-    # Add data
-    for asset in assets:
-        assigned_user_name = asset.assigned_user.get_full_name() if asset.assigned_user else "N/A"
-        assigned_user_emp_id = asset.assigned_user.userprofile.employee_id if asset.assigned_user and hasattr(asset.assigned_user, 'userprofile') else "N/A"
-        
-        # Get latest assignment details
-        latest_assignment = AssetAssignment.objects.filter(asset=asset).order_by('-assigned_date').first()
-        assigned_date = latest_assignment.assigned_date.strftime('%Y-%m-%d %H:%M') if latest_assignment else "N/A"
-        returned_date = latest_assignment.returned_date.strftime('%Y-%m-%d %H:%M') if latest_assignment and latest_assignment.returned_date else "N/A"
-
-        row_data = [
-            asset.serial_number, asset.display_name, asset.department,
-            asset.get_model_category_display(), asset.get_status_display(),
-            asset.company, assigned_user_name, assigned_user_emp_id,
-            assigned_date, returned_date
-        ]
-        sheet.append(row_data)
+    elif as_of_value:
+        messages.error(request, 'Enter a valid date or date and time.')
+
+    filter_params = request.GET.copy()
+    filter_params.pop('cursor', None)
+
+    context = {
+        'moment': moment,
+        'as_of_value': as_of_value,
+        'username': username,
+        'serial_number': serial_number,
+        'page': page,
+        'filter_query': filter_params.urlencode(),
+    }
+    return render(request, 'assets/assignments_as_of.html', context)
+
+def _analytics_params(request):
+    """Dimension and date range for the analytics views (default: last 30 complete days)."""
+    dimension = request.GET.get('dimension')
+    if dimension not in dict(AnalyticsSnapshot.DIMENSION_CHOICES):
+        dimension = 'department'
+    end = parse_date(request.GET.get('end') or '') or timezone.localdate() - timedelta(days=1)
+    start = parse_date(request.GET.get('start') or '') or end - timedelta(days=29)
+    return dimension, start, end
 
-    workbook.save(response)
+@login_required
+@user_passes_test(is_admin_or_incharge) # Admin or Asset Incharge
+def analytics_dashboard(request):
+    # Reads only the daily snapshot tables (refreshed by manage.py refresh_analytics)
+    dimension, start, end = _analytics_params(request)
+    context = {
+        'dimension': dimension,
+        'dimension_choices': AnalyticsSnapshot.DIMENSION_CHOICES,
+        'start': start,
+        'end': end,
+        'rows': rollup(dimension, start, end),
+        'last_refresh': AnalyticsRefreshState.objects.filter(name=ANALYTICS_STATE).values_list('last_run_at', flat=True).first(),
+    }
+    return render(request, 'assets/analytics.html', context)
+
+@login_required
+@user_passes_test(is_admin_or_incharge)
+def analytics_export(request):
+    dimension, start, end = _analytics_params(request)
+    rows = analytics_export_rows(rollup(dimension, start, end))
+    response = StreamingHttpResponse(stream_csv(rows, ANALYTICS_EXPORT_HEADERS), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="asset_analytics_{dimension}_{start}_{end}.csv"'
     return response
 
+@login_required
+@user_passes_test(is_admin_or_incharge) # Same roles as the synchronous export
+def export_job_create(request):
+    if request.method != 'POST':
+        return redirect('asset_list')
+
+    filters = {key: request.POST.get(key, '') for key in ('search', 'status', 'category', 'department', 'company', 'archived')}
+    filters = {key: ('' if value == 'None' else value) for key, value in filters.items()}
+    if request.user_role.department_id is not None:
+        # Part of the job's filters, so it is also part of the reuse hash
+        filters['department'] = str(request.user_role.department_id)
+    export_format = 'csv' if request.POST.get('format') == 'csv' else 'xlsx'
+
+    job, reused = start_export(filters, export_format, request.user)
+    if reused:
+        messages.info(request, 'An identical export was started recently, so it is being reused.')
+    return redirect('export_job_detail', job_id=job.pk)
+
+def _visible_export_jobs(request):
+    jobs = ExportJob.objects.all()
+    if not request.user_role.is_admin:
+        # An export holds the requester's view of the assets: only they (or
+        # an admin) may fetch it
+        jobs = jobs.filter(requested_by=request.user)
+    if request.user_role.department_id is not None:
+        # Other exports may include departments outside the incharge's scope
+        jobs = jobs.filter(filters__department=str(request.user_role.department_id))
+    return jobs
+
+@login_required
+@user_passes_test(is_admin_or_incharge)
+def export_job_detail(request, job_id):
+    job = get_object_or_404(_visible_export_jobs(request), pk=job_id)
+    return render(request, 'assets/export_job.html', {'job': job})
+
+@login_required
+@user_passes_test(is_admin_or_incharge)
+def export_job_progress(request, job_id):
+    job = get_object_or_404(_visible_export_jobs(request), pk=job_id)
+    return JsonResponse({
+        'status': job.status,
+        'processed_rows': job.processed_rows,
+        'total_rows': job.total_rows,
+        'percent': job.percent,
+        'error': job.error,
+        'download_url': reverse('export_job_download', args=[job.pk]) if job.status == 'done' else None,
+    })
+
+@login_required
+@user_passes_test(is_admin_or_incharge)
+def export_job_download(request, job_id):
+    job = get_object_or_404(_visible_export_jobs(request), pk=job_id, status='done')
+    if not job.file or not job.file.storage.exists(job.file.name):
+        raise Http404("The export file has expired.")
+    content_type = 'text/csv' if job.format == 'csv' else XLSX_CONTENT_TYPE
+    return FileResponse(job.file.open('rb'), as_attachment=True, filename=f'asset_report.{job.format}', content_type=content_type)
+
+@login_required
+@user_passes_test(is_admin) # Only Admin can see request timings
+def profiling_dashboard(request):
+    if request.method == 'POST':
+        profiling.samples.clear()
+        messages.success(request, 'Profiling samples cleared.')
+        return redirect('profiling_dashboard')
+
+    records = profiling.samples.snapshot()
+    context = {
+        'enabled': getattr(settings, 'ASSET_PROFILING', False),
+        'sample_count': len(records),
+        'buffer_size': profiling.get_buffer_size(),
+        'views': profiling.summarize(records),
+        'slowest': sorted(records, key=lambda sample: sample.wall_ms, reverse=True)[:20],
+        'n_plus_one': [sample for sample in reversed(records) if sample.n_plus_one][:20],
+        'profiles': [sample for sample in reversed(records) if sample.profile][:10],
+        'profile_param': profiling.PROFILE_PARAM,
+    }
+    return render(request, 'assets/profiling.html', context)
+
 from django.contrib.auth.models import User
 from django.http import HttpResponse
 
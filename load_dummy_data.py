@@ -13,8 +13,15 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'asset_management.settings')
 django.setup()
 
 from django.contrib.auth.models import User
-from assets.models import UserProfile, Asset, AssetAssignment
-from django.utils import timezone
+from assets.lookups import find_or_create
+from assets.models import UserProfile, Asset, Company, Department
+from assets.services import AssignmentError, assign
+
+def department(name):
+    return find_or_create(Department, [name])[name]
+
+def company(name):
+    return find_or_create(Company, [name])[name]
 
 def create_users():
     """Create demo users with different roles"""
@@ -40,7 +47,7 @@ def create_users():
         defaults={
             'role': 'admin',
             'employee_id': 'EMP001', # This will be set/updated
-            'department': 'IT Administration',
+            'department': department('IT Administration'),
             'phone': '+1-555-0001'
         }
     )
@@ -63,7 +70,7 @@ def create_users():
         defaults={
             'role': 'asset_incharge',
             'employee_id': 'EMP002',
-            'department': 'IT Operations',
+            'department': department('IT Operations'),
             'phone': '+1-555-0002'
         }
     )
@@ -95,7 +102,7 @@ def create_users():
             defaults={
                 'role': 'user',
                 'employee_id': emp_id,
-                'department': dept,
+                'department': department(dept),
                 'phone': phone
             }
         )
@@ -144,15 +151,16 @@ def create_assets():
         ('OTH003', 'Webcam C920', 'HR', 'other', 'assigned', 'Logitech'),
     ]
     
-    for serial, name, dept, category, status, company in assets_data:
+    for serial, name, dept, category, status, company_name in assets_data:
         asset, created = Asset.objects.get_or_create(
             serial_number=serial,
             defaults={
                 'display_name': name,
-                'department': dept,
+                'department': department(dept),
                 'model_category': category,
-                'status': status,
-                'company': company
+                # 'assigned' assets start available; create_assignments() assigns them
+                'status': 'available' if status == 'assigned' else status,
+                'company': company(company_name)
             }
         )
     
@@ -185,25 +193,12 @@ def create_assignments():
             asset = Asset.objects.get(serial_number=asset_serial)
             user = User.objects.get(username=username)
             
-            # Create assignment record
-            assignment, created = AssetAssignment.objects.get_or_create(
-                asset=asset,
-                assigned_to=user,
-                returned_date__isnull=True,
-                defaults={
-                    'assigned_by': incharge,
-                    'assigned_date': timezone.now(),
-                    'notes': f'Initial assignment to {user.get_full_name()}'
-                }
-            )
-            
-            # Update asset
-            if created:
-                asset.assigned_user = user
-                asset.status = 'assigned'
-                asset.save()
+            # Through the service, which also sets the asset's status,
+            # assigned user and current assignment
+            if asset.current_assignment_id is None:
+                assign(asset, user, incharge, notes=f'Initial assignment to {user.get_full_name()}')
                 
-        except (Asset.DoesNotExist, User.DoesNotExist):
+        except (Asset.DoesNotExist, User.DoesNotExist, AssignmentError):
             continue
     
     print("✅ Asset assignments created successfully!")
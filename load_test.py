@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+"""
+Simple HTTP load test for a running Asset Management server.
+
+Logs in once, then requests the given pages from concurrent clients that
+share the session, and reports throughput, latency percentiles and errors,
+plus the database timings from the Server-Timing header when
+ASSET_DB_METRICS is enabled on the server.
+
+Compare connection settings by running the server twice, e.g.:
+
+    DATABASE_CONN_MAX_AGE=0   gunicorn asset_management.wsgi -w 4
+    python load_test.py --url http://127.0.0.1:8000 --username admin --password admin123
+
+    DATABASE_CONN_MAX_AGE=600 gunicorn asset_management.wsgi -w 4
+    python load_test.py --url http://127.0.0.1:8000 --username admin --password admin123
+
+Compare WSGI and ASGI serving the same way, at high concurrency:
+
+    gunicorn asset_management.wsgi -w 4
+    python load_test.py --concurrency 500 --requests 10000 --paths /,/assets/,/api/assets/
+
+    uvicorn asset_management.asgi:application --workers 4
+    python load_test.py --concurrency 500 --requests 10000 --paths /,/assets/,/api/assets/
+
+Only the standard library is used, so it runs from any machine.
+"""
+
+import argparse
+import http.cookiejar
+import re
+import statistics
+import sys
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+SERVER_TIMING_RE = re.compile(r'([\w-]+);dur=([\d.]+)')
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def login(base_url, username, password):
+    """Return the cookie jar of an authenticated session."""
+    jar = http.cookiejar.CookieJar()
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar))
+    login_url = f"{base_url}/login/"
+    opener.open(login_url).read()
+    csrf_token = next((cookie.value for cookie in jar if cookie.name == 'csrftoken'), '')
+    data = urllib.parse.urlencode({
+        'username': username,
+        'password': password,
+        'csrfmiddlewaretoken': csrf_token,
+    }).encode()
+    request = urllib.request.Request(login_url, data=data, headers={'Referer': login_url})
+    opener.open(request).read()
+    if not any(cookie.name == 'sessionid' for cookie in jar):
+        sys.exit("Login failed: check --username and --password.")
+    return jar
+
+
+def run_worker(base_url, jar, paths, count, offset):
+    """Issue ``count`` requests, cycling through ``paths``; return per-request samples."""
+    # Cookies only: hundreds of concurrent logins would load the server more than the test
+    cookies = '; '.join(f'{cookie.name}={cookie.value}' for cookie in jar)
+    samples = []
+    for i in range(count):
+        path = paths[(offset + i) % len(paths)]
+        request = urllib.request.Request(f"{base_url}{path}", headers={'Cookie': cookies})
+        start = time.perf_counter()
+        server_timing, error = {}, None
+        try:
+            with urllib.request.urlopen(request, timeout=60) as response:
+                response.read()
+                server_timing = dict(
+                    (name, float(duration))
+                    for name, duration in SERVER_TIMING_RE.findall(response.headers.get('Server-Timing', ''))
+                )
+        except OSError as exc:
+            error = getattr(exc, 'code', None) or type(exc).__name__
+        samples.append({
+            'path': path,
+            'latency': (time.perf_counter() - start) * 1000,
+            'connect': server_timing.get('db-connect'),
+            'db': server_timing.get('db'),
+            'error': error,
+        })
+    return samples
+
+
+def report(label, samples):
+    latencies = [sample['latency'] for sample in samples]
+    errors = sum(1 for sample in samples if sample['error'] is not None)
+    line = (
+        f"{label:<30} n={len(latencies):<6} errors={errors:<5} "
+        f"p50={percentile(latencies, 50):7.1f} ms  p95={percentile(latencies, 95):7.1f} ms  "
+        f"p99={percentile(latencies, 99):7.1f} ms  mean={statistics.mean(latencies):7.1f} ms"
+    )
+    connects = [sample['connect'] for sample in samples if sample['connect'] is not None]
+    if connects:
+        db = [sample['db'] for sample in samples if sample['db'] is not None]
+        line += f"  connect={statistics.mean(connects):.2f} ms  db={statistics.mean(db):.2f} ms"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:8000', help="Base URL of the server.")
+    parser.add_argument('--username', default='admin')
+    parser.add_argument('--password', default='admin123')
+    parser.add_argument('--paths', default='/', help="Comma-separated paths to request (default: dashboard).")
+    parser.add_argument('--requests', type=int, default=500, help="Total number of requests.")
+    parser.add_argument('--concurrency', type=int, default=8, help="Number of concurrent workers.")
+    args = parser.parse_args()
+
+    base_url = args.url.rstrip('/')
+    paths = [path.strip() for path in args.paths.split(',') if path.strip()]
+    per_worker = max(1, args.requests // args.concurrency)
+    jar = login(base_url, args.username, args.password)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        futures = [
+            executor.submit(run_worker, base_url, jar, paths, per_worker, worker)
+            for worker in range(args.concurrency)
+        ]
+        samples = [sample for future in futures for sample in future.result()]
+    elapsed = time.perf_counter() - started
+
+    print(f"{len(samples)} requests in {elapsed:.1f} s ({len(samples) / elapsed:.0f} req/s)")
+    report('all', samples)
+    for path in paths:
+        report(path, [sample for sample in samples if sample['path'] == path])
+
+
+if __name__ == '__main__':
+    main()